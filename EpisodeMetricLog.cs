@@ -0,0 +1,123 @@
+using System;
+using System.IO;
+using UnityEngine;
+
+/// <summary>
+/// Appends one fixed-width binary record per finished episode to a run-local log,
+/// read on the Python side by data_fetch/episode_log.py (np.memmap, zero copy).
+///
+/// File layout (little-endian):
+///   header, 32 bytes: magic "DEPLOG\0\0", uint32 version, uint32 record size,
+///                     double start unix time, 8 reserved bytes
+///   record, 48 bytes: int64 step, double wall time, int32 agent id,
+///                     int32 episode length, float reward, int32 targets found,
+///                     float path efficiency, float angle stability,
+///                     byte ground collision, byte boundary exit,
+///                     byte max step reached, byte lesson, float distance travelled
+///
+/// Keep the layout in sync with RECORD_DTYPE in episode_log.py. Point the log at
+/// results/&lt;run-id&gt;/episode_logs/ so the reader finds it next to the event files,
+/// e.g. from the agent:
+///
+///   log = new EpisodeMetricLog(EpisodeMetricLog.DefaultPath(logDirectory, name));
+///   ... at episode end:
+///   log.Append(Academy.Instance.TotalStepCount, id, StepCount, GetCumulativeReward(), ...);
+/// </summary>
+public class EpisodeMetricLog : IDisposable
+{
+    public const int Version = 1;
+    public const int HeaderSize = 32;
+    public const int RecordSize = 48;
+    static readonly byte[] Magic = { (byte)'D', (byte)'E', (byte)'P', (byte)'L', (byte)'O', (byte)'G', 0, 0 };
+
+    readonly FileStream stream;
+    readonly BinaryWriter writer;
+    readonly int flushEvery;
+    int pending;
+
+    public string Path { get; }
+
+    /// <summary>Default file: &lt;directory&gt;/&lt;behavior&gt;_&lt;pid&gt;.bin, one file per Unity process</summary>
+    public static string DefaultPath(string directory, string behaviorName)
+    {
+        var pid = System.Diagnostics.Process.GetCurrentProcess().Id;
+        return System.IO.Path.Combine(directory, $"{behaviorName}_{pid}.bin");
+    }
+
+    public EpisodeMetricLog(string path, int flushEvery = 64)
+    {
+        Path = path;
+        this.flushEvery = Math.Max(1, flushEvery);
+        var directory = System.IO.Path.GetDirectoryName(path);
+        if (!string.IsNullOrEmpty(directory))
+        {
+            Directory.CreateDirectory(directory);
+        }
+
+        // Append so a resumed run keeps its earlier episodes; readers may open the file concurrently
+        stream = new FileStream(path, FileMode.OpenOrCreate, FileAccess.Write, FileShare.Read);
+        if (stream.Length < HeaderSize)
+        {
+            stream.SetLength(0);
+        }
+        else if ((stream.Length - HeaderSize) % RecordSize != 0)
+        {
+            // A crash left a partial record; drop it so later records stay aligned
+            stream.SetLength(stream.Length - (stream.Length - HeaderSize) % RecordSize);
+            Debug.LogWarning($"EpisodeMetricLog: dropped partial record in {path}");
+        }
+        stream.Seek(0, SeekOrigin.End);
+        writer = new BinaryWriter(stream);
+        if (stream.Length == 0)
+        {
+            writer.Write(Magic);
+            writer.Write((uint)Version);
+            writer.Write((uint)RecordSize);
+            writer.Write(UnixTime());
+            writer.Write(0L);
+            writer.Flush();
+        }
+    }
+
+    public void Append(long step, int agentId, int episodeLength, float reward, int targetsFound,
+        float pathEfficiency, float angleStability, bool groundCollision, bool boundaryExit,
+        bool maxStepReached, int lesson, float distanceTravelled)
+    {
+        writer.Write(step);
+        writer.Write(UnixTime());
+        writer.Write(agentId);
+        writer.Write(episodeLength);
+        writer.Write(reward);
+        writer.Write(targetsFound);
+        writer.Write(pathEfficiency);
+        writer.Write(angleStability);
+        writer.Write((byte)(groundCollision ? 1 : 0));
+        writer.Write((byte)(boundaryExit ? 1 : 0));
+        writer.Write((byte)(maxStepReached ? 1 : 0));
+        writer.Write((byte)Mathf.Clamp(lesson, 0, 255));
+        writer.Write(distanceTravelled);
+
+        if (++pending >= flushEvery)
+        {
+            Flush();
+        }
+    }
+
+    public void Flush()
+    {
+        writer.Flush();
+        pending = 0;
+    }
+
+    public void Dispose()
+    {
+        Flush();
+        writer.Dispose();
+        stream.Dispose();
+    }
+
+    static double UnixTime()
+    {
+        return DateTimeOffset.UtcNow.ToUnixTimeMilliseconds() / 1000.0;
+    }
+}
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Entry point so the folder runs as one command: python data_fetch <subcommand>
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main  # noqa: E402
+
+main()
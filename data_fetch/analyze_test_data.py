@@ -1,7 +1,11 @@
 import pandas as pd
 
+from lesson_index import DEFAULT_INDEX, load_index
+
+run_id = "drone4"   # run the CSV was fetched from (fetch_test_data.py)
+
 # Read the test data (performance metrics only)
-df = pd.read_csv("drone4_test_data.csv")
+df = pd.read_csv(f"{run_id}_test_data.csv")
 
 # Calculate summary statistics based on test metrics
 summary = {
@@ -20,24 +24,30 @@ for k, v in summary.items():
 
 # Show performance progression over time
 print("\n=== Performance Progression ===")
-early_training = df[df['step'] <= 1000000]  # First 1M steps
-mid_training = df[(df['step'] > 1000000) & (df['step'] <= 2500000)]  # Mid training
-late_training = df[df['step'] > 2500000]  # Final training
-
-print("Early Training (0-1M steps):")
-print(f"  Reward: {early_training['Reward'].mean():.3f}")
-print(f"  Targets Found: {early_training['TargetsFound'].mean():.3f}")
-print(f"  Path Efficiency: {early_training['PathEfficiency'].mean():.3f}")
-
-print("Mid Training (1M-2.5M steps):")
-print(f"  Reward: {mid_training['Reward'].mean():.3f}")
-print(f"  Targets Found: {mid_training['TargetsFound'].mean():.3f}")
-print(f"  Path Efficiency: {mid_training['PathEfficiency'].mean():.3f}")
-
-print("Late Training (2.5M+ steps):")
-print(f"  Reward: {late_training['Reward'].mean():.3f}")
-print(f"  Targets Found: {late_training['TargetsFound'].mean():.3f}")
-print(f"  Path Efficiency: {late_training['PathEfficiency'].mean():.3f}")
+# Split where the curriculum actually advanced, from the lesson index (lesson_index.py build)
+lesson_ranges = load_index().get('runs', {}).get(run_id, {}).get('ranges', {})
+if lesson_ranges:
+    param = max(lesson_ranges, key=lambda p: len(lesson_ranges[p]))
+    phases = []
+    for r in lesson_ranges[param]:
+        start, end = r['start_step'], r['end_step']
+        rows = df[(df['step'] >= start) & ((df['step'] < end) if end is not None else True)]
+        span = f"{start / 1e6:g}M-{end / 1e6:g}M" if end is not None else f"{start / 1e6:g}M+"
+        name = f" {r['name']}" if r['name'] else ""
+        phases.append((f"{param} lesson {r['lesson']}{name} ({span} steps)", rows))
+else:
+    print(f"(no lesson ranges for {run_id} in {DEFAULT_INDEX}; splitting at fixed steps)")
+    phases = [
+        ("Early Training (0-1M steps)", df[df['step'] <= 1000000]),
+        ("Mid Training (1M-2.5M steps)", df[(df['step'] > 1000000) & (df['step'] <= 2500000)]),
+        ("Late Training (2.5M+ steps)", df[df['step'] > 2500000]),
+    ]
+
+for label, rows in phases:
+    print(f"{label}:")
+    print(f"  Reward: {rows['Reward'].mean():.3f}")
+    print(f"  Targets Found: {rows['TargetsFound'].mean():.3f}")
+    print(f"  Path Efficiency: {rows['PathEfficiency'].mean():.3f}")
 
 # Best performance achieved
 print("\n=== Best Performance Achieved ===")
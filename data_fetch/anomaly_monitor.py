@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Streaming anomaly detection and alerting on live runs
+
+Tails the event files of every active run in results/ (only newly appended
+records are parsed) and pushes each new scalar through a set of rules, each
+doing O(1) work per sample:
+
+    nonfinite   NaN/inf in any tag
+    zscore      spike against a rolling baseline (exploding value loss, entropy collapse)
+    plateau     reward stuck below the curriculum threshold long after a lesson change
+    throughput  steps/second dropping well below the run's own rate
+
+Alerts go to a JSONL log and, optionally, are POSTed as JSON to a webhook.
+Rules can be replaced with a JSON list of specs (see DEFAULT_RULES).
+
+    python anomaly_monitor.py --results-dir results --log alerts.jsonl
+    python anomaly_monitor.py --replay --once      # what would have fired on finished runs
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+import urllib.request
+from collections import deque
+
+from run_config import load_run_config
+from tfevents import EventFileTail, find_run_files
+
+LESSON_PREFIX = 'Environment/Lesson Number/'
+REWARD_TAG = 'Environment/Cumulative Reward'
+
+DEFAULT_RULES = [
+    {'type': 'nonfinite'},
+    {'type': 'zscore', 'tag': 'Losses/Value Loss', 'direction': 'up', 'z': 8.0, 'window': 100,
+     'min_change': 1.0},
+    {'type': 'zscore', 'tag': 'Policy/Entropy', 'direction': 'down', 'z': 8.0, 'window': 100,
+     'min_change': 0.3},
+    {'type': 'plateau', 'patience_steps': 1000000},
+    {'type': 'throughput', 'drop_fraction': 0.3, 'warmup': 20, 'consecutive': 3},
+]
+
+
+class Alert(dict):
+    """One alert record; a dict so it serializes as-is"""
+
+    def __init__(self, rule, run, tag, step, wall_time, message, **details):
+        super().__init__(time=time.time(), rule=rule, run=run, tag=tag, step=int(step),
+                         wall_time=wall_time, message=message, **details)
+
+
+class RollingStats:
+    """Mean/std over the last `window` values with O(1) updates"""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def __len__(self):
+        return len(self.values)
+
+    def mean(self):
+        return self.total / len(self.values)
+
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(max(self.total_sq / n - (self.total / n) ** 2, 0.0))
+
+
+# ---------------------------------------------------------------------------
+# Rules: update() sees every new point of a run and returns an Alert or None
+# ---------------------------------------------------------------------------
+
+class NonFiniteRule:
+    """NaN/inf in any tag; fires once per tag until the tag is finite again"""
+
+    name = 'nonfinite'
+
+    def __init__(self, run, context, tags=None):
+        self.run = run
+        self.tags = set(tags) if tags else None
+        self.bad = set()
+
+    def update(self, tag, step, wall_time, value):
+        if self.tags is not None and tag not in self.tags:
+            return None
+        if math.isfinite(value):
+            self.bad.discard(tag)
+            return None
+        if tag in self.bad:
+            return None
+        self.bad.add(tag)
+        return Alert(self.name, self.run, tag, step, wall_time, f"{tag} is {value}")
+
+
+class ZScoreRule:
+    """Value far outside the rolling baseline of the previous `window` points"""
+
+    name = 'zscore'
+
+    def __init__(self, run, context, tag, z=8.0, window=100, direction='both', min_points=20,
+                 min_change=0.0, cooldown=None):
+        self.run = run
+        self.tag = tag
+        self.z = z
+        self.direction = direction
+        self.min_points = min_points
+        # Relative change from the baseline mean also required, so a near-constant series
+        # (tiny std) does not alert on harmless wiggles
+        self.min_change = min_change
+        self.cooldown = window if cooldown is None else cooldown
+        self.stats = RollingStats(window)
+        self.quiet = 0
+
+    def update(self, tag, step, wall_time, value):
+        if tag != self.tag or not math.isfinite(value):
+            return None
+        alert = None
+        if len(self.stats) >= self.min_points and self.quiet == 0:
+            mean, std = self.stats.mean(), self.stats.std()
+            score = (value - mean) / std if std > 0 else 0.0
+            change = abs(value - mean) / abs(mean) if mean else math.inf
+            hit = {'up': score > self.z, 'down': score < -self.z}.get(self.direction, abs(score) > self.z)
+            if hit and change >= self.min_change:
+                self.quiet = self.cooldown
+                alert = Alert(self.name, self.run, tag, step, wall_time,
+                              f"{tag} = {value:.4g} is {score:+.1f} sigma from rolling mean {mean:.4g}",
+                              value=value, baseline_mean=mean, baseline_std=std, score=score)
+        elif self.quiet:
+            self.quiet -= 1
+        self.stats.push(value)
+        return alert
+
+
+def curriculum_thresholds(config):
+    """{parameter: [(lesson name, measure, threshold, signal_smoothing)]} for curricula with completion criteria"""
+    curricula = {}
+    for param, spec in ((config or {}).get('environment_parameters') or {}).items():
+        lessons = (spec or {}).get('curriculum') if isinstance(spec, dict) else None
+        if not lessons:
+            continue
+        entries = []
+        for lesson in lessons:
+            criteria = lesson.get('completion_criteria') or {}
+            entries.append((lesson.get('name'), criteria.get('measure'), criteria.get('threshold'),
+                            bool(criteria.get('signal_smoothing'))))
+        curricula[param] = entries
+    return curricula
+
+
+class PlateauRule:
+    """Reward still below the current lesson's threshold `patience_steps` after its last improvement"""
+
+    name = 'plateau'
+
+    def __init__(self, run, context, patience_steps=1000000, tag=REWARD_TAG):
+        self.run = run
+        self.tag = tag
+        self.patience = patience_steps
+        self.curricula = curriculum_thresholds(context.get('config'))
+        # None until the run logs the lesson; attaching mid-run must not assume lesson 0
+        self.lessons = {param: None for param in self.curricula}
+        self.smoothed = None
+        self.best = -math.inf
+        self.best_step = None
+        self.fired = set()
+
+    def _reset(self, step):
+        self.best = -math.inf
+        self.best_step = step
+
+    def update(self, tag, step, wall_time, value):
+        if tag.startswith(LESSON_PREFIX):
+            param = tag[len(LESSON_PREFIX):]
+            if param in self.lessons and math.isfinite(value) and int(value) != self.lessons[param]:
+                self.lessons[param] = int(value)
+                self._reset(step)
+            return None
+        if tag != self.tag or not math.isfinite(value) or not self.curricula:
+            return None
+        if self.best_step is None:
+            self.best_step = step
+
+        # Same smoothing ML-Agents applies before comparing against the threshold
+        self.smoothed = value if self.smoothed is None else 0.25 * self.smoothed + 0.75 * value
+        if self.smoothed > self.best:
+            self.best, self.best_step = self.smoothed, step
+            return None
+
+        for param, lesson in self.lessons.items():
+            lessons = self.curricula[param]
+            if lesson is None or lesson >= len(lessons):
+                continue
+            name, measure, threshold, smoothing = lessons[lesson]
+            # The last lesson of a curriculum never completes, and 'progress' criteria are not reward-based
+            if lesson == len(lessons) - 1 or measure != 'reward' or threshold is None:
+                continue
+            key = (param, lesson)
+            measured = self.smoothed if smoothing else value
+            if key in self.fired or measured >= threshold or step - self.best_step < self.patience:
+                continue
+            self.fired.add(key)
+            return Alert(self.name, self.run, tag, step, wall_time,
+                         f"{param} lesson {lesson} ({name}): reward {measured:.2f} below threshold "
+                         f"{threshold} with no improvement for {step - self.best_step} steps",
+                         parameter=param, lesson=lesson, threshold=threshold, measured=measured,
+                         best=self.best, best_step=int(self.best_step))
+        return None
+
+
+class ThroughputRule:
+    """Steps per second between summaries falling below a fraction of the run's typical rate"""
+
+    name = 'throughput'
+
+    def __init__(self, run, context, tag=REWARD_TAG, drop_fraction=0.3, warmup=20, consecutive=3, alpha=0.05,
+                 downtime_factor=10.0):
+        self.run = run
+        self.tag = tag
+        self.drop_fraction = drop_fraction
+        self.warmup = warmup
+        # Single slow intervals (checkpoint/ONNX export) are normal; only a sustained drop alerts
+        self.consecutive = consecutive
+        self.alpha = alpha
+        # Longer gaps than this many typical intervals are stops/resumes, not slow training
+        self.downtime_factor = downtime_factor
+        self.last = None
+        self.rate = None
+        self.interval = None
+        self.samples = 0
+        self.slow_count = 0
+
+    def update(self, tag, step, wall_time, value):
+        if tag != self.tag:
+            return None
+        previous, self.last = self.last, (step, wall_time)
+        if previous is None or step <= previous[0] or wall_time <= previous[1]:
+            return None
+        seconds = wall_time - previous[1]
+        if self.interval is not None and seconds > self.downtime_factor * self.interval:
+            return None
+        rate = (step - previous[0]) / seconds
+        self.samples += 1
+        if self.rate is None:
+            self.rate, self.interval = rate, seconds
+            return None
+
+        alert = None
+        if self.samples > self.warmup and rate < self.drop_fraction * self.rate:
+            self.slow_count += 1
+            if self.slow_count == self.consecutive:
+                alert = Alert(self.name, self.run, tag, step, wall_time,
+                              f"throughput {rate:.0f} steps/s, typical {self.rate:.0f} steps/s",
+                              rate=rate, typical_rate=self.rate)
+            # A slow stretch must not drag the baseline down with it
+            return alert
+        self.slow_count = 0
+        self.rate += self.alpha * (rate - self.rate)
+        self.interval += self.alpha * (seconds - self.interval)
+        return alert
+
+
+RULE_TYPES = {
+    'nonfinite': NonFiniteRule,
+    'zscore': ZScoreRule,
+    'plateau': PlateauRule,
+    'throughput': ThroughputRule,
+}
+
+
+def build_rules(run, context, specs):
+    rules = []
+    for spec in specs:
+        spec = dict(spec)
+        rules.append(RULE_TYPES[spec.pop('type')](run, context, **spec))
+    return rules
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+class JsonlSink:
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, alert):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + "\n")
+
+
+class WebhookSink:
+    """POST each alert as JSON; failures are reported and dropped so monitoring keeps going"""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except OSError as exc:
+            print(f"  webhook failed: {exc}")
+
+
+# ---------------------------------------------------------------------------
+# Monitor
+# ---------------------------------------------------------------------------
+
+class AnomalyMonitor:
+    """Tails every active run and feeds new points through per-run rule instances"""
+
+    def __init__(self, results_dir="results", specs=None, sinks=(), active_seconds=3600.0, replay=False,
+                 rescan_interval=60.0):
+        self.results_dir = results_dir
+        self.specs = DEFAULT_RULES if specs is None else specs
+        self.sinks = list(sinks)
+        self.active_seconds = active_seconds
+        self.replay = replay
+        self.rescan_interval = rescan_interval
+        self.tails = {}   # event file path -> EventFileTail
+        self.rules = {}   # run_id -> [rules]
+        self.run_files = {}   # run_id -> event files, refreshed every rescan_interval
+        self.last_scan = None
+        self.points = 0
+        # Files present at start hold history; files created later (resumes, new runs) are read from offset 0
+        self.existing = set() if replay else {
+            path for files in find_run_files(results_dir).values() for path in files}
+
+    def _is_active(self, files, now):
+        try:
+            return now - max(os.path.getmtime(p) for p in files) <= self.active_seconds
+        except OSError:
+            return False
+
+    def _build_rules(self, run_id):
+        run_dir = os.path.join(self.results_dir, run_id)
+        context = {'config': load_run_config(run_dir), 'run_dir': run_dir}
+        return build_rules(run_id, context, self.specs)
+
+    def _start_tail(self, path):
+        tail = EventFileTail(path)
+        if path in self.existing:
+            # History is not re-checked; only points appended from now on are
+            tail.offset = os.path.getsize(path)
+        return tail
+
+    def _feed(self, run_id, points):
+        alerts = []
+        rules = self.rules[run_id]
+        for tag, step, wall_time, value in points:
+            self.points += 1
+            for rule in rules:
+                alert = rule.update(tag, step, wall_time, value)
+                if alert is not None:
+                    alerts.append(alert)
+        return alerts
+
+    def _read_run(self, run_id):
+        """Alerts from the points appended to a run's event files since the last read"""
+        tails = []
+        for path in self.run_files.get(run_id, []):
+            tail = self.tails.get(path)
+            if tail is None:
+                tail = self.tails[path] = self._start_tail(path)
+            tails.append(tail)
+        run_points = [tail.read_new() for tail in tails]
+        if any(tail.restarted for tail in tails):
+            # A file was rewritten in place: rebuild the rule state from the whole run
+            # without alerting again on points that were already checked
+            self.rules[run_id] = self._build_rules(run_id)
+            for tail in tails:
+                tail.offset = 0
+            self._feed(run_id, [p for tail in tails for p in tail.read_new()])
+            return []
+        return self._feed(run_id, [p for points in run_points for p in points])
+
+    def poll(self):
+        """One pass over the monitored runs; returns the alerts raised by newly appended points
+
+        results/ is walked for new runs and event files only every
+        rescan_interval; in between a pass costs one stat per tailed file plus
+        the new records. A run that fails to read is reported and retried on
+        the next pass.
+        """
+        if self.last_scan is None or time.monotonic() - self.last_scan >= self.rescan_interval:
+            self.run_files = find_run_files(self.results_dir)
+            self.last_scan = time.monotonic()
+            now = time.time()
+            for run_id, files in self.run_files.items():
+                if run_id not in self.rules and (self.replay or self._is_active(files, now)):
+                    self.rules[run_id] = self._build_rules(run_id)
+        alerts = []
+        for run_id in sorted(self.rules):
+            try:
+                alerts.extend(self._read_run(run_id))
+            except (OSError, ValueError) as exc:
+                print(f"  error reading {run_id}: {exc}")
+        for alert in alerts:
+            for sink in self.sinks:
+                sink.emit(alert)
+        return alerts
+
+
+def load_rule_specs(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming anomaly alerts for runs in results/")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--rules", help="JSON file with a list of rule specs (default: built-in rules)")
+    parser.add_argument("--log", default="alerts.jsonl", help="JSONL alert log")
+    parser.add_argument("--webhook", help="also POST each alert as JSON to this URL")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between polls")
+    parser.add_argument("--active-seconds", type=float, default=3600.0,
+                        help="runs whose event files changed within this window are monitored")
+    parser.add_argument("--replay", action="store_true",
+                        help="also check existing history and include inactive runs")
+    parser.add_argument("--rescan-interval", type=float, default=60.0,
+                        help="seconds between walks of results/ for new runs and event files")
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    args = parser.parse_args()
+
+    sinks = [JsonlSink(args.log)]
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    specs = load_rule_specs(args.rules) if args.rules else None
+    monitor = AnomalyMonitor(args.results_dir, specs, sinks, args.active_seconds, args.replay, args.rescan_interval)
+
+    print(f"Monitoring {args.results_dir} (alerts -> {args.log}{', ' + args.webhook if args.webhook else ''})")
+    try:
+        while True:
+            start = time.perf_counter()
+            alerts = monitor.poll()
+            elapsed = time.perf_counter() - start
+            for alert in alerts:
+                print(f"  [{alert['rule']}] {alert['run']} step {alert['step']}: {alert['message']}")
+            print(f"{time.strftime('%H:%M:%S')} {len(monitor.rules)} runs, {monitor.points} points, "
+                  f"{len(alerts)} new alerts ({elapsed * 1e3:.0f} ms)")
+            if args.once:
+                break
+            time.sleep(max(0.0, args.interval - elapsed))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,72 @@
 #!/usr/bin/env python3
 """
 Basic CSV Analysis without pandas dependency
+
+The CSV analysis uses only the standard library. The Random/Heuristic
+baseline rows are measured on drone_surrogate.py, which needs NumPy and runs
+--baseline-episodes episodes per policy (default 1000); pass 0, or run without
+NumPy installed, to leave them out.
 """
 
+import argparse
 import csv
 import statistics
 import os
 
+def load_baselines(n_episodes):
+    """Surrogate Random/Heuristic metrics, or {} when skipped or NumPy is missing"""
+    if n_episodes <= 0:
+        return {}
+    try:
+        from drone_surrogate import measure_baselines
+    except ImportError as e:
+        print(f"Skipping baselines ({e})")
+        return {}
+    return measure_baselines(n_episodes)
+
+def _mean_std(stats, fmt):
+    if not stats or not stats.get('count'):
+        return "--"
+    return f"{stats['mean']:{fmt}}$\\pm${stats['std']:{fmt}}"
+
+def format_comparison_table(policies,
+                            caption="Test Episode Performance Comparison (mean $\\pm$ std)",
+                            label="tab:results", name_header="Policy",
+                            reward_key='Reward', reward_header="Reward",
+                            collision_key='GroundCollision', highlight="PPO (Ours)"):
+    """LaTeX results table, one row per {name: {metric: {'mean', 'std', 'count'}}}
+
+    Shared by this script, extract_comparison_metrics.py and report_build.py.
+    Metrics without samples print as --; the highlight row is set in bold.
+    """
+    lines = [
+        "\\begin{table}[ht]",
+        "\\centering",
+        f"\\caption{{{caption}}}",
+        f"\\label{{{label}}}",
+        "\\begin{tabular}{|l|c|c|c|c|c|}",
+        "\\hline",
+        f"\\textbf{{{name_header}}} & \\textbf{{{reward_header}}} & "
+        "\\textbf{Targets} & \\textbf{Efficiency} & \\textbf{Stability} & \\textbf{Collisions} \\\\",
+        "\\hline",
+    ]
+    for name, results in policies.items():
+        results = results or {}
+        bold_start = "\\textbf{" if name == highlight else ""
+        bold_end = "}" if name == highlight else ""
+        collisions = results.get(collision_key) or {}
+        cells = [
+            name,
+            _mean_std(results.get(reward_key), '.1f'),
+            _mean_std(results.get('TargetsFound'), '.1f'),
+            _mean_std(results.get('PathEfficiency'), '.2f'),
+            _mean_std(results.get('AngleStability'), '.2f'),
+            f"{collisions['mean'] * 100:.0f}\\%" if collisions.get('count') else "--",
+        ]
+        lines.append(" & ".join(f"{bold_start}{c}{bold_end}" for c in cells) + " \\\\")
+    lines += ["\\hline", "\\end{tabular}", "\\end{table}"]
+    return "\n".join(lines) + "\n"
+
 def read_csv_basic(filename):
     """Read CSV file manually without pandas"""
     if not os.path.exists(filename):
@@ -102,7 +162,7 @@ def analyze_drone_csv():
     
     return metrics_analysis
 
-def generate_table_latex():
+def generate_table_latex(baseline_episodes=1000):
     """Generate LaTeX table format"""
     
     # Analyze your actual data
@@ -112,65 +172,13 @@ def generate_table_latex():
     print("LATEX TABLE OUTPUT")
     print("=" * 60)
     
-    # Baseline estimates (you can adjust these)
-    baselines = {
-        'Random': {
-            'Reward': {'mean': -45, 'std': 15},
-            'TargetsFound': {'mean': 0.2, 'std': 0.4},
-            'PathEfficiency': {'mean': 0.05, 'std': 0.03},
-            'AngleStability': {'mean': 0.1, 'std': 0.05},
-            'CollisionRate': {'mean': 0.92, 'std': 0.1}
-        },
-        'Heuristic': {
-            'Reward': {'mean': 25, 'std': 30},
-            'TargetsFound': {'mean': 1.8, 'std': 1.1},
-            'PathEfficiency': {'mean': 0.35, 'std': 0.20},
-            'AngleStability': {'mean': 0.6, 'std': 0.2},
-            'CollisionRate': {'mean': 0.28, 'std': 0.15}
-        }
-    }
+    # Baselines measured on the vectorized surrogate environment
+    baselines = load_baselines(baseline_episodes)
     
-    print("""
-\\begin{table}[ht]
-\\centering
-\\caption{Test Episode Performance Comparison (mean $\\pm$ std)}
-\\label{tab:results}
-\\begin{tabular}{|l|c|c|c|c|c|}
-\\hline
-\\textbf{Policy} & \\textbf{Reward} & \\textbf{Targets} & \\textbf{Efficiency} & \\textbf{Stability} & \\textbf{Collisions} \\\\
-\\hline""")
-    
-    # Print baseline rows
-    for policy, metrics in baselines.items():
-        print(f"{policy} & "
-              f"${metrics['Reward']['mean']:.0f}\\pm{metrics['Reward']['std']:.0f}$ & "
-              f"${metrics['TargetsFound']['mean']:.1f}\\pm{metrics['TargetsFound']['std']:.1f}$ & "
-              f"${metrics['PathEfficiency']['mean']:.2f}\\pm{metrics['PathEfficiency']['std']:.2f}$ & "
-              f"${metrics['AngleStability']['mean']:.2f}\\pm{metrics['AngleStability']['std']:.2f}$ & "
-              f"{metrics['CollisionRate']['mean']*100:.0f}\\% \\\\")
-    
-    # Print PPO results if available
-    if ppo_results:
-        reward = ppo_results.get('Reward', {'mean': 0, 'std': 0})
-        targets = ppo_results.get('TargetsFound', {'mean': 0, 'std': 0})
-        efficiency = ppo_results.get('PathEfficiency', {'mean': 0, 'std': 0})
-        stability = ppo_results.get('AngleStability', {'mean': 0, 'std': 0})
-        
-        # Calculate collision rate from ground collision if available
-        collision_rate = ppo_results.get('GroundCollision', {'mean': 0})['mean']
-        
-        print(f"\\textbf{{PPO (Ours)}} & "
-              f"\\textbf{{{reward['mean']:.0f}$\\pm${reward['std']:.0f}}} & "
-              f"\\textbf{{{targets['mean']:.1f}$\\pm${targets['std']:.1f}}} & "
-              f"\\textbf{{{efficiency['mean']:.2f}$\\pm${efficiency['std']:.2f}}} & "
-              f"\\textbf{{{stability['mean']:.2f}$\\pm${stability['std']:.2f}}} & "
-              f"\\textbf{{{collision_rate*100:.0f}\\%}} \\\\")
-    else:
-        print("\\textbf{PPO (Ours)} & \\textbf{TBD} & \\textbf{TBD} & \\textbf{TBD} & \\textbf{TBD} & \\textbf{TBD} \\\\")
-    
-    print("""\\hline
-\\end{tabular}
-\\end{table}""")
+    policies = dict(baselines)
+    policies["PPO (Ours)"] = ppo_results or {}
+    print()
+    print(format_comparison_table(policies), end="")
     
     # Success rate analysis
     print("\n" + "=" * 60)
@@ -182,8 +190,12 @@ def generate_table_latex():
         success_rate = (targets_mean / 5.0) * 100
         print(f"PPO Average Targets: {targets_mean:.2f}/5 ({success_rate:.1f}% completion rate)")
     
-    print(f"Random Average: {baselines['Random']['TargetsFound']['mean']}/5 ({baselines['Random']['TargetsFound']['mean']/5*100:.1f}%)")
-    print(f"Heuristic Average: {baselines['Heuristic']['TargetsFound']['mean']}/5 ({baselines['Heuristic']['TargetsFound']['mean']/5*100:.1f}%)")
+    for policy, metrics in baselines.items():
+        print(f"{policy} Average: {metrics['TargetsFound']['mean']:.2f}/5 ({metrics['TargetsFound']['mean']/5*100:.1f}%)")
 
 if __name__ == "__main__":
-    generate_table_latex()
+    parser = argparse.ArgumentParser(description="Analyze drone training CSV and print the LaTeX results table")
+    parser.add_argument("--baseline-episodes", type=int, default=1000,
+                        help="surrogate episodes per baseline policy (0 skips the NumPy baselines)")
+    args = parser.parse_args()
+    generate_table_latex(args.baseline_episodes)
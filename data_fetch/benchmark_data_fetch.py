@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the data_fetch pipeline
+
+Generates a synthetic results/ tree, then times and memory-profiles each
+pipeline stage (event reading, step alignment, CSV write, the analyze_*
+summaries and MetricExtractor.generate_comparison_table). Every run is
+appended to a JSON-lines history so versions can be compared.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import runpy
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from synthetic_events import generate_tree
+from tfevents import find_event_files, read_scalar_points
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PRESETS = {
+    'small': dict(n_runs=2, max_steps=1_000_000, summary_freq=10000, n_files=1),
+    'medium': dict(n_runs=4, max_steps=10_000_000, summary_freq=10000, n_files=2),
+    'large': dict(n_runs=8, max_steps=30_000_000, summary_freq=5000, n_files=3, truncate_tail=True),
+}
+
+
+def _quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def measure(fn, *args, repeat=1, memory=True):
+    """Best-of-repeat wall time plus tracemalloc peak from a separate pass"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = _quiet(fn, *args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    stats = {'seconds': best}
+    if memory:
+        tracemalloc.start()
+        _quiet(fn, *args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats['peak_mb'] = peak / 1e6
+    return result, stats
+
+
+def _run_analysis_script(script, csv_path, csv_name):
+    workdir = tempfile.mkdtemp()
+    try:
+        shutil.copy(csv_path, os.path.join(workdir, csv_name))
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            runpy.run_path(os.path.join(SCRIPT_DIR, script), run_name="__main__")
+        finally:
+            os.chdir(cwd)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_benchmark(results_dir, run_ids, behavior="MyAgent", repeat=1, memory=True, baseline_episodes=200):
+    """Time every stage over the given runs and return {stage: stats}"""
+    from fetch_data import align_metrics, load_events
+    from extract_comparison_metrics import MetricExtractor
+
+    stages = {}
+    behavior_dirs = [os.path.join(results_dir, run_id, behavior) for run_id in run_ids]
+    input_bytes = sum(os.path.getsize(p) for run_id in run_ids
+                      for p in find_event_files(os.path.join(results_dir, run_id)))
+
+    def read_tfevents():
+        return sum(len(read_scalar_points(p)[0]) for run_id in run_ids
+                   for p in find_event_files(os.path.join(results_dir, run_id)))
+
+    points, stats = measure(read_tfevents, repeat=repeat, memory=memory)
+    stages['read_tfevents'] = dict(stats, rows=points, bytes=input_bytes)
+
+    accumulators, stats = measure(lambda: [load_events(d) for d in behavior_dirs], repeat=repeat, memory=memory)
+    stages['read_event_accumulator'] = dict(stats, rows=points, bytes=input_bytes)
+
+    frames, stats = measure(lambda: [align_metrics(ea) for ea in accumulators], repeat=repeat, memory=memory)
+    stages['align'] = dict(stats, rows=sum(len(df) for df in frames))
+
+    csv_dir = tempfile.mkdtemp()
+    try:
+        csv_paths = [os.path.join(csv_dir, f"{run_id}_training_data.csv") for run_id in run_ids]
+
+        def write_csvs():
+            for df, path in zip(frames, csv_paths):
+                df.to_csv(path, index=False)
+
+        _, stats = measure(write_csvs, repeat=repeat, memory=memory)
+        stages['csv_write'] = dict(stats, rows=sum(len(df) for df in frames),
+                                   bytes=sum(os.path.getsize(p) for p in csv_paths))
+
+        _, stats = measure(_run_analysis_script, 'analyze_training_data.py', csv_paths[0],
+                           'drone4_training_data.csv', repeat=repeat, memory=memory)
+        stages['analyze_training_data'] = dict(stats, rows=len(frames[0]))
+
+        _, stats = measure(_run_analysis_script, 'analyze_test_data.py', csv_paths[0],
+                           'drone4_test_data.csv', repeat=repeat, memory=memory)
+        stages['analyze_test_data'] = dict(stats, rows=len(frames[0]))
+    finally:
+        shutil.rmtree(csv_dir, ignore_errors=True)
+
+    extractor = MetricExtractor(results_dir=results_dir, baseline_episodes=baseline_episodes)
+    _, stats = measure(extractor.generate_comparison_table, run_ids[:1], repeat=repeat, memory=memory)
+    stages['comparison_table'] = stats
+
+    return stages
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_file):
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(previous, current, threshold=0.2):
+    """Print per-stage deltas against a previous history entry; returns regressed stage names"""
+    regressions = []
+    print(f"\nComparison against {previous.get('revision')} ({previous.get('timestamp')}):")
+    for stage, stats in current['stages'].items():
+        before = previous['stages'].get(stage)
+        if not before:
+            print(f"  {stage:24s}: new stage")
+            continue
+        change = stats['seconds'] / before['seconds'] - 1.0 if before['seconds'] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(stage)
+        print(f"  {stage:24s}: {before['seconds']:8.3f}s -> {stats['seconds']:8.3f}s ({change * 100:+.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data_fetch pipeline on synthetic event files")
+    parser.add_argument("--preset", choices=list(PRESETS), default="small")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--history", default="benchmarks/data_fetch_history.jsonl")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown fraction reported as a regression")
+    parser.add_argument("--keep-dir", help="generate into this directory and keep it")
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    results_dir = args.keep_dir or tempfile.mkdtemp(prefix="data_fetch_bench_")
+    try:
+        print(f"Generating '{args.preset}' synthetic tree in {results_dir} ...")
+        start = time.perf_counter()
+        tree = generate_tree(results_dir, **preset)
+        print(f"Generated {len(tree)} runs in {time.perf_counter() - start:.1f}s")
+
+        stages = run_benchmark(results_dir, sorted(tree), repeat=args.repeat, memory=not args.no_memory)
+    finally:
+        if not args.keep_dir:
+            shutil.rmtree(results_dir, ignore_errors=True)
+
+    print("\n=== STAGE TIMINGS ===")
+    for stage, stats in stages.items():
+        extra = f"  peak {stats['peak_mb']:8.1f} MB" if 'peak_mb' in stats else ""
+        rows = f"  rows {stats['rows']}" if 'rows' in stats else ""
+        print(f"{stage:24s}: {stats['seconds']:8.3f}s{extra}{rows}")
+
+    entry = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'preset': args.preset,
+        'params': preset,
+        'stages': stages,
+    }
+    previous = [e for e in load_history(args.history) if e.get('preset') == args.preset]
+    if previous:
+        compare(previous[-1], entry, args.threshold)
+
+    os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"\nAppended results to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Change-point detection on reward/entropy curves
+
+Runs PELT (pruned exact linear time) over Reward, Environment/Cumulative
+Reward and Policy/Entropy for every run, and splits the step-valued
+Environment/Lesson Number/* tags exactly where the lesson changes. Each
+series is segmented and summarized; reward segments whose mean drops sharply
+below the previous one are reported as collapses with pre/post stats.
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tfevents import find_runs, load_scalars
+
+CURVE_TAGS = [
+    'Reward',
+    'Environment/Cumulative Reward',
+    'Policy/Entropy',
+]
+REWARD_TAGS = {'Reward', 'Environment/Cumulative Reward'}
+LESSON_PREFIX = 'Environment/Lesson Number/'
+
+
+# Noise scale floor as a fraction of the series' overall std, so smooth trends
+# (entropy decay) are not cut into dozens of tiny mean-shift steps
+SIGMA_FLOOR = 0.1
+
+
+def _noise_sigma(values):
+    """Robust noise scale from first differences (insensitive to the shifts we are looking for)"""
+    diffs = np.diff(values)
+    if len(diffs) == 0:
+        return 1.0
+    mad = np.median(np.abs(diffs - np.median(diffs)))
+    sigma = max(1.4826 * mad / np.sqrt(2.0), SIGMA_FLOOR * np.std(values))
+    return sigma if sigma > 0 else 1.0
+
+
+def pelt(values, penalty=None, min_size=5, cost="mean"):
+    """Indices where new segments start (excluding 0), by PELT with a Gaussian cost
+
+    cost='mean' detects mean shifts with the noise variance estimated once;
+    cost='meanvar' detects changes in mean and/or variance. The default
+    penalty is BIC-like (a few log n) scaled to the cost.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    if n < 2 * min_size:
+        return np.array([], dtype=np.int64)
+
+    s1 = np.concatenate([[0.0], np.cumsum(x)])
+    s2 = np.concatenate([[0.0], np.cumsum(x * x)])
+    if cost == "meanvar":
+        var_floor = (_noise_sigma(x) ** 2) * 1e-2 + 1e-12
+
+        def segment_cost(starts, end):
+            length = end - starts
+            mean = (s1[end] - s1[starts]) / length
+            var = (s2[end] - s2[starts]) / length - mean * mean
+            return length * np.log(np.maximum(var, var_floor))
+
+        if penalty is None:
+            penalty = 4.0 * np.log(n)
+    else:
+        inv_var = 1.0 / (_noise_sigma(x) ** 2)
+
+        def segment_cost(starts, end):
+            length = end - starts
+            total = s1[end] - s1[starts]
+            return (s2[end] - s2[starts] - total * total / length) * inv_var
+
+        if penalty is None:
+            penalty = 10.0 * np.log(n)
+
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    last_change = np.zeros(n + 1, dtype=np.int64)
+    candidates = np.array([0], dtype=np.int64)
+
+    for end in range(min_size, n + 1):
+        valid = end - candidates >= min_size
+        if valid.any():
+            starts = candidates[valid]
+            totals = best[starts] + segment_cost(starts, end)
+            i = np.argmin(totals)
+            best[end] = totals[i] + penalty
+            last_change[end] = starts[i]
+            # Prune candidates that can never be optimal again (Killick et al. 2012, K = 0)
+            keep = ~valid
+            keep[valid] = totals <= best[end]
+            candidates = candidates[keep]
+        if np.isfinite(best[end]):
+            candidates = np.append(candidates, end)
+
+    changes = []
+    pos = n
+    while pos > 0:
+        pos = last_change[pos]
+        if pos > 0:
+            changes.append(pos)
+    return np.array(changes[::-1], dtype=np.int64)
+
+
+def lesson_changes(values):
+    """Exact change indices of a piecewise-constant lesson series"""
+    return np.flatnonzero(np.diff(np.asarray(values)) != 0) + 1
+
+
+def segment_stats(steps, values, changes):
+    """Per-segment step range, size, mean, std, min and max via reduceat"""
+    if len(values) == 0:
+        return []
+    bounds = np.concatenate([[0], changes]).astype(np.int64)
+    counts = np.diff(np.concatenate([bounds, [len(values)]]))
+    sums = np.add.reduceat(values, bounds)
+    sq = np.add.reduceat(values * values, bounds)
+    means = sums / counts
+    stds = np.sqrt(np.maximum(sq / counts - means * means, 0.0))
+    mins = np.minimum.reduceat(values, bounds)
+    maxs = np.maximum.reduceat(values, bounds)
+    ends = np.concatenate([bounds[1:], [len(values)]]) - 1
+    return [
+        {
+            'start_step': int(steps[b]),
+            'end_step': int(steps[e]),
+            'points': int(c),
+            'mean': float(m),
+            'std': float(s),
+            'min': float(lo),
+            'max': float(hi),
+        }
+        for b, e, c, m, s, lo, hi in zip(bounds, ends, counts, means, stds, mins, maxs)
+    ]
+
+
+def find_collapses(segments, sigma, drop_sigmas=4.0, drop_fraction=0.25):
+    """Segments whose mean falls well below the previous segment's, with pre/post stats"""
+    collapses = []
+    for i in range(1, len(segments)):
+        before, after = segments[i - 1], segments[i]
+        drop = before['mean'] - after['mean']
+        scale = max(abs(before['mean']), sigma)
+        if drop > drop_sigmas * sigma and drop > drop_fraction * scale:
+            recovered = next((s['start_step'] for s in segments[i + 1:]
+                              if s['mean'] >= before['mean'] - sigma), None)
+            collapses.append({
+                'step': after['start_step'],
+                'drop': float(drop),
+                'pre': before,
+                'post': after,
+                'recovered_at_step': recovered,
+            })
+    return collapses
+
+
+def lesson_summaries(lesson_series, curves):
+    """Stats of each curve tag inside every lesson's step range"""
+    summaries = {}
+    for tag, series in lesson_series.items():
+        changes = lesson_changes(series.values)
+        bounds = np.concatenate([[0], changes, [len(series.steps)]])
+        lessons = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            first_step = series.steps[start]
+            next_step = series.steps[end] if end < len(series.steps) else np.inf
+            entry = {
+                'lesson': int(series.values[start]),
+                'start_step': int(first_step),
+                'end_step': int(series.steps[end - 1]),
+            }
+            for curve_tag, curve in curves.items():
+                lo, hi = np.searchsorted(curve.steps, [first_step, next_step], side='left')
+                window = curve.values[lo:hi]
+                if len(window):
+                    entry[curve_tag] = {'mean': float(window.mean()), 'std': float(window.std()),
+                                        'final': float(window[-1]), 'points': int(len(window))}
+            lessons.append(entry)
+        summaries[tag[len(LESSON_PREFIX):]] = lessons
+    return summaries
+
+
+def analyze_run(run_dir, tags=None, penalty=None, min_size=5, cost="mean"):
+    """Segments, collapses and per-lesson stats for one run"""
+    series = load_scalars(run_dir)
+    tags = tags or CURVE_TAGS
+    curves = {tag: series[tag] for tag in tags if tag in series and len(series[tag].steps)}
+    lessons = {tag: s for tag, s in series.items() if tag.startswith(LESSON_PREFIX) and len(s.steps)}
+
+    result = {'tags': {}, 'collapses': {}, 'lessons': lesson_summaries(lessons, curves)}
+    for tag, s in curves.items():
+        values = s.values.astype(np.float64)
+        finite = np.isfinite(values)
+        steps, values = s.steps[finite], values[finite]
+        changes = pelt(values, penalty, min_size, cost)
+        segments = segment_stats(steps, values, changes)
+        result['tags'][tag] = segments
+        if tag in REWARD_TAGS:
+            found = find_collapses(segments, _noise_sigma(values))
+            if found:
+                result['collapses'][tag] = found
+    for tag, s in lessons.items():
+        result['tags'][tag] = segment_stats(s.steps, s.values.astype(np.float64), lesson_changes(s.values))
+    return result
+
+
+def analyze_tree(results_dir="results", tags=None, penalty=None, min_size=5, cost="mean", workers=None, run_ids=None):
+    runs = find_runs(results_dir)
+    if run_ids:
+        runs = {r: d for r, d in runs.items() if r in run_ids}
+    names = list(runs)
+    args = ([runs[r] for r in names], [tags] * len(names), [penalty] * len(names),
+            [min_size] * len(names), [cost] * len(names))
+    if workers == 1 or len(names) <= 1:
+        results = list(map(analyze_run, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_run, *args))
+    return dict(zip(names, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Locate curriculum transitions and collapses with PELT")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--runs", nargs="+", help="restrict to these run ids")
+    parser.add_argument("--tags", nargs="+", default=CURVE_TAGS)
+    parser.add_argument("--penalty", type=float, help="PELT penalty per change point (default scales with log n)")
+    parser.add_argument("--min-size", type=int, default=5, help="minimum summary points per segment")
+    parser.add_argument("--cost", choices=["mean", "meanvar"], default="mean")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", default="change_points.json")
+    args = parser.parse_args()
+
+    report = analyze_tree(args.results_dir, args.tags, args.penalty, args.min_size, args.cost, args.workers, args.runs)
+
+    for run_id, result in report.items():
+        print(f"\n{run_id}")
+        for tag, segments in result['tags'].items():
+            changes = ', '.join(str(s['start_step']) for s in segments[1:8])
+            more = " ..." if len(segments) > 8 else ""
+            print(f"  {tag:35s}: {len(segments):3d} segments  changes at [{changes}{more}]")
+        for tag, collapses in result['collapses'].items():
+            for c in collapses:
+                recovery = f"recovered at {c['recovered_at_step']}" if c['recovered_at_step'] is not None else "no recovery"
+                print(f"  COLLAPSE {tag} at step {c['step']}: {c['pre']['mean']:.3f} -> {c['post']['mean']:.3f} ({recovery})")
+        for parameter, lessons in result['lessons'].items():
+            print(f"  lessons {parameter}: " + ', '.join(f"{l['lesson']}@{l['start_step']}" for l in lessons))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nChange points saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Unified data_fetch command
+
+    python data_fetch latest
+    python data_fetch fetch drone6.1 [--test] [--engine tensorboard]
+    python data_fetch categories drone6.1 --type training
+    python data_fetch analyze drone6.1_training_data.csv
+    python data_fetch compare drone6.1 drone7.2
+    python data_fetch startup-check
+
+Replaces the hard-coded run_id/metric_type scripts (fetch_data.py,
+fetch_test_data.py, fetch_metrics_by_category.py, analyze_*.py,
+latest_id.py) with one entry point. Module level imports are stdlib only:
+numpy/pandas are imported by the code paths that need them and TensorBoard
+only with --engine tensorboard. compare keeps per-run summaries in a cache
+keyed by the event files' sizes and mtimes, so repeated queries parse
+nothing. startup-check measures cold-start time against a budget.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = ".data_fetch_cache"
+
+METRIC_CATEGORIES = {
+    "performance": [
+        'Reward',
+        'Environment/Cumulative Reward',
+        'Environment/Episode Length',
+        'EpisodeLength',
+        'TargetsFound',
+        'PathEfficiency',
+        'AngleStability',
+        'GroundCollision',
+    ],
+    "training": [
+        'Losses/Policy Loss',
+        'Losses/Value Loss',
+        'Losses/Pretraining Loss',
+    ],
+    "policy": [
+        'Policy/Entropy',
+        'Policy/Extrinsic Value Estimate',
+        'Policy/Extrinsic Reward',
+        'Policy/Learning Rate',
+        'Policy/Epsilon',
+        'Policy/Beta',
+    ],
+}
+
+# Modules whose import cost the fast paths must not pay
+HEAVY_MODULES = ['tensorboard', 'pandas', 'numpy', 'yaml', 'matplotlib']
+# Seconds a cached command may add on top of a bare interpreter start
+STARTUP_BUDGET = 0.15
+
+
+def _run_dir(results_dir, run_id):
+    path = os.path.join(results_dir, run_id)
+    if not os.path.isdir(path):
+        raise SystemExit(f"No run '{run_id}' in {results_dir}")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# fetch / categories
+# ---------------------------------------------------------------------------
+
+def load_tables(results_dir, run_id, tags=None, engine="tfevents"):
+    """{tag: (steps, values)} for a run; engine 'tensorboard' goes through EventAccumulator"""
+    from tfevents import find_event_files
+
+    run_dir = _run_dir(results_dir, run_id)
+    files = find_event_files(run_dir)
+    if not files:
+        raise SystemExit(f"No event files under {run_dir}")
+    if engine == "tensorboard":
+        from fetch_data import load_events
+
+        ea = load_events(os.path.dirname(files[0]))
+        names = [t for t in ea.Tags()['scalars'] if tags is None or t in tags]
+        return {t: ([e.step for e in ea.Scalars(t)], [e.value for e in ea.Scalars(t)]) for t in names}
+
+    from tfevents import load_scalars
+
+    return {t: (s.steps, s.values) for t, s in load_scalars(os.path.dirname(files[0]), tags).items()}
+
+
+def write_aligned_csv(series, path):
+    """Union-of-steps table with forward fill (same layout as fetch_data.align_metrics), no pandas"""
+    import csv
+
+    import numpy as np
+
+    tags = list(series)
+    steps = np.unique(np.concatenate([np.asarray(series[t][0], dtype=np.int64) for t in tags])) if tags else []
+    columns = []
+    for tag in tags:
+        tag_steps = np.asarray(series[tag][0], dtype=np.int64)
+        values = np.asarray(series[tag][1], dtype=np.float64)
+        order = np.argsort(tag_steps, kind='stable')
+        idx = np.searchsorted(tag_steps[order], steps, side='right') - 1
+        column = np.where(idx >= 0, values[order][np.clip(idx, 0, None)], np.nan)
+        columns.append(['' if v != v else repr(v) for v in column.tolist()])
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['step'] + tags)
+        for i, step in enumerate(np.asarray(steps).tolist()):
+            writer.writerow([step] + [column[i] for column in columns])
+    return len(steps)
+
+
+def cmd_fetch(args):
+    tags = METRIC_CATEGORIES["performance"] if args.test else args.tags
+    series = load_tables(args.results_dir, args.run, tags, args.engine)
+    output = args.output or f"{args.run}_{'test' if args.test else 'training'}_data.csv"
+    rows = write_aligned_csv(series, output)
+    print(f"Saved {rows} steps x {len(series)} tags to: {output}")
+
+
+def cmd_categories(args):
+    series = load_tables(args.results_dir, args.run, METRIC_CATEGORIES[args.type], args.engine)
+    print(f"Extracting {args.type} metrics:", list(series))
+    output = args.output or f"{args.run}_{args.type}_data.csv"
+    write_aligned_csv(series, output)
+    print(f"Saved {args.type} data to: {output}")
+
+
+# ---------------------------------------------------------------------------
+# analyze
+# ---------------------------------------------------------------------------
+
+def cmd_analyze(args):
+    import pandas as pd
+
+    df = pd.read_csv(args.csv)
+    columns = {
+        "Total Reward": "Reward",
+        "Cumulative Reward": "Environment/Cumulative Reward",
+        "Episode Length": "Environment/Episode Length",
+        "Targets Found": "TargetsFound",
+        "Path Efficiency": "PathEfficiency",
+        "Angle Stability": "AngleStability",
+        "Collision Rate (%)": "GroundCollision",
+        "Policy Entropy": "Policy/Entropy",
+    }
+    present = {label: col for label, col in columns.items() if col in df.columns}
+    scale = lambda label: 100.0 if label.endswith("(%)") else 1.0
+
+    print(f"=== Summary of {args.csv} ({len(df)} steps, {df['step'].min()} to {df['step'].max()}) ===")
+    for label, col in present.items():
+        series = df[col] * scale(label)
+        print(f"{label:22s}: mean {series.mean():9.3f}  range {series.min():9.3f} to {series.max():9.3f}")
+
+    final = df[df['step'] >= df['step'].max() * (1 - args.final_fraction)]
+    print(f"\n=== Final {args.final_fraction * 100:.0f}% ({len(final)} steps) ===")
+    for label, col in present.items():
+        print(f"{label:22s}: {final[col].mean() * scale(label):9.3f}")
+
+    if 'Reward' in df.columns:
+        best = df['Reward'].idxmax()
+        print(f"\nBest Reward: {df['Reward'].max():.3f} at step {df.loc[best, 'step']}")
+
+
+# ---------------------------------------------------------------------------
+# compare (cached)
+# ---------------------------------------------------------------------------
+
+def run_summary(run_dir, final_fraction):
+    """Final-window mean of each performance tag plus total steps"""
+    from tfevents import load_scalars
+
+    summary = {}
+    for tag, s in load_scalars(run_dir, METRIC_CATEGORIES["performance"]).items():
+        if len(s.values):
+            window = s.values[-max(1, int(len(s.values) * final_fraction)):]
+            summary[tag] = float(window.mean())
+            summary['steps'] = max(summary.get('steps', 0), int(s.steps[-1]))
+    return summary
+
+
+def cached_summaries(results_dir, run_ids, cache_dir, final_fraction):
+    """{run_id: summary}, recomputing only runs whose event files changed; returns (summaries, misses)"""
+    from tfevents import run_signature
+
+    path = os.path.join(cache_dir, "summaries.json")
+    cache = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            cache = json.load(f)
+    summaries, misses = {}, []
+    for run_id in run_ids:
+        run_dir = _run_dir(results_dir, run_id)
+        key = f"{run_id}@{final_fraction}"
+        signature = run_signature(run_dir)
+        entry = cache.get(key)
+        if entry is None or entry['signature'] != signature:
+            entry = cache[key] = {'signature': signature, 'summary': run_summary(run_dir, final_fraction)}
+            misses.append(run_id)
+        summaries[run_id] = entry['summary']
+    if misses:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(cache, f)
+    return summaries, misses
+
+
+def cmd_compare(args):
+    run_ids = args.runs or _all_runs(args.results_dir)
+    summaries, misses = cached_summaries(args.results_dir, run_ids, args.cache_dir, args.final_fraction)
+    tags = [t for t in METRIC_CATEGORIES["performance"] if any(t in s for s in summaries.values())]
+    short = {t: t.split('/')[-1][:14] for t in tags}
+    print(f"{'run':12s} {'steps':>10s} " + " ".join(f"{short[t]:>14s}" for t in tags))
+    for run_id, summary in summaries.items():
+        cells = [f"{summary[t]:14.3f}" if t in summary else f"{'--':>14s}" for t in tags]
+        print(f"{run_id:12s} {summary.get('steps', 0):10d} " + " ".join(cells))
+    print(f"\nFinal {args.final_fraction * 100:.0f}% means; {len(misses)} of {len(run_ids)} runs read from event files")
+
+
+# ---------------------------------------------------------------------------
+# latest
+# ---------------------------------------------------------------------------
+
+def _all_runs(results_dir):
+    from tfevents import find_runs
+
+    return list(find_runs(results_dir))
+
+
+def cmd_latest(args):
+    from datetime import datetime
+
+    runs = []
+    for entry in os.scandir(args.results_dir):
+        if not entry.is_dir():
+            continue
+        onnx = 0
+        for _, _, names in os.walk(entry.path):
+            onnx += sum(name.endswith(".onnx") for name in names)
+        steps = None
+        status_path = os.path.join(entry.path, "run_logs", "training_status.json")
+        if os.path.exists(status_path):
+            with open(status_path, 'r') as f:
+                status = json.load(f)
+            steps = max((c.get('steps', 0) for v in status.values() if isinstance(v, dict)
+                         for c in v.get('checkpoints') or []), default=None)
+        runs.append((entry.stat().st_mtime, entry.name, onnx, steps))
+    runs.sort(reverse=True)
+
+    for i, (mtime, name, onnx, steps) in enumerate(runs[:args.limit] if args.limit else runs, 1):
+        latest = "  <- latest" if i == 1 else ""
+        steps_text = f"{steps:>10d}" if steps is not None else f"{'--':>10s}"
+        print(f"{i:3d}. {name:14s} {datetime.fromtimestamp(mtime):%Y-%m-%d %H:%M}  "
+              f"{onnx:3d} onnx  {steps_text} steps{latest}")
+
+
+# ---------------------------------------------------------------------------
+# startup-check
+# ---------------------------------------------------------------------------
+
+_PROBE = (
+    "import sys, json; sys.path.insert(0, {dir!r}); sys.argv = {argv!r}; import cli; cli.main(); "
+    "print('\\n' + json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))"
+)
+
+
+def _probe(argv, cwd):
+    """(wall seconds, heavy modules imported) for one cold process running the CLI"""
+    code = _PROBE.format(dir=SCRIPT_DIR, argv=['data_fetch'] + argv, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(out.strip().splitlines()[-1])
+
+
+def cmd_startup_check(args):
+    cwd = os.getcwd()
+    base = ["--results-dir", args.results_dir]
+    probes = {
+        "latest": base + ["latest", "--limit", "1"],
+        "compare (cached)": base + ["--cache-dir", args.cache_dir, "compare"] + args.runs,
+    }
+    # Warm the compare cache so the probe measures the cached path
+    _probe(probes["compare (cached)"], cwd)
+
+    bare = min(_time_bare() for _ in range(args.repeat))
+    print(f"bare interpreter start: {bare * 1e3:.0f} ms (budget: +{args.budget * 1e3:.0f} ms per command)")
+    failed = False
+    for label, argv in probes.items():
+        results = [_probe(argv, cwd) for _ in range(args.repeat)]
+        best = min(r[0] for r in results)
+        heavy = results[0][1]
+        ok = best - bare <= args.budget and not heavy
+        failed = failed or not ok
+        print(f"  {label:18s} {best * 1e3:6.0f} ms (+{(best - bare) * 1e3:.0f} ms)  "
+              f"heavy imports: {', '.join(heavy) or 'none'}  {'OK' if ok else 'OVER BUDGET'}")
+    if failed:
+        raise SystemExit(1)
+
+
+def _time_bare():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="data_fetch", description="Training-run data tools")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_fetch = sub.add_parser("fetch", help="aligned, forward-filled CSV of a run's scalars")
+    p_fetch.add_argument("run")
+    p_fetch.add_argument("--test", action="store_true", help="performance metrics only (<run>_test_data.csv)")
+    p_fetch.add_argument("--tags", nargs="+")
+    p_fetch.add_argument("--output")
+    p_fetch.add_argument("--engine", choices=["tfevents", "tensorboard"], default="tfevents")
+    p_fetch.set_defaults(func=cmd_fetch)
+
+    p_cat = sub.add_parser("categories", help="CSV of one metric category")
+    p_cat.add_argument("run")
+    p_cat.add_argument("--type", choices=sorted(METRIC_CATEGORIES), default="performance")
+    p_cat.add_argument("--output")
+    p_cat.add_argument("--engine", choices=["tfevents", "tensorboard"], default="tfevents")
+    p_cat.set_defaults(func=cmd_categories)
+
+    p_analyze = sub.add_parser("analyze", help="summary statistics of a fetched CSV")
+    p_analyze.add_argument("csv")
+    p_analyze.add_argument("--final-fraction", type=float, default=0.1)
+    p_analyze.set_defaults(func=cmd_analyze)
+
+    p_compare = sub.add_parser("compare", help="final-window performance of runs side by side (cached)")
+    p_compare.add_argument("runs", nargs="*", help="default: every run with event files")
+    p_compare.add_argument("--final-fraction", type=float, default=0.2)
+    p_compare.set_defaults(func=cmd_compare)
+
+    p_latest = sub.add_parser("latest", help="runs by last modification, newest first")
+    p_latest.add_argument("--limit", type=int)
+    p_latest.set_defaults(func=cmd_latest)
+
+    p_check = sub.add_parser("startup-check", help="measure cold-start time of the cached commands")
+    p_check.add_argument("runs", nargs="*", default=[])
+    p_check.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    p_check.add_argument("--repeat", type=int, default=5)
+    p_check.set_defaults(func=cmd_startup_check)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Event-file compaction for finished runs
+
+Rewrites each behavior folder's event files into one scalar-only event file:
+duplicate steps from resumed runs are resolved (newest write wins, as in
+tfevents.load_scalars), text/hyperparameter summaries and per-value metadata
+are dropped, and the tags logged together at a step share one Event
+record. The result still opens in TensorBoard. Optionally writes a columnar .npz next to
+it. Every compaction is verified against the raw records of the originals
+(tags, steps and float32 values must match exactly) and reports size and read-time change.
+
+Originals are never touched unless --replace is given, and then only after
+verification passed.
+"""
+
+import argparse
+import os
+import shutil
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from tfevents import (
+    EventFileWriter,
+    encode_scalar_event,
+    find_event_files,
+    find_runs,
+    read_scalar_points,
+    rows_to_series,
+    ScalarSeries,
+)
+
+COMPACT_HOSTNAME = "compact"
+NPZ_NAME = "scalars.npz"
+# Scalars of one step logged within this many seconds are written as one Event
+MERGE_SECONDS = 1.0
+# Run files copied alongside the compacted events so the output is still a usable run directory
+RUN_FILES = ["configuration.yaml", os.path.join("run_logs", "training_status.json"),
+             os.path.join("run_logs", "timers.json")]
+
+
+def behavior_dirs(run_dir):
+    """{relative subdir: [event files]} for every folder of a run that holds event files"""
+    groups = defaultdict(list)
+    for path in find_event_files(run_dir):
+        groups[os.path.relpath(os.path.dirname(path), run_dir)].append(path)
+    return dict(groups)
+
+
+def compact_series(series, path):
+    """Write {tag: ScalarSeries} as one event file, one Event per step where possible; returns bytes written"""
+    tags = sorted(series)
+    if not tags:
+        return 0
+    steps = np.concatenate([series[t].steps for t in tags])
+    wall_times = np.concatenate([series[t].wall_times for t in tags])
+    values = np.concatenate([series[t].values for t in tags])
+    tag_ids = np.repeat(np.arange(len(tags)), [len(series[t].steps) for t in tags])
+
+    order = np.lexsort((tag_ids, wall_times, steps))
+    steps, wall_times, values, tag_ids = steps[order], wall_times[order], values[order], tag_ids[order]
+    # Tags of one step share an Event unless they were logged far apart (a resume rewrote only some of them)
+    new_event = np.concatenate([[True], (steps[1:] != steps[:-1]) | (np.diff(wall_times) > MERGE_SECONDS)])
+    starts = np.flatnonzero(new_event)
+    ends = np.append(starts[1:], len(steps))
+    event_wall_times = wall_times[starts]
+
+    with EventFileWriter(path, wall_time=float(event_wall_times[0])) as writer:
+        for start, end, wall_time in zip(starts, ends, event_wall_times):
+            scalars = [(tags[t], v) for t, v in zip(tag_ids[start:end].tolist(), values[start:end].tolist())]
+            writer.write(encode_scalar_event(float(wall_time), int(steps[start]), scalars))
+        return writer.bytes_written
+
+
+def write_npz(series, path):
+    """Columnar dump: tag names plus concatenated steps/wall_times/values with per-tag offsets"""
+    tags = sorted(series)
+    lengths = [len(series[t].steps) for t in tags]
+    np.savez_compressed(
+        path,
+        tags=np.array(tags, dtype=str),
+        offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        steps=np.concatenate([series[t].steps for t in tags]) if tags else np.array([], dtype=np.int64),
+        wall_times=np.concatenate([series[t].wall_times for t in tags]) if tags else np.array([]),
+        values=np.concatenate([series[t].values for t in tags]).astype(np.float32) if tags else np.array([], dtype=np.float32),
+    )
+
+
+def load_npz(path):
+    """{tag: ScalarSeries} from a columnar dump written by write_npz"""
+    with np.load(path) as data:
+        offsets = data['offsets']
+        steps, wall_times, values = data['steps'], data['wall_times'], data['values'].astype(np.float64)
+        return {
+            str(tag): ScalarSeries(steps[a:b], wall_times[a:b], values[a:b])
+            for tag, a, b in zip(data['tags'], offsets[:-1], offsets[1:])
+        }
+
+
+def raw_expected(files):
+    """{tag: ScalarSeries} straight from the original records, last write of a (tag, step) winning
+
+    Deliberately independent of rows_to_series, which produces the compacted
+    data and so cannot also be the reference it is checked against.
+    """
+    latest = defaultdict(dict)
+    for path in files:
+        points, _ = read_scalar_points(path)
+        for tag, step, wall_time, value in points:
+            latest[tag][step] = (wall_time, value)
+    return {tag: _series(by_step) for tag, by_step in latest.items()}
+
+
+def compacted_points(path):
+    """({tag: ScalarSeries}, problems) from the raw records of one compacted file"""
+    by_tag = defaultdict(dict)
+    duplicates = set()
+    points, _ = read_scalar_points(path)
+    for tag, step, wall_time, value in points:
+        if step in by_tag[tag]:
+            duplicates.add(tag)
+        by_tag[tag][step] = (wall_time, value)
+    problems = [f"{tag}: step written more than once" for tag in sorted(duplicates)]
+    return {tag: _series(by_step) for tag, by_step in by_tag.items()}, problems
+
+
+def _series(by_step):
+    steps = sorted(by_step)
+    return ScalarSeries(np.array(steps, dtype=np.int64),
+                        np.array([by_step[s][0] for s in steps], dtype=np.float64),
+                        np.array([by_step[s][1] for s in steps], dtype=np.float64))
+
+
+def compare_series(original, compacted, wall_tolerance=MERGE_SECONDS):
+    """List of problems; empty when every tag/step/value survived"""
+    problems = []
+    missing = set(original) - set(compacted)
+    extra = set(compacted) - set(original)
+    if missing:
+        problems.append(f"missing tags: {sorted(missing)}")
+    if extra:
+        problems.append(f"unexpected tags: {sorted(extra)}")
+    for tag in set(original) & set(compacted):
+        a, b = original[tag], compacted[tag]
+        if len(a.steps) != len(b.steps) or not np.array_equal(a.steps, b.steps):
+            problems.append(f"{tag}: steps differ ({len(a.steps)} vs {len(b.steps)} points)")
+            continue
+        if not np.array_equal(a.values.astype(np.float32), b.values.astype(np.float32), equal_nan=True):
+            problems.append(f"{tag}: values differ")
+        drift = np.max(np.abs(a.wall_times - b.wall_times)) if len(a.steps) else 0.0
+        if drift > wall_tolerance:
+            problems.append(f"{tag}: wall time moved by up to {drift:.1f}s")
+    return problems
+
+
+def _load_files(files):
+    """{tag: ScalarSeries} of exactly these files, newest write wins as in load_scalars"""
+    raw = {}
+    for path in files:
+        points, _ = read_scalar_points(path)
+        for tag, step, wall_time, value in points:
+            raw.setdefault(tag, []).append((step, wall_time, value))
+    return rows_to_series(raw)
+
+
+def _best_time(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compact_run(run_dir, output_dir, npz=False, replace=False, repeat=3):
+    """Compact every behavior folder of one run into output_dir; returns a report dict
+
+    output_dir must lie outside run_dir: the compacted file is written next
+    to nothing but earlier compactions, and only those are ever deleted.
+    """
+    run_abs, output_abs = os.path.abspath(run_dir), os.path.abspath(output_dir)
+    if os.path.commonpath([run_abs, output_abs]) == run_abs:
+        raise ValueError(f"output directory {output_dir} must be outside the run directory {run_dir}")
+
+    report = {'run_dir': run_dir, 'output_dir': output_dir, 'behaviors': {}, 'ok': True}
+    for subdir, files in behavior_dirs(run_dir).items():
+        target_dir = os.path.normpath(os.path.join(output_dir, subdir))
+        os.makedirs(target_dir, exist_ok=True)
+
+        # Exactly what is compacted and verified; replace deletes these files and nothing else
+        sources = {p: os.path.getsize(p) for p in files}
+        series = _load_files(files)
+        first_wall = min((s.wall_times[0] for s in series.values() if len(s.wall_times)), default=time.time())
+        name = f"events.out.tfevents.{int(first_wall)}.{COMPACT_HOSTNAME}.{os.getpid()}.0"
+        path = os.path.join(target_dir, name)
+        compact_series(series, path)
+
+        expected = raw_expected(files)
+        compacted, problems = compacted_points(path)
+        problems += compare_series(expected, compacted)
+        if not problems:
+            # Earlier compactions of this behavior; never anything this tool did not write
+            for stale in find_event_files(target_dir):
+                if (os.path.dirname(stale) == target_dir and stale != path
+                        and os.path.basename(stale).split('.')[4:5] == [COMPACT_HOSTNAME]):
+                    os.remove(stale)
+        entry = {
+            'sources': sources,
+            'files_before': len(files),
+            'bytes_before': sum(os.path.getsize(p) for p in files),
+            'bytes_after': os.path.getsize(path),
+            'tags': len(series),
+            'points': int(sum(len(s.steps) for s in series.values())),
+            'read_seconds_before': _best_time(lambda: [read_scalar_points(p) for p in files], repeat),
+            'read_seconds_after': _best_time(lambda: read_scalar_points(path), repeat),
+            'problems': problems,
+            'path': path,
+        }
+        if npz:
+            npz_path = os.path.join(target_dir, NPZ_NAME)
+            write_npz(series, npz_path)
+            if compare_series(expected, load_npz(npz_path)):
+                problems.append("npz dump does not match")
+            entry['npz_path'] = npz_path
+            entry['npz_bytes'] = os.path.getsize(npz_path)
+            entry['npz_read_seconds'] = _best_time(lambda: load_npz(npz_path), repeat)
+        report['behaviors'][subdir] = entry
+        report['ok'] = report['ok'] and not problems
+
+    for relative in RUN_FILES:
+        source = os.path.join(run_dir, relative)
+        if os.path.exists(source):
+            os.makedirs(os.path.dirname(os.path.join(output_dir, relative)), exist_ok=True)
+            shutil.copy2(source, os.path.join(output_dir, relative))
+
+    if replace and report['ok']:
+        # A source that grew or vanished since verification holds points the compacted file lacks
+        for entry in report['behaviors'].values():
+            for original, size in entry['sources'].items():
+                if not os.path.exists(original) or os.path.getsize(original) != size:
+                    entry['problems'].append(f"{original} changed after verification; not replaced")
+                    report['ok'] = False
+    if replace and report['ok']:
+        for subdir, entry in report['behaviors'].items():
+            for original in entry['sources']:
+                os.remove(original)
+            shutil.move(entry['path'], os.path.join(run_dir, subdir, os.path.basename(entry['path'])))
+            entry['path'] = os.path.join(run_dir, subdir, os.path.basename(entry['path']))
+        report['replaced'] = True
+    return report
+
+
+def _tensorboard_points(directory):
+    """Scalar point count as TensorBoard sees it, or None when tensorboard is not installed"""
+    try:
+        from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
+    except ImportError:
+        return None
+    ea = EventAccumulator(directory, size_guidance={'scalars': 0})
+    ea.Reload()
+    return sum(len(ea.Scalars(tag)) for tag in ea.Tags()['scalars'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact finished runs' event files into scalar-only files")
+    parser.add_argument("runs", nargs="*", help="run ids (default: all runs under --results-dir)")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--output-dir", default="results_compact", help="compacted runs are written here")
+    parser.add_argument("--npz", action="store_true", help="also write a columnar scalars.npz per behavior")
+    parser.add_argument("--replace", action="store_true",
+                        help="after a verified compaction, delete the originals and move the compact file in")
+    parser.add_argument("--tensorboard-check", action="store_true",
+                        help="also count points with TensorBoard's EventAccumulator")
+    args = parser.parse_args()
+
+    runs = find_runs(args.results_dir)
+    run_ids = args.runs or sorted(runs)
+    total_before = total_after = 0
+    failed = []
+
+    for run_id in run_ids:
+        if run_id not in runs:
+            print(f"{run_id}: no event files, skipped")
+            continue
+        try:
+            report = compact_run(runs[run_id], os.path.join(args.output_dir, run_id), args.npz, args.replace)
+        except ValueError as e:
+            raise SystemExit(f"{run_id}: {e}")
+        print(f"\n{run_id}: {'OK' if report['ok'] else 'FAILED'}")
+        for subdir, entry in report['behaviors'].items():
+            total_before += entry['bytes_before']
+            total_after += entry['bytes_after']
+            ratio = entry['bytes_after'] / entry['bytes_before'] if entry['bytes_before'] else 0.0
+            speedup = entry['read_seconds_before'] / entry['read_seconds_after'] if entry['read_seconds_after'] else 0.0
+            print(f"  {subdir}: {entry['files_before']} files, {entry['tags']} tags, {entry['points']} points")
+            print(f"    size {entry['bytes_before'] / 1e6:8.2f} MB -> {entry['bytes_after'] / 1e6:8.2f} MB "
+                  f"({(1 - ratio) * 100:.1f}% smaller)")
+            print(f"    read {entry['read_seconds_before'] * 1e3:8.1f} ms -> {entry['read_seconds_after'] * 1e3:8.1f} ms "
+                  f"({speedup:.1f}x)")
+            if 'npz_bytes' in entry:
+                print(f"    npz  {entry['npz_bytes'] / 1e6:8.2f} MB, read {entry['npz_read_seconds'] * 1e3:.1f} ms")
+            if args.tensorboard_check:
+                points = _tensorboard_points(os.path.dirname(entry['path']))
+                if points is not None:
+                    status = "OK" if points == entry['points'] else "MISMATCH"
+                    print(f"    TensorBoard sees {points} points ({status})")
+            for problem in entry['problems']:
+                print(f"    PROBLEM: {problem}")
+        if not report['ok']:
+            failed.append(run_id)
+        if report.get('replaced'):
+            print("  originals replaced")
+
+    if total_before:
+        print(f"\nTotal: {total_before / 1e6:.2f} MB -> {total_after / 1e6:.2f} MB "
+              f"({(1 - total_after / total_before) * 100:.1f}% smaller)")
+    if failed:
+        print(f"Verification FAILED for: {', '.join(failed)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
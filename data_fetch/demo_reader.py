@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for ML-Agents .demo demonstration files
+
+A .demo file is a varint-length-delimited protobuf stream: a
+DemonstrationMetaProto padded to a fixed 33-byte region, one
+BrainParametersProto, then one AgentInfoActionPairProto per recorded step.
+Steps are decoded with protowire (no mlagents/protobuf import) into
+preallocated NumPy chunks of observations, actions, rewards and flags, so
+memory stays bounded by the chunk size however long the recording is.
+Files are decoded in parallel worker processes.
+
+    python demo_reader.py stats Demos/ --workers 4
+    python demo_reader.py export Demos/*.demo --output demo_subset --min-return 10
+"""
+
+import argparse
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from protowire import WIRE_LEN, decode_varint, iter_fields, to_float, to_signed64
+
+DEMO_SUFFIX = ".demo"
+# DemoRecorder reserves 32 bytes (+1 length byte) for the metadata, which it rewrites on close
+META_BYTES = 33
+SUPPORTED_VERSIONS = (0, 1)
+READ_BLOCK = 1 << 20
+DEFAULT_CHUNK = 4096
+# ActionSpec fallback for demos recorded before ActionSpecProto existed
+SPACE_DISCRETE, SPACE_CONTINUOUS = 0, 1
+
+DemoChunk = namedtuple('DemoChunk', [
+    'observations', 'continuous_actions', 'discrete_actions', 'rewards',
+    'done', 'max_step_reached', 'agent_ids', 'episodes',
+])
+
+EXPORT_FIELDS = ('observations', 'continuous_actions', 'discrete_actions', 'rewards', 'done', 'agent_ids', 'episodes')
+
+
+class DemoError(ValueError):
+    pass
+
+
+def find_demo_files(paths):
+    """.demo files among paths, searching directories recursively"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, '**', '*' + DEMO_SUFFIX), recursive=True)))
+        else:
+            found.append(path)
+    return found
+
+
+def _packed_varints(wire_type, value):
+    if wire_type != WIRE_LEN:
+        return [value]
+    out, pos = [], 0
+    while pos < len(value):
+        v, pos = decode_varint(value, pos)
+        out.append(v)
+    return out
+
+
+def _packed_float_bytes(wire_type, value):
+    # Repeated floats are packed by every writer we know of, but unpacked is legal protobuf
+    return value if wire_type == WIRE_LEN else bytes(value)
+
+
+def iter_delimited(f, pos=0):
+    """Yield the payload of each varint-delimited record from pos, READ_BLOCK bytes at a time
+
+    A truncated trailing record (recording interrupted) ends the stream silently.
+    """
+    f.seek(pos)
+    buf, start, need = b'', 0, READ_BLOCK
+    while True:
+        try:
+            length, body = decode_varint(buf, start)
+        except IndexError:
+            length, body = None, len(buf)
+        if length is not None and body + length <= len(buf):
+            yield buf[body:body + length]
+            start = body + length
+            continue
+        if length is not None:
+            need = max(READ_BLOCK, body + length - len(buf))
+        more = f.read(need)
+        if not more:
+            return
+        buf, start = buf[start:] + more, 0
+
+
+def _parse_meta(raw):
+    meta = {'api_version': 0, 'name': '', 'number_steps': 0, 'number_episodes': 0, 'mean_reward': 0.0}
+    for field, _, value in iter_fields(raw):
+        if field == 1:
+            meta['api_version'] = value
+        elif field == 2:
+            meta['name'] = bytes(value).decode('utf-8', 'replace')
+        elif field == 3:
+            meta['number_steps'] = value
+        elif field == 4:
+            meta['number_episodes'] = value
+        elif field == 5:
+            meta['mean_reward'] = to_float(value)
+    return meta
+
+
+def _parse_brain(raw):
+    brain = {'behavior_name': '', 'num_continuous': 0, 'discrete_branches': []}
+    legacy_sizes, legacy_space, has_spec = [], SPACE_DISCRETE, False
+    for field, wire_type, value in iter_fields(raw):
+        if field == 3:
+            legacy_sizes.extend(_packed_varints(wire_type, value))
+        elif field == 6:
+            legacy_space = value
+        elif field == 7:
+            brain['behavior_name'] = bytes(value).decode('utf-8', 'replace')
+        elif field == 9:
+            has_spec = True
+            for f, w, v in iter_fields(value):
+                if f == 1:
+                    brain['num_continuous'] = v
+                elif f == 3:
+                    brain['discrete_branches'].extend(_packed_varints(w, v))
+    if not has_spec and legacy_sizes:
+        if legacy_space == SPACE_CONTINUOUS:
+            brain['num_continuous'] = legacy_sizes[0]
+        else:
+            brain['discrete_branches'] = legacy_sizes
+    return brain
+
+
+def _observation(raw):
+    """(shape, float32 bytes or None for compressed/visual observations)"""
+    shape, data = [], None
+    for field, wire_type, value in iter_fields(raw):
+        if field == 1:
+            shape.extend(_packed_varints(wire_type, value))
+        elif field == 4:
+            data = b''.join(_packed_float_bytes(w, v) for f, w, v in iter_fields(value) if f == 1)
+    return tuple(shape), data
+
+
+def decode_step(raw):
+    """(observation shapes, float observation bytes, reward, done, max_step_reached, agent id,
+    continuous action bytes, discrete actions) for one AgentInfoActionPairProto
+
+    Older demos store every action as floats in vector_actions_deprecated;
+    without discrete_actions those floats are also returned as the discrete
+    actions, and iter_chunks uses whichever the action spec calls for.
+    """
+    info = action = b''
+    for field, _, value in iter_fields(raw):
+        if field == 1:
+            info = value
+        elif field == 2:
+            action = value
+
+    shapes, floats = [], []
+    reward, done, max_step, agent_id = 0.0, False, False, 0
+    for field, _, value in iter_fields(info):
+        if field == 7:
+            reward = to_float(value)
+        elif field == 8:
+            done = bool(value)
+        elif field == 9:
+            max_step = bool(value)
+        elif field == 10:
+            agent_id = to_signed64(value)
+        elif field == 13:
+            shape, data = _observation(value)
+            shapes.append(shape)
+            if data is not None:
+                floats.append(data)
+
+    continuous, legacy, discrete = [], [], []
+    for field, wire_type, value in iter_fields(action):
+        if field == 1:
+            legacy.append(_packed_float_bytes(wire_type, value))
+        elif field == 6:
+            continuous.append(_packed_float_bytes(wire_type, value))
+        elif field == 7:
+            discrete.extend(to_signed64(v) for v in _packed_varints(wire_type, value))
+    legacy = b''.join(legacy)
+    if not discrete and legacy:
+        discrete = np.rint(np.frombuffer(legacy, dtype='<f4')).astype(np.int64).tolist()
+    return (tuple(shapes), b''.join(floats), reward, done, max_step, agent_id,
+            b''.join(continuous) or legacy, discrete)
+
+
+def read_header(path):
+    """{'meta': DemonstrationMetaProto fields, 'brain': behavior name and action spec}"""
+    with open(path, 'rb') as f:
+        head = f.read(META_BYTES)
+        try:
+            length, pos = decode_varint(head, 0)
+            meta = _parse_meta(head[pos:pos + length])
+        except (IndexError, ValueError):
+            raise DemoError(f"{path}: not a demonstration file (bad metadata)")
+        if meta['api_version'] not in SUPPORTED_VERSIONS:
+            raise DemoError(f"{path}: unsupported demonstration api_version {meta['api_version']}")
+        brain = next(iter_delimited(f, META_BYTES), None)
+    if brain is None:
+        raise DemoError(f"{path}: no brain parameters")
+    return {'meta': meta, 'brain': _parse_brain(brain)}
+
+
+def _new_chunk(size, obs_size, n_continuous, n_discrete):
+    return DemoChunk(
+        np.empty((size, obs_size), dtype=np.float32),
+        np.empty((size, n_continuous), dtype=np.float32),
+        np.empty((size, n_discrete), dtype=np.int32),
+        np.empty(size, dtype=np.float32),
+        np.empty(size, dtype=bool),
+        np.empty(size, dtype=bool),
+        np.empty(size, dtype=np.int32),
+        np.empty(size, dtype=np.int64),
+    )
+
+
+def _trim(chunk, n):
+    return DemoChunk(*(a[:n] for a in chunk))
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK):
+    """Yield DemoChunks of up to chunk_size steps in file order
+
+    Float observations are concatenated per step in sensor order; compressed
+    (visual) observations are skipped. episodes numbers each agent's episodes
+    in the order they start, counting from 0 within the file.
+    """
+    header = read_header(path)
+    n_continuous = header['brain']['num_continuous']
+    n_discrete = len(header['brain']['discrete_branches'])
+    shapes = obs_size = chunk = None
+    current, next_episode, n = {}, 0, 0
+    with open(path, 'rb') as f:
+        records = iter_delimited(f, META_BYTES)
+        next(records, None)
+        for raw in records:
+            step_shapes, obs, reward, done, max_step, agent_id, cont, disc = decode_step(raw)
+            if chunk is None:
+                shapes = step_shapes
+                obs_size = len(obs) // 4
+                chunk = _new_chunk(chunk_size, obs_size, n_continuous, n_discrete)
+            if step_shapes != shapes or len(obs) != 4 * obs_size:
+                raise DemoError(f"{path}: observation shapes change from {shapes} to {step_shapes}")
+            chunk.observations[n] = np.frombuffer(obs, dtype='<f4')
+            if n_continuous:
+                chunk.continuous_actions[n] = np.frombuffer(cont, dtype='<f4', count=n_continuous)
+            if n_discrete:
+                if len(disc) < n_discrete:
+                    raise DemoError(f"{path}: step has {len(disc)} discrete actions, expected {n_discrete}")
+                chunk.discrete_actions[n] = disc[:n_discrete]
+            chunk.rewards[n] = reward
+            chunk.done[n] = done
+            chunk.max_step_reached[n] = max_step
+            chunk.agent_ids[n] = agent_id
+            episode = current.get(agent_id)
+            if episode is None:
+                episode = current[agent_id] = next_episode
+                next_episode += 1
+            chunk.episodes[n] = episode
+            if done:
+                del current[agent_id]
+            n += 1
+            if n == chunk_size:
+                yield chunk
+                chunk, n = _new_chunk(chunk_size, obs_size, n_continuous, n_discrete), 0
+    if chunk is not None and n:
+        yield _trim(chunk, n)
+
+
+def _grow(a, size):
+    return a if len(a) >= size else np.concatenate((a, np.zeros(max(size, 2 * len(a)) - len(a), dtype=a.dtype)))
+
+
+def _moments(x):
+    x = x.astype(np.float64)
+    return [len(x), x.sum(axis=0), (x * x).sum(axis=0), x.min(axis=0), x.max(axis=0)]
+
+
+def _merge_moments(a, b):
+    if a is None or not a[0]:
+        return b
+    if not b[0]:
+        return a
+    return [a[0] + b[0], a[1] + b[1], a[2] + b[2], np.minimum(a[3], b[3]), np.maximum(a[4], b[4])]
+
+
+def demo_stats(path, chunk_size=DEFAULT_CHUNK):
+    """Mergeable statistics of one file: per-dimension observation/action moments,
+    discrete action counts and per-episode returns and lengths"""
+    start = time.perf_counter()
+    header = read_header(path)
+    branches = header['brain']['discrete_branches']
+    stats = {
+        'path': path, 'header': header, 'steps': 0, 'max_step_reached': 0,
+        'observations': None, 'continuous_actions': None,
+        'discrete_counts': [np.zeros(size, dtype=np.int64) for size in branches],
+    }
+    returns = np.zeros(64)
+    lengths = np.zeros(64, dtype=np.int64)
+    complete = np.zeros(64, dtype=bool)
+    n_episodes = 0
+    for chunk in iter_chunks(path, chunk_size):
+        stats['steps'] += len(chunk.rewards)
+        stats['max_step_reached'] += int(chunk.max_step_reached.sum())
+        stats['observations'] = _merge_moments(stats['observations'], _moments(chunk.observations))
+        stats['continuous_actions'] = _merge_moments(stats['continuous_actions'], _moments(chunk.continuous_actions))
+        for b, counts in enumerate(stats['discrete_counts']):
+            counts += np.bincount(np.clip(chunk.discrete_actions[:, b], 0, len(counts) - 1), minlength=len(counts))
+        n_episodes = max(n_episodes, int(chunk.episodes.max()) + 1)
+        returns, lengths, complete = _grow(returns, n_episodes), _grow(lengths, n_episodes), _grow(complete, n_episodes)
+        np.add.at(returns, chunk.episodes, chunk.rewards)
+        np.add.at(lengths, chunk.episodes, 1)
+        complete[chunk.episodes[chunk.done]] = True
+    stats['episode_returns'] = returns[:n_episodes]
+    stats['episode_lengths'] = lengths[:n_episodes]
+    stats['episode_complete'] = complete[:n_episodes]
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def _stats_worker(task):
+    return demo_stats(*task)
+
+
+def scan(paths, chunk_size=DEFAULT_CHUNK, workers=None):
+    """demo_stats for every file, decoded in parallel when there is more than one"""
+    tasks = [(p, chunk_size) for p in paths]
+    if workers == 1 or len(tasks) <= 1:
+        return [_stats_worker(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_stats_worker, tasks))
+
+
+def _layout(stats):
+    brain = stats['header']['brain']
+    return len(stats['observations'][1]), brain['num_continuous'], tuple(brain['discrete_branches'])
+
+
+def _check_layouts(all_stats):
+    """Files with steps; raises DemoError unless they share observation and action layouts"""
+    with_steps = [s for s in all_stats if s['steps']]
+    for s in with_steps[1:]:
+        if _layout(s) != _layout(with_steps[0]):
+            raise DemoError(f"{s['path']}: observation/action layout {_layout(s)} differs from "
+                            f"{with_steps[0]['path']} {_layout(with_steps[0])}")
+    return with_steps
+
+
+def combine_stats(all_stats):
+    """Dataset-level totals over files with the same observation/action layout"""
+    out = {'files': len(all_stats), 'steps': 0, 'max_step_reached': 0, 'observations': None,
+           'continuous_actions': None, 'discrete_counts': None}
+    returns, lengths = [], []
+    for s in _check_layouts(all_stats):
+        out['steps'] += s['steps']
+        out['max_step_reached'] += s['max_step_reached']
+        out['observations'] = _merge_moments(out['observations'], s['observations'])
+        out['continuous_actions'] = _merge_moments(out['continuous_actions'], s['continuous_actions'])
+        if out['discrete_counts'] is None:
+            out['discrete_counts'] = [c.copy() for c in s['discrete_counts']]
+        else:
+            for total, c in zip(out['discrete_counts'], s['discrete_counts']):
+                total += c
+        returns.append(s['episode_returns'][s['episode_complete']])
+        lengths.append(s['episode_lengths'][s['episode_complete']])
+    out['episode_returns'] = np.concatenate(returns) if returns else np.zeros(0)
+    out['episode_lengths'] = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+    return out
+
+
+def _print_moments(label, moments):
+    if moments is None or not moments[0] or not len(moments[1]):
+        return
+    count, total, sumsq, lo, hi = moments
+    mean = total / count
+    std = np.sqrt(np.maximum(sumsq / count - mean * mean, 0.0))
+    print(f"\n{label} ({len(mean)} dims)")
+    print(f"  {'dim':>4s} {'mean':>10s} {'std':>10s} {'min':>10s} {'max':>10s}")
+    for i in range(len(mean)):
+        print(f"  {i:4d} {mean[i]:10.4f} {std[i]:10.4f} {lo[i]:10.4f} {hi[i]:10.4f}")
+
+
+def print_stats(all_stats):
+    for s in all_stats:
+        meta, brain = s['header']['meta'], s['header']['brain']
+        rate = s['steps'] / s['seconds'] if s['seconds'] else 0.0
+        print(f"{s['path']}: {meta['name'] or brain['behavior_name']} {s['steps']:,} steps "
+              f"({meta['number_steps']:,} in metadata), {int(s['episode_complete'].sum())} episodes, "
+              f"{rate:,.0f} steps/s")
+    total = combine_stats(all_stats)
+    returns, lengths = total['episode_returns'], total['episode_lengths']
+    print(f"\n{total['files']} files, {total['steps']:,} steps, {len(returns)} complete episodes, "
+          f"{total['max_step_reached']} ended at max step")
+    if len(returns):
+        p5, p50, p95 = np.percentile(returns, [5, 50, 95])
+        print(f"Episode return: mean {returns.mean():.3f} std {returns.std():.3f} "
+              f"p5 {p5:.3f} p50 {p50:.3f} p95 {p95:.3f}")
+        print(f"Episode length: mean {lengths.mean():.1f} min {lengths.min()} max {lengths.max()}")
+    _print_moments("Observations", total['observations'])
+    _print_moments("Continuous actions", total['continuous_actions'])
+    for b, counts in enumerate(total['discrete_counts'] or []):
+        print(f"Discrete branch {b}: " + " ".join(f"{i}:{c}" for i, c in enumerate(counts.tolist())))
+
+
+def _export_worker(task):
+    """Write one file's selected steps into the shared .npy outputs at row offset"""
+    path, chunk_size, selected, offset, first_episode, output_dir = task
+    outputs = {name: np.load(os.path.join(output_dir, name + '.npy'), mmap_mode='r+') for name in EXPORT_FIELDS}
+    row = offset
+    for chunk in iter_chunks(path, chunk_size):
+        keep = selected[chunk.episodes]
+        n = int(keep.sum())
+        if not n:
+            continue
+        for name in EXPORT_FIELDS:
+            outputs[name][row:row + n] = getattr(chunk, name)[keep]
+        outputs['episodes'][row:row + n] += first_episode
+        row += n
+    for out in outputs.values():
+        out.flush()
+    return row - offset
+
+
+def export(all_stats, output_dir, min_return=None, chunk_size=DEFAULT_CHUNK, workers=None):
+    """Write the steps of complete episodes with return >= min_return to output_dir/<field>.npy
+
+    The rows per file are known from demo_stats, so the outputs are allocated
+    once as memory-mapped .npy files and every file is written in parallel
+    into its own slice. Steps stay in file order, so agents interleave;
+    episodes.npy numbers episodes across all files and agent_ids.npy keeps
+    the recording agent, which separates the trajectories.
+    Returns (episodes, steps) written.
+    """
+    with_steps = _check_layouts(all_stats)
+    tasks, offset, episodes, first_episode = [], 0, 0, 0
+    for s in with_steps:
+        selected = s['episode_complete'].copy()
+        if min_return is not None:
+            selected &= s['episode_returns'] >= min_return
+        rows = int(s['episode_lengths'][selected].sum())
+        if rows:
+            tasks.append((s['path'], chunk_size, selected, offset, first_episode, output_dir))
+        offset += rows
+        episodes += int(selected.sum())
+        first_episode += len(selected)
+    if not tasks:
+        return 0, 0
+
+    first = with_steps[0]
+    shapes = {
+        'observations': (offset, len(first['observations'][1])),
+        'continuous_actions': (offset, first['header']['brain']['num_continuous']),
+        'discrete_actions': (offset, len(first['header']['brain']['discrete_branches'])),
+        'rewards': (offset,),
+        'done': (offset,),
+        'agent_ids': (offset,),
+        'episodes': (offset,),
+    }
+    dtypes = {'discrete_actions': np.int32, 'done': bool, 'agent_ids': np.int32, 'episodes': np.int64}
+    os.makedirs(output_dir, exist_ok=True)
+    for name in EXPORT_FIELDS:
+        np.lib.format.open_memmap(os.path.join(output_dir, name + '.npy'), mode='w+',
+                                  dtype=dtypes.get(name, np.float32), shape=shapes[name]).flush()
+    if workers == 1 or len(tasks) <= 1:
+        written = [_export_worker(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(_export_worker, tasks))
+    return episodes, sum(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode and summarize ML-Agents .demo demonstration files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_stats = sub.add_parser("stats", help="dataset statistics of one or more demonstrations")
+    p_export = sub.add_parser("export", help="write selected episodes to .npy arrays")
+    for p in (p_stats, p_export):
+        p.add_argument("paths", nargs="+", help=".demo files or directories")
+        p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK, help="steps decoded per chunk")
+        p.add_argument("--workers", type=int)
+    p_export.add_argument("--output", required=True, help="output directory")
+    p_export.add_argument("--min-return", type=float, help="keep episodes with at least this return")
+    args = parser.parse_args()
+
+    paths = find_demo_files(args.paths)
+    if not paths:
+        raise SystemExit("No .demo files found")
+    start = time.perf_counter()
+    try:
+        all_stats = scan(paths, args.chunk_size, args.workers)
+    except DemoError as e:
+        raise SystemExit(str(e))
+
+    try:
+        if args.command == "stats":
+            print_stats(all_stats)
+        elif args.command == "export":
+            episodes, steps = export(all_stats, args.output, args.min_return, args.chunk_size, args.workers)
+            print(f"Exported {episodes} episodes, {steps:,} steps from {len(paths)} files -> {args.output}")
+    except DemoError as e:
+        raise SystemExit(str(e))
+    print(f"\n{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Lazy derived-metrics engine
+
+Expressions over a run's scalar tags (EMA, rolling mean/std/quantile,
+derivative, rate per wall-second, ratios between tags) are built as small
+node trees and only evaluated when asked for. Every evaluated node is
+memoized in a bounded LRU keyed on (run, event-file signature, expression),
+so dashboards and reports asking for the same smoothing reuse the result
+and intermediate nodes are shared between expressions.
+
+    engine = DerivedMetrics("results")
+    smoothed = engine.evaluate("drone6.1", tag("Environment/Cumulative Reward").ema(0.6))
+    ratio = engine.evaluate("drone6.1", tag("TargetsFound") / tag("Environment/Episode Length"))
+"""
+
+import abc
+import argparse
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from tfevents import ScalarSeries, find_event_files, find_runs, load_scalars
+
+EMPTY = ScalarSeries(np.array([], dtype=np.int64), np.array([]), np.array([]))
+
+
+# ---------------------------------------------------------------------------
+# Kernels
+# ---------------------------------------------------------------------------
+
+def ema(values, weight=0.6, debias=True):
+    """TensorBoard smoothing: y = w * y_prev + (1 - w) * x, debiased, non-finite points skipped
+
+    Evaluated in blocks: inside a block the recurrence is a scaled cumsum,
+    and only one carry per block is propagated in Python.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    finite = np.isfinite(values)
+    x = values[finite]
+    n = len(x)
+    if not weight < 1:
+        raise ValueError(f"EMA weight must be < 1, got {weight}")
+    if n == 0:
+        return out
+    if weight <= 0:
+        out[finite] = x
+        return out
+
+    # Keep w^-block within ~1e8 so the scaled cumsum stays well conditioned
+    block = int(max(1, min(1024, np.floor(8 * np.log(10) / -np.log(weight)))))
+    n_blocks = -(-n // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = x
+    padded = padded.reshape(n_blocks, block)
+
+    j = np.arange(block)
+    powers = weight ** j
+    local = (1 - weight) * powers * np.cumsum(padded * weight ** -j, axis=1)
+    carry_scale = weight ** (j + 1)
+
+    y = np.empty_like(local)
+    carry = 0.0
+    for b in range(n_blocks):
+        y[b] = local[b] + carry_scale * carry
+        carry = y[b, -1]
+    y = y.ravel()[:n]
+
+    if debias:
+        y = y / (1 - weight ** np.arange(1, n + 1))
+    out[finite] = y
+    return out
+
+
+def _trailing_sums(x, window):
+    c = np.concatenate([[0.0], np.cumsum(x)])
+    idx = np.arange(1, len(x) + 1)
+    return c[idx] - c[np.maximum(idx - window, 0)]
+
+
+def rolling_mean(values, window, min_periods=None):
+    """Trailing-window mean from cumulative sums (O(n) for any window)"""
+    values = np.asarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    finite = np.isfinite(values)
+    counts = _trailing_sums(finite.astype(np.float64), window)
+    sums = _trailing_sums(np.where(finite, values, 0.0), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+    return np.where(counts >= max(min_periods, 1), mean, np.nan)
+
+
+def rolling_std(values, window, min_periods=None, ddof=1):
+    """Trailing-window std from cumulative sums of shifted values (shifting limits cancellation)"""
+    values = np.asarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    finite = np.isfinite(values)
+    shift = np.mean(values[finite]) if finite.any() else 0.0
+    x = np.where(finite, values - shift, 0.0)
+    counts = _trailing_sums(finite.astype(np.float64), window)
+    s1 = _trailing_sums(x, window)
+    s2 = _trailing_sums(x * x, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (s2 - s1 * s1 / counts) / (counts - ddof)
+    return np.where(counts >= max(min_periods, ddof + 1), np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+
+def rolling_quantile(values, window, q=0.5, chunk_rows=65536):
+    """Trailing-window quantile over sliding_window_view, in row chunks to bound memory"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    view = np.lib.stride_tricks.sliding_window_view(values, window)
+    rows = max(1, chunk_rows // window)
+    for start in range(0, len(view), rows):
+        out[window - 1 + start:window - 1 + start + rows] = np.nanquantile(view[start:start + rows], q, axis=1) \
+            if np.isnan(values).any() else np.quantile(view[start:start + rows], q, axis=1)
+    return out
+
+
+def derivative(steps, values, per_steps=1.0):
+    """d value / d step (central differences on uneven spacing), scaled to per_steps"""
+    if len(values) < 2:
+        return np.full(len(values), np.nan)
+    return np.gradient(np.asarray(values, dtype=np.float64), np.asarray(steps, dtype=np.float64)) * per_steps
+
+
+def rate_per_second(wall_times, values):
+    """Change in value per wall-clock second between consecutive points (first point NaN)"""
+    out = np.full(len(values), np.nan)
+    if len(values) < 2:
+        return out
+    dt = np.diff(np.asarray(wall_times, dtype=np.float64))
+    dv = np.diff(np.asarray(values, dtype=np.float64))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[1:] = np.where(dt > 0, dv / dt, np.nan)
+    return out
+
+
+def asof(steps, other_steps, other_values):
+    """Value of the other series at the latest step <= each step (NaN before it starts)"""
+    idx = np.searchsorted(other_steps, steps, side='right') - 1
+    return np.where(idx >= 0, np.asarray(other_values, dtype=np.float64)[np.maximum(idx, 0)], np.nan)
+
+
+# ---------------------------------------------------------------------------
+# Expression nodes
+# ---------------------------------------------------------------------------
+
+class Expr(abc.ABC):
+    """Base expression; key is a hashable description used for memoization"""
+
+    key = ()
+    inputs = ()
+
+    @abc.abstractmethod
+    def compute(self, *series):
+        """ScalarSeries for this node given the evaluated inputs"""
+
+    def __repr__(self):
+        return f"Expr{self.key}"
+
+    def __truediv__(self, other):
+        return Ratio(self, other)
+
+    def ema(self, weight=0.6, debias=True):
+        return Ema(self, weight, debias)
+
+    def signal_smoothing(self):
+        """ML-Agents curriculum smoothing: 0.25 * previous + 0.75 * current, starting from 0"""
+        return Ema(self, 0.25, debias=False)
+
+    def rolling_mean(self, window, min_periods=None):
+        return Rolling(self, 'mean', window, min_periods)
+
+    def rolling_std(self, window, min_periods=None):
+        return Rolling(self, 'std', window, min_periods)
+
+    def rolling_quantile(self, window, q=0.5):
+        return Rolling(self, 'quantile', window, q)
+
+    def derivative(self, per_steps=1.0):
+        return Derivative(self, per_steps)
+
+    def rate_per_second(self):
+        return RatePerSecond(self)
+
+
+class Tag(Expr):
+    def __init__(self, name):
+        self.name = name
+        self.key = ('tag', name)
+
+    def compute(self, scalars):
+        return scalars.get(self.name, EMPTY)
+
+
+class Ema(Expr):
+    def __init__(self, source, weight, debias=True):
+        if not weight < 1:
+            raise ValueError(f"EMA weight must be < 1, got {weight}")
+        self.inputs = (source,)
+        self.key = ('ema', source.key, float(weight), bool(debias))
+        self.weight = weight
+        self.debias = debias
+
+    def compute(self, source):
+        return source._replace(values=ema(source.values, self.weight, self.debias))
+
+
+class Rolling(Expr):
+    def __init__(self, source, kind, window, param=None):
+        self.inputs = (source,)
+        self.key = ('rolling', kind, source.key, int(window), param)
+        self.kind = kind
+        self.window = int(window)
+        self.param = param
+
+    def compute(self, source):
+        if self.kind == 'mean':
+            values = rolling_mean(source.values, self.window, self.param)
+        elif self.kind == 'std':
+            values = rolling_std(source.values, self.window, self.param)
+        else:
+            values = rolling_quantile(source.values, self.window, 0.5 if self.param is None else self.param)
+        return source._replace(values=values)
+
+
+class Derivative(Expr):
+    def __init__(self, source, per_steps=1.0):
+        self.inputs = (source,)
+        self.key = ('derivative', source.key, float(per_steps))
+        self.per_steps = per_steps
+
+    def compute(self, source):
+        return source._replace(values=derivative(source.steps, source.values, self.per_steps))
+
+
+class RatePerSecond(Expr):
+    def __init__(self, source):
+        self.inputs = (source,)
+        self.key = ('rate', source.key)
+
+    def compute(self, source):
+        return source._replace(values=rate_per_second(source.wall_times, source.values))
+
+
+class Ratio(Expr):
+    """numerator / denominator, the denominator as-of joined onto the numerator's steps"""
+
+    def __init__(self, numerator, denominator):
+        self.inputs = (numerator, denominator)
+        self.key = ('ratio', numerator.key, denominator.key)
+
+    def compute(self, numerator, denominator):
+        aligned = asof(numerator.steps, denominator.steps, denominator.values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.where(aligned != 0, numerator.values / aligned, np.nan)
+        return numerator._replace(values=values)
+
+
+def tag(name):
+    return Tag(name)
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class DerivedMetrics:
+    """Evaluates expressions per run with a bounded LRU over raw and derived series"""
+
+    def __init__(self, results_dir="results", max_entries=512, check_files=True):
+        self.results_dir = results_dir
+        self.max_entries = max_entries
+        self.check_files = check_files
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._runs = None
+
+    def runs(self):
+        if self._runs is None:
+            self._runs = find_runs(self.results_dir)
+        return self._runs
+
+    def _signature(self, run_id):
+        """Event-file sizes and mtimes; a run that grows gets fresh cache keys"""
+        if not self.check_files:
+            return None
+        stats = [os.stat(p) for p in find_event_files(self.runs()[run_id])]
+        return tuple((s.st_size, s.st_mtime_ns) for s in stats)
+
+    def _get(self, key):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        return None
+
+    def _put(self, key, value):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def _scalars(self, run_id, signature):
+        key = (run_id, signature, ('scalars',))
+        scalars = self._get(key)
+        if scalars is None:
+            scalars = load_scalars(self.runs()[run_id])
+            self._put(key, scalars)
+        return scalars
+
+    def _evaluate(self, run_id, signature, expr):
+        key = (run_id, signature, expr.key)
+        result = self._get(key)
+        if result is not None:
+            return result
+        if isinstance(expr, Tag):
+            result = expr.compute(self._scalars(run_id, signature))
+        else:
+            result = expr.compute(*(self._evaluate(run_id, signature, e) for e in expr.inputs))
+        self._put(key, result)
+        return result
+
+    def evaluate(self, run_id, expr):
+        """ScalarSeries(steps, wall_times, values) for expr on one run"""
+        if isinstance(expr, str):
+            expr = Tag(expr)
+        if run_id not in self.runs():
+            raise KeyError(f"No event files for run '{run_id}' under {self.results_dir}")
+        return self._evaluate(run_id, self._signature(run_id), expr)
+
+    def evaluate_many(self, run_ids, expr):
+        return {run_id: self.evaluate(run_id, expr) for run_id in run_ids}
+
+    def invalidate(self, run_id=None):
+        if run_id is None:
+            self.cache.clear()
+            self._runs = None
+            return
+        for key in [k for k in self.cache if k[0] == run_id]:
+            del self.cache[key]
+
+    def stats(self):
+        return {'entries': len(self.cache), 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+
+def build_expression(tag_name, ops, ratio_tag=None):
+    """Chain CLI ops like ['ema:0.6', 'rolling_mean:50', 'derivative'] onto a tag"""
+    expr = Tag(tag_name)
+    if ratio_tag:
+        expr = expr / Tag(ratio_tag)
+    for op in ops:
+        name, _, arg = op.partition(':')
+        args = [float(a) for a in arg.split(',')] if arg else []
+        if name in ('rolling_mean', 'rolling_std'):
+            args = [int(args[0])] + args[1:]
+        elif name == 'rolling_quantile':
+            args = [int(args[0])] + args[1:]
+        method = getattr(expr, name, None)
+        if method is None or name.startswith('_'):
+            raise ValueError(f"Unknown operation '{name}'")
+        expr = method(*args)
+    return expr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate derived metrics over runs")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--runs", nargs="+", help="run ids (default: all)")
+    parser.add_argument("--tag", default="Environment/Cumulative Reward")
+    parser.add_argument("--ratio", help="divide by this tag (as-of joined) before applying ops")
+    parser.add_argument("--op", action="append", default=[],
+                        help="ema:W, signal_smoothing, rolling_mean:N, rolling_std:N, "
+                             "rolling_quantile:N,Q, derivative[:PER_STEPS], rate_per_second (repeatable, in order)")
+    parser.add_argument("--csv", help="write step,run,value rows to this file")
+    args = parser.parse_args()
+
+    engine = DerivedMetrics(args.results_dir)
+    try:
+        expr = build_expression(args.tag, args.op, args.ratio)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    run_ids = args.runs or sorted(engine.runs())
+
+    print(f"Expression: {expr.key}")
+    rows = []
+    for run_id in run_ids:
+        series = engine.evaluate(run_id, expr)
+        finite = np.isfinite(series.values)
+        if not finite.any():
+            print(f"  {run_id:12s}: no data")
+            continue
+        last = np.flatnonzero(finite)[-1]
+        print(f"  {run_id:12s}: {len(series.values):5d} points  final {series.values[last]:10.4f} "
+              f"at step {series.steps[last]}  min {np.nanmin(series.values):10.4f}  max {np.nanmax(series.values):10.4f}")
+        rows.extend((int(s), run_id, float(v)) for s, v in zip(series.steps, series.values))
+
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write("step,run,value\n")
+            f.writelines(f"{s},{r},{v}\n" for s, r, v in rows)
+        print(f"\nSaved to: {args.csv}")
+    print(f"Cache: {engine.stats()}")
+
+
+if __name__ == "__main__":
+    main()
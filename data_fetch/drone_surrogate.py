@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Vectorized NumPy surrogate of the 2D search-and-rescue drone task
+
+Steps thousands of environments per array operation so Random and Heuristic
+baselines can be measured (with real variance) instead of hard-coded.
+Follows the 9-observation layout and reward shaping from AGENT_IMPROVEMENTS.md:
+episodes end on an obstacle collision, when every victim is found, or at
+MAX_EPISODE_STEPS. The arena edges act as walls and carry no reward.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ---- Arena / physics ----
+ARENA_WIDTH = 35.0
+ARENA_HEIGHT = 20.0
+START_POSITION = (2.0, 2.0)
+DT = 0.1
+GRAVITY = 9.81
+MAX_THRUST = 2.0 * GRAVITY      # thrust-to-weight ratio of 2
+MAX_ANGULAR_ACCEL = 8.0
+MAX_SPEED = 10.0
+MAX_ANGULAR_SPEED = 4.0
+LINEAR_DRAG = 0.3
+ANGULAR_DRAG = 2.0
+HARD_LANDING_SPEED = 2.0
+MAX_EPISODE_STEPS = 1000
+
+# ---- Task layout ----
+N_VICTIMS = 5
+N_OBSTACLES = 4
+VICTIM_RADIUS = 1.5
+OBSTACLE_RADIUS = 1.0
+PROXIMITY_RANGE = 2.0
+DISTANCE_NORM = 35.0
+
+# ---- Reward shaping (AGENT_IMPROVEMENTS.md) ----
+PROGRESS_SCALE = 0.5
+PROXIMITY_PENALTY = 0.1
+OBSTACLE_COLLISION_PENALTY = -5.0
+HARD_LANDING_PENALTY = -5.0
+NOT_MOVING_PENALTY = -0.1
+CORRECT_TARGET_REWARD = 5.0
+ANY_VICTIM_REWARD = 2.0
+ALL_FOUND_EFFICIENCY_SCALE = 10.0
+ALL_FOUND_BONUS = 20.0
+
+OBSERVATION_SIZE = 9
+ACTION_SIZE = 2
+
+
+class DroneSurrogateEnv:
+    """Batch of independent 2D drone episodes stepped with array operations"""
+
+    def __init__(self, n_envs, seed=None, n_obstacles=N_OBSTACLES, max_steps=MAX_EPISODE_STEPS):
+        self.n_envs = n_envs
+        self.n_obstacles = n_obstacles
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        """Start a fresh episode in every environment and return observations"""
+        n = self.n_envs
+        rng = self.rng
+
+        self.pos = np.tile(np.asarray(START_POSITION, dtype=np.float64), (n, 1))
+        self.vel = np.zeros((n, 2))
+        self.angle = np.zeros(n)
+        self.angular_vel = np.zeros(n)
+
+        # Victims and obstacles spawn away from the start corner
+        self.victims = np.stack([
+            rng.uniform(6.0, ARENA_WIDTH - 2.0, (n, N_VICTIMS)),
+            rng.uniform(1.0, ARENA_HEIGHT - 3.0, (n, N_VICTIMS)),
+        ], axis=-1)
+        self.obstacles = np.stack([
+            rng.uniform(5.0, ARENA_WIDTH - 3.0, (n, self.n_obstacles)),
+            rng.uniform(2.0, ARENA_HEIGHT - 2.0, (n, self.n_obstacles)),
+        ], axis=-1)
+
+        self.found = np.zeros((n, N_VICTIMS), dtype=bool)
+        self.target_index = np.zeros(n, dtype=np.int64)
+        self.prev_distance = self._target_distance()
+
+        self.active = np.ones(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.episode_reward = np.zeros(n)
+        self.distance_traveled = np.zeros(n)
+        self.optimal_distance = np.zeros(n)
+        self.last_find_pos = self.pos.copy()
+        self.upright_sum = np.zeros(n)
+        self.ground_collision = np.zeros(n, dtype=bool)
+
+        return self.observe()
+
+    def _target_vector(self):
+        rows = np.arange(self.n_envs)
+        return self.victims[rows, self.target_index] - self.pos
+
+    def _target_distance(self):
+        return np.linalg.norm(self._target_vector(), axis=1)
+
+    def observe(self):
+        """Build the 9-value observation: pose (6) + target direction (2) + distance (1)"""
+        rel = self._target_vector()
+        dist = np.linalg.norm(rel, axis=1)
+        direction = rel / np.maximum(dist, 1e-6)[:, None]
+
+        obs = np.empty((self.n_envs, OBSERVATION_SIZE))
+        obs[:, 0] = self.pos[:, 0] / ARENA_WIDTH * 2.0 - 1.0
+        obs[:, 1] = self.pos[:, 1] / ARENA_HEIGHT * 2.0 - 1.0
+        obs[:, 2:4] = np.clip(self.vel / MAX_SPEED, -1.0, 1.0)
+        obs[:, 4] = self.angle / np.pi
+        obs[:, 5] = np.clip(self.angular_vel / MAX_ANGULAR_SPEED, -1.0, 1.0)
+        obs[:, 6:8] = direction
+        obs[:, 8] = dist / DISTANCE_NORM
+        return obs
+
+    def step(self, actions):
+        """Advance every active environment by one decision step
+
+        actions[:, 0] is collective thrust and actions[:, 1] is torque, both in [-1, 1].
+        Returns (observations, rewards, done) where done marks episodes that ended this step.
+        """
+        active = self.active
+        actions = np.clip(actions, -1.0, 1.0)
+        thrust = (actions[:, 0] + 1.0) * 0.5 * MAX_THRUST
+        torque = actions[:, 1] * MAX_ANGULAR_ACCEL
+
+        # Rigid-body update (semi-implicit Euler), frozen for finished episodes
+        self.angular_vel += (torque - ANGULAR_DRAG * self.angular_vel) * DT * active
+        self.angular_vel = np.clip(self.angular_vel, -MAX_ANGULAR_SPEED, MAX_ANGULAR_SPEED)
+        self.angle += self.angular_vel * DT * active
+        self.angle = (self.angle + np.pi) % (2.0 * np.pi) - np.pi
+
+        accel = np.empty((self.n_envs, 2))
+        accel[:, 0] = -np.sin(self.angle) * thrust - LINEAR_DRAG * self.vel[:, 0]
+        accel[:, 1] = np.cos(self.angle) * thrust - GRAVITY - LINEAR_DRAG * self.vel[:, 1]
+        self.vel += accel * DT * active[:, None]
+        self.vel = np.clip(self.vel, -MAX_SPEED, MAX_SPEED)
+        old_pos = self.pos.copy()
+        self.pos += self.vel * DT * active[:, None]
+
+        rewards = np.zeros(self.n_envs)
+        done = np.zeros(self.n_envs, dtype=bool)
+
+        # Ground contact: the drone rests on the ground; a fast or tilted touchdown is a hard landing
+        on_ground = active & (self.pos[:, 1] <= 0.0)
+        touchdown = on_ground & (old_pos[:, 1] > 0.0)
+        hard_landing = touchdown & ((-self.vel[:, 1] > HARD_LANDING_SPEED) | (np.abs(self.angle) > 0.5))
+        rewards += HARD_LANDING_PENALTY * hard_landing
+        self.ground_collision |= hard_landing
+
+        # Walls: clamp to the arena and stop motion into the wall
+        clamped = np.clip(self.pos, 0.0, (ARENA_WIDTH, ARENA_HEIGHT))
+        hit_wall = clamped != self.pos
+        self.pos = clamped
+        self.vel[hit_wall] = 0.0
+
+        # Obstacles: proximity penalty inside PROXIMITY_RANGE, collision ends the episode
+        clearance = np.linalg.norm(self.obstacles - self.pos[:, None, :], axis=2) - OBSTACLE_RADIUS
+        min_clearance = clearance.min(axis=1) if self.n_obstacles else np.full(self.n_envs, np.inf)
+        hit_obstacle = active & (min_clearance <= 0.0)
+        near = active & ~hit_obstacle & (min_clearance < PROXIMITY_RANGE)
+        rewards -= np.where(near, PROXIMITY_PENALTY * (1.0 - min_clearance / PROXIMITY_RANGE), 0.0)
+        rewards += OBSTACLE_COLLISION_PENALTY * hit_obstacle
+        done |= hit_obstacle
+
+        speed = np.linalg.norm(self.vel, axis=1)
+        rewards += NOT_MOVING_PENALTY * (active & (speed < 0.1))
+
+        step_length = np.linalg.norm(self.pos - old_pos, axis=1)
+        self.distance_traveled += step_length
+
+        # Victims: +5 for the current target, +2 for any other victim reached
+        victim_dist = np.linalg.norm(self.victims - self.pos[:, None, :], axis=2)
+        reached = active[:, None] & ~self.found & (victim_dist < VICTIM_RADIUS)
+        rows = np.arange(self.n_envs)
+        reached_target = reached[rows, self.target_index]
+        rewards += CORRECT_TARGET_REWARD * reached_target
+        rewards += ANY_VICTIM_REWARD * (reached.sum(axis=1) - reached_target)
+        if reached.any():
+            leg = np.linalg.norm(self.victims - self.last_find_pos[:, None, :], axis=2)
+            self.optimal_distance += (leg * reached).sum(axis=1)
+            any_reached = reached.any(axis=1)
+            self.last_find_pos[any_reached] = self.pos[any_reached]
+            self.found |= reached
+            # Next target is the first victim (in spawn order) still unfound
+            unfound = ~self.found
+            self.target_index = np.where(unfound.any(axis=1), unfound.argmax(axis=1), self.target_index)
+
+        # Progress shaping toward the (possibly new) target
+        distance = self._target_distance()
+        progress = self.prev_distance - distance
+        progress[reached_target] = 0.0
+        rewards += PROGRESS_SCALE * progress * active
+        self.prev_distance = distance
+
+        all_found = active & self.found.all(axis=1)
+        efficiency = self.path_efficiency()
+        rewards += (ALL_FOUND_EFFICIENCY_SCALE * efficiency + ALL_FOUND_BONUS) * all_found
+        done |= all_found
+
+        self.upright_sum += np.maximum(np.cos(self.angle), 0.0) * active
+        self.steps += active
+        done |= active & (self.steps >= self.max_steps)
+
+        rewards *= active
+        self.episode_reward += rewards
+        self.active = active & ~done
+        return self.observe(), rewards, done
+
+    def path_efficiency(self):
+        """Straight-line length of the legs flown so far over distance actually traveled"""
+        return np.clip(self.optimal_distance / np.maximum(self.distance_traveled, 1e-6), 0.0, 1.0)
+
+    def episode_metrics(self):
+        """Per-episode metrics named like the ML-Agents custom stats"""
+        return {
+            'Reward': self.episode_reward.copy(),
+            'TargetsFound': self.found.sum(axis=1).astype(np.float64),
+            'PathEfficiency': self.path_efficiency(),
+            'AngleStability': self.upright_sum / np.maximum(self.steps, 1),
+            'GroundCollision': self.ground_collision.astype(np.float64),
+            'EpisodeLength': self.steps.astype(np.float64),
+        }
+
+
+def random_policy(obs, rng):
+    """Uniform random thrust and torque"""
+    return rng.uniform(-1.0, 1.0, (obs.shape[0], ACTION_SIZE))
+
+
+def heuristic_policy(obs, rng):
+    """Fly straight at the current target with a PD attitude controller (ignores obstacles)"""
+    vel = obs[:, 2:4] * MAX_SPEED
+    angle = obs[:, 4] * np.pi
+    angular_vel = obs[:, 5] * MAX_ANGULAR_SPEED
+    direction = obs[:, 6:8]
+    distance = obs[:, 8] * DISTANCE_NORM
+    altitude = (obs[:, 1] + 1.0) * 0.5 * ARENA_HEIGHT
+
+    desired_speed = np.minimum(4.0, 1.5 * distance)[:, None]
+    desired_vel = direction * desired_speed
+    # Keep clear of the ground while cruising
+    desired_vel[:, 1] = np.where(altitude < 1.5, np.maximum(desired_vel[:, 1], 1.0), desired_vel[:, 1])
+
+    accel = 1.5 * (desired_vel - vel)
+    accel[:, 1] += GRAVITY
+    desired_angle = np.clip(np.arctan2(-accel[:, 0], accel[:, 1]), -0.6, 0.6)
+    thrust = np.linalg.norm(accel, axis=1) / MAX_THRUST
+
+    actions = np.empty((obs.shape[0], ACTION_SIZE))
+    actions[:, 0] = np.clip(thrust, 0.0, 1.0) * 2.0 - 1.0
+    actions[:, 1] = np.clip((6.0 * (desired_angle - angle) - 2.0 * angular_vel) / MAX_ANGULAR_ACCEL, -1.0, 1.0)
+    return actions
+
+
+POLICIES = {
+    'Random': random_policy,
+    'Heuristic': heuristic_policy,
+}
+
+
+def run_episodes(policy_name, n_episodes, seed=None, max_steps=MAX_EPISODE_STEPS):
+    """Run one episode in each of n_episodes batched environments"""
+    policy = POLICIES[policy_name]
+    env = DroneSurrogateEnv(n_episodes, seed=seed, max_steps=max_steps)
+    policy_rng = np.random.default_rng(None if seed is None else seed + 1)
+
+    obs = env.observe()
+    while env.active.any():
+        obs, _, _ = env.step(policy(obs, policy_rng))
+
+    return env.episode_metrics()
+
+
+def _run_chunk(args):
+    return run_episodes(*args)
+
+
+def summarize_episodes(metrics):
+    """Collapse per-episode arrays into the {'mean', 'std', 'count'} layout used by MetricExtractor"""
+    return {
+        name: {
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values)),
+            'count': int(len(values)),
+        }
+        for name, values in metrics.items()
+    }
+
+
+def evaluate_policy(policy_name, n_episodes=1000, workers=None, seed=0, chunk_size=2048):
+    """Evaluate a baseline policy across a process pool and summarize its episodes"""
+    if policy_name not in POLICIES:
+        raise ValueError(f"Unknown policy {policy_name!r}; expected one of {list(POLICIES)}")
+
+    chunks = []
+    remaining = n_episodes
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        chunks.append((policy_name, size, seed + 2 * len(chunks)))
+        remaining -= size
+
+    if workers is None:
+        workers = min(len(chunks), os.cpu_count() or 1)
+
+    if workers <= 1 or len(chunks) == 1:
+        results = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_chunk, chunks))
+
+    merged = {name: np.concatenate([r[name] for r in results]) for name in results[0]}
+    return summarize_episodes(merged)
+
+
+def measure_baselines(n_episodes=1000, workers=None, seed=0):
+    """Measured Random and Heuristic baselines for the comparison tables"""
+    return {
+        policy_name: evaluate_policy(policy_name, n_episodes, workers=workers, seed=seed)
+        for policy_name in POLICIES
+    }
+
+
+def main():
+    """Print measured baselines"""
+    start = time.perf_counter()
+    baselines = measure_baselines(n_episodes=10000)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 60)
+    print("SURROGATE BASELINES")
+    print("=" * 60)
+    for policy_name, results in baselines.items():
+        print(f"\n{policy_name}:")
+        for metric, stats in results.items():
+            print(f"  {metric:15s}: {stats['mean']:8.3f} ± {stats['std']:7.3f} (N={stats['count']})")
+    print(f"\nEvaluated in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Reader for the per-episode binary metric logs written by EpisodeMetricLog.cs
+
+Each file is a 32-byte header followed by fixed-width 48-byte records, so a
+log maps straight onto a NumPy structured array with np.memmap: slicing and
+column access are zero-copy and millions of episodes summarize in a few
+vectorized passes. Logs live in results/<run>/episode_logs/*.bin.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+MAGIC = b"DEPLOG\x00\x00"
+VERSION = 1
+LOG_DIR = "episode_logs"
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4'),
+    ('start_time', '<f8'),
+    ('reserved', '<u8'),
+])
+
+# Must match the write order in EpisodeMetricLog.Append
+RECORD_DTYPE = np.dtype([
+    ('step', '<i8'),
+    ('wall_time', '<f8'),
+    ('agent_id', '<i4'),
+    ('episode_length', '<i4'),
+    ('reward', '<f4'),
+    ('targets_found', '<i4'),
+    ('path_efficiency', '<f4'),
+    ('angle_stability', '<f4'),
+    ('ground_collision', 'u1'),
+    ('boundary_exit', 'u1'),
+    ('max_step_reached', 'u1'),
+    ('lesson', 'u1'),
+    ('distance_travelled', '<f4'),
+])
+
+HEADER_SIZE = HEADER_DTYPE.itemsize
+RECORD_SIZE = RECORD_DTYPE.itemsize
+assert HEADER_SIZE == 32 and RECORD_SIZE == 48
+
+
+class EpisodeLogError(ValueError):
+    pass
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise EpisodeLogError(f"{path}: file shorter than the header")
+    header = np.frombuffer(raw, dtype=HEADER_DTYPE)[0]
+    if raw[:len(MAGIC)] != MAGIC:
+        raise EpisodeLogError(f"{path}: not an episode log (bad magic)")
+    if header['version'] != VERSION:
+        raise EpisodeLogError(f"{path}: unsupported version {header['version']}")
+    if header['record_size'] != RECORD_SIZE:
+        raise EpisodeLogError(f"{path}: record size {header['record_size']} != {RECORD_SIZE}")
+    return header
+
+
+def open_episode_log(path):
+    """Memory-mapped structured array of every complete record (a partial trailing record is ignored)"""
+    read_header(path)
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+    if n_records == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+
+
+def find_episode_logs(run_dir):
+    return sorted(glob.glob(os.path.join(run_dir, LOG_DIR, "*.bin")))
+
+
+def load_run_episodes(run_dir):
+    """All episodes of a run sorted by step; a single log is returned as its memmap without copying"""
+    logs = [open_episode_log(p) for p in find_episode_logs(run_dir)]
+    logs = [log for log in logs if len(log)]
+    if not logs:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    if len(logs) == 1:
+        return logs[0]
+    records = np.concatenate(logs)
+    return records[np.argsort(records['step'], kind='stable')]
+
+
+def episode_summary(records, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Exact per-episode rates and distributions"""
+    if len(records) == 0:
+        return {'episodes': 0}
+    summary = {
+        'episodes': int(len(records)),
+        'first_step': int(records['step'][0]),
+        'last_step': int(records['step'][-1]),
+        'collision_rate': float(records['ground_collision'].mean()),
+        'boundary_exit_rate': float(records['boundary_exit'].mean()),
+        'timeout_rate': float(records['max_step_reached'].mean()),
+        'targets_histogram': np.bincount(records['targets_found'].clip(0)).tolist(),
+    }
+    for field in ('reward', 'targets_found', 'path_efficiency', 'angle_stability', 'episode_length'):
+        column = records[field].astype(np.float64)
+        summary[field] = {
+            'mean': float(column.mean()),
+            'std': float(column.std()),
+            'quantiles': dict(zip((f"q{int(q * 100):02d}" for q in quantiles),
+                                  np.quantile(column, quantiles).tolist())),
+        }
+    return summary
+
+
+def bin_by_step(records, summary_freq=10000):
+    """Per-summary-window means like the event files report, plus exact collision rates"""
+    if len(records) == 0:
+        return {}
+    window = records['step'] // summary_freq
+    ids, inverse, counts = np.unique(window, return_inverse=True, return_counts=True)
+    out = {'step': (ids + 1) * summary_freq, 'episodes': counts}
+    for field in ('reward', 'targets_found', 'path_efficiency', 'angle_stability', 'ground_collision', 'episode_length'):
+        out[field] = np.bincount(inverse, weights=records[field].astype(np.float64)) / counts
+    return out
+
+
+def write_episode_log(path, records, start_time=None):
+    """Write records in the same format as EpisodeMetricLog.cs (for tests and tooling)"""
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['record_size'] = RECORD_SIZE
+    header['start_time'] = time.time() if start_time is None else start_time
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(np.asarray(records, dtype=RECORD_DTYPE).tobytes())
+
+
+def generate_episodes(n_episodes, seed=0, start_step=0, mean_length=400, n_agents=1, start_time=None):
+    """Synthetic episodes whose metrics improve over training, for exercising the reader"""
+    rng = np.random.default_rng(seed)
+    records = np.zeros(n_episodes, dtype=RECORD_DTYPE)
+    lengths = rng.poisson(mean_length, n_episodes).clip(1).astype(np.int32)
+    steps = start_step + np.cumsum(lengths) // max(1, n_agents)
+    progress = np.linspace(0.0, 1.0, n_episodes)
+    skill = progress + rng.normal(0.0, 0.15, n_episodes)
+
+    records['step'] = steps
+    records['wall_time'] = (time.time() if start_time is None else start_time) + steps * 2e-3
+    records['agent_id'] = rng.integers(0, max(1, n_agents), n_episodes)
+    records['episode_length'] = lengths
+    records['targets_found'] = rng.binomial(5, np.clip(0.1 + 0.7 * skill, 0.0, 1.0))
+    records['ground_collision'] = rng.random(n_episodes) < np.clip(0.6 - 0.5 * skill, 0.02, 1.0)
+    records['boundary_exit'] = ~records['ground_collision'].astype(bool) & (rng.random(n_episodes) < 0.05)
+    records['max_step_reached'] = (records['ground_collision'] == 0) & (records['boundary_exit'] == 0) & \
+        (rng.random(n_episodes) < 0.3)
+    records['path_efficiency'] = np.clip(0.2 + 0.6 * skill + rng.normal(0, 0.05, n_episodes), 0, 1)
+    records['angle_stability'] = np.clip(0.5 + 0.4 * skill + rng.normal(0, 0.05, n_episodes), 0, 1)
+    records['distance_travelled'] = lengths * rng.uniform(0.05, 0.2, n_episodes)
+    records['lesson'] = np.minimum((progress * 4).astype(np.uint8), 3)
+    records['reward'] = (1.5 * records['targets_found'] + 5 * records['path_efficiency']
+                         - 10 * records['ground_collision'] - 50 * records['boundary_exit']
+                         + rng.normal(0, 1, n_episodes))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize per-episode binary metric logs")
+    parser.add_argument("paths", nargs="+", help="run directories or .bin files")
+    parser.add_argument("--summary-freq", type=int, default=10000)
+    parser.add_argument("--generate", type=int, metavar="N", help="write N synthetic episodes to each path instead")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if args.generate:
+            target = path if path.endswith(".bin") else os.path.join(path, LOG_DIR, "synthetic.bin")
+            write_episode_log(target, generate_episodes(args.generate, args.seed))
+            print(f"Wrote {args.generate} episodes to {target}")
+            continue
+
+        records = open_episode_log(path) if path.endswith(".bin") else load_run_episodes(path)
+        summary = episode_summary(records)
+        print(f"\n{path}: {summary['episodes']} episodes")
+        if not summary['episodes']:
+            continue
+        print(f"  steps {summary['first_step']} - {summary['last_step']}")
+        print(f"  collision rate {summary['collision_rate'] * 100:.1f}%  boundary exits "
+              f"{summary['boundary_exit_rate'] * 100:.1f}%  timeouts {summary['timeout_rate'] * 100:.1f}%")
+        for field in ('reward', 'targets_found', 'path_efficiency', 'angle_stability', 'episode_length'):
+            stats = summary[field]
+            q = stats['quantiles']
+            print(f"  {field:16s}: mean {stats['mean']:8.3f}  std {stats['std']:7.3f}  "
+                  f"median {q['q50']:8.3f}  [q05 {q['q05']:.3f}, q95 {q['q95']:.3f}]")
+        print(f"  targets found histogram: {summary['targets_histogram']}")
+
+        windows = bin_by_step(records, args.summary_freq)
+        print(f"  {len(windows['step'])} summary windows; last window collision rate "
+              f"{windows['ground_collision'][-1] * 100:.1f}% over {windows['episodes'][-1]} episodes")
+
+
+if __name__ == "__main__":
+    main()
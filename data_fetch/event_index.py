@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Sidecar block index for event files: seek straight to a step window or tag
+
+Every events.out.tfevents.<...> file gets an events.out.index.<...> sidecar
+(an uncompressed .npz; no "tfevents" in the name, so TensorBoard skips it) that splits the file into coarse blocks of up to
+BLOCK_RECORDS consecutive scalar records, with each block's byte range,
+min/max step and a bitmap of the tags it contains, plus the offset, step
+and tag of every scalar record. Non-scalar records (hyperparameter text,
+graphs and the like) fall between blocks and are never read back. A query
+reads only the blocks whose step range and tags overlap the request and
+decodes only the matching records in them, so tail-window and single-tag
+reads cost about the size of the answer instead of the whole file.
+
+The sidecar records the file's size and mtime. A file that only grew (a
+run still training) is indexed incrementally from the last indexed record;
+anything else is re-indexed from scratch.
+
+    python event_index.py build --results-dir results
+    python event_index.py query drone6.1 --last 500000 --tags "Environment/Cumulative Reward"
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tfevents import (
+    FOOTER_SIZE,
+    find_event_files,
+    find_runs,
+    iter_records,
+    parse_event,
+    record_payload,
+    rows_to_series,
+    sidecar_path,
+)
+
+# <event file>.index sidecars from before sidecar_path; TensorBoard read them as event files
+LEGACY_INDEX_SUFFIX = ".index"
+INDEX_VERSION = 2   # 2: records failing their CRCs are left out
+# Records per block: ML-Agents writes one record per tag per summary, so a
+# block covers a few summary steps of every tag and is a few KB on disk
+BLOCK_RECORDS = 64
+# record_tag of an Event carrying several scalars (not written by ML-Agents, but legal)
+MULTI_TAG = -1
+
+
+def index_path(path):
+    return sidecar_path(path, "index")
+
+
+def _empty_index(size=0, mtime=0.0):
+    return {
+        'version': INDEX_VERSION, 'size': size, 'mtime': mtime, 'indexed_end': 0, 'last_crc': b'',
+        'tags': [], 'start': [], 'end': [], 'min_step': [], 'max_step': [], 'records': [], 'tag_sets': [],
+        'record_start': [], 'record_step': [], 'record_tag': [],
+    }
+
+
+def _extend(index, path, size, mtime):
+    """Index the complete records after index['indexed_end'] and append them as new blocks"""
+    with open(path, 'rb') as f:
+        f.seek(index['indexed_end'])
+        data = f.read(size - index['indexed_end'])
+    base = index['indexed_end']
+    tag_ids = {tag: i for i, tag in enumerate(index['tags'])}
+    block = None
+
+    def close():
+        if block is not None:
+            index['start'].append(block[0])
+            index['end'].append(block[1])
+            index['min_step'].append(block[2])
+            index['max_step'].append(block[3])
+            index['records'].append(block[4])
+            index['tag_sets'].append(block[5])
+
+    consumed = 0
+    for start, end, payload in iter_records(data):
+        consumed = end
+        try:
+            _, step, scalars = parse_event(payload) if payload is not None else (0.0, 0, [])
+        except ValueError:
+            scalars = []
+        if not scalars:
+            close()
+            block = None
+            continue
+        ids = set()
+        for tag, _ in scalars:
+            if tag not in tag_ids:
+                tag_ids[tag] = len(index['tags'])
+                index['tags'].append(tag)
+            ids.add(tag_ids[tag])
+        index['record_start'].append(base + start)
+        index['record_step'].append(step)
+        index['record_tag'].append(next(iter(ids)) if len(ids) == 1 else MULTI_TAG)
+        if block is None:
+            block = [base + start, base + end, step, step, 1, ids]
+        else:
+            block[1] = base + end
+            block[2] = min(block[2], step)
+            block[3] = max(block[3], step)
+            block[4] += 1
+            block[5] |= ids
+        if block[4] == BLOCK_RECORDS:
+            close()
+            block = None
+    close()
+    if consumed:
+        index['last_crc'] = bytes(data[consumed - FOOTER_SIZE:consumed])
+        index['indexed_end'] = base + consumed
+    index['size'], index['mtime'] = size, mtime
+    return index
+
+
+def _to_arrays(index):
+    n_tags = len(index['tags'])
+    mask = np.zeros((len(index['tag_sets']), max(n_tags, 1)), dtype=bool)
+    for i, ids in enumerate(index['tag_sets']):
+        mask[i, list(ids)] = True
+    return {
+        'version': np.int64(INDEX_VERSION),
+        'size': np.int64(index['size']),
+        'mtime': np.float64(index['mtime']),
+        'indexed_end': np.int64(index['indexed_end']),
+        'last_crc': np.frombuffer(index['last_crc'], dtype=np.uint8),
+        'tags': np.array(index['tags'], dtype=str),
+        'start': np.array(index['start'], dtype=np.int64),
+        'end': np.array(index['end'], dtype=np.int64),
+        'min_step': np.array(index['min_step'], dtype=np.int64),
+        'max_step': np.array(index['max_step'], dtype=np.int64),
+        'records': np.array(index['records'], dtype=np.int32),
+        'tag_mask': np.packbits(mask, axis=1),
+        'record_start': np.array(index['record_start'], dtype=np.int64),
+        'record_step': np.array(index['record_step'], dtype=np.int64),
+        'record_tag': np.array(index['record_tag'], dtype=np.int32),
+    }
+
+
+def _from_arrays(arrays):
+    n_tags = len(arrays['tags'])
+    mask = np.unpackbits(arrays['tag_mask'], axis=1, count=max(n_tags, 1)).astype(bool)
+    return {
+        'version': int(arrays['version']), 'size': int(arrays['size']), 'mtime': float(arrays['mtime']),
+        'indexed_end': int(arrays['indexed_end']), 'last_crc': arrays['last_crc'].tobytes(),
+        'tags': arrays['tags'].tolist(),
+        'start': arrays['start'].tolist(), 'end': arrays['end'].tolist(),
+        'min_step': arrays['min_step'].tolist(), 'max_step': arrays['max_step'].tolist(),
+        'records': arrays['records'].tolist(),
+        'tag_sets': [set(np.flatnonzero(row).tolist()) for row in mask[:, :n_tags]],
+        'record_start': arrays['record_start'].tolist(),
+        'record_step': arrays['record_step'].tolist(),
+        'record_tag': arrays['record_tag'].tolist(),
+    }
+
+
+def read_index(path):
+    """The sidecar of an event file as arrays, or None when missing, unreadable or another version"""
+    try:
+        with np.load(index_path(path)) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    if int(arrays.get('version', -1)) != INDEX_VERSION:
+        return None
+    return arrays
+
+
+def write_index(path, arrays):
+    """Atomically write the sidecar; returns False when the directory is not writable"""
+    directory, name = os.path.split(index_path(path))
+    # Leading dot so a concurrent find_event_files never sees the partial file
+    tmp = os.path.join(directory, '.' + name + '.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, index_path(path))
+    except OSError:
+        return False
+    if os.path.exists(path + LEGACY_INDEX_SUFFIX):
+        try:
+            os.remove(path + LEGACY_INDEX_SUFFIX)
+        except OSError:
+            pass
+    return True
+
+
+def _appended_only(path, arrays):
+    """True when the file still holds the indexed records unchanged (it only grew)"""
+    end = int(arrays['indexed_end'])
+    if os.path.getsize(path) < int(arrays['size']):
+        return False
+    if not end:
+        return True
+    with open(path, 'rb') as f:
+        f.seek(end - FOOTER_SIZE)
+        return f.read(FOOTER_SIZE) == arrays['last_crc'].tobytes()
+
+
+def ensure_index(path, force=False, write=True):
+    """Up-to-date index arrays for an event file, building or extending the sidecar when stale
+
+    Returns (arrays, action) with action one of 'fresh', 'extended', 'built'.
+    """
+    stat = os.stat(path)
+    arrays = None if force else read_index(path)
+    if arrays is not None and int(arrays['size']) == stat.st_size and float(arrays['mtime']) == stat.st_mtime:
+        return arrays, 'fresh'
+    if arrays is not None and _appended_only(path, arrays):
+        index, action = _from_arrays(arrays), 'extended'
+    else:
+        index, action = _empty_index(), 'built'
+    arrays = _to_arrays(_extend(index, path, stat.st_size, stat.st_mtime))
+    if write:
+        write_index(path, arrays)
+    return arrays, action
+
+
+def select_blocks(arrays, start=None, end=None, tags=None):
+    """Indices of the blocks that may hold points of tags with start <= step <= end"""
+    keep = np.ones(len(arrays['start']), dtype=bool)
+    if start is not None:
+        keep &= arrays['max_step'] >= start
+    if end is not None:
+        keep &= arrays['min_step'] <= end
+    if tags is not None:
+        ids = np.flatnonzero(np.isin(arrays['tags'], list(tags)))
+        if not len(ids):
+            return np.zeros(0, dtype=np.int64)
+        mask = np.unpackbits(arrays['tag_mask'], axis=1, count=max(len(arrays['tags']), 1)).astype(bool)
+        keep &= mask[:, ids].any(axis=1)
+    return np.flatnonzero(keep)
+
+
+def byte_ranges(arrays, blocks):
+    """Merge selected blocks that are adjacent on disk into (start, end) reads"""
+    ranges = []
+    for start, end in zip(arrays['start'][blocks].tolist(), arrays['end'][blocks].tolist()):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def read_points(path, start=None, end=None, tags=None, arrays=None):
+    """(tag, step, wall_time, value) points of one file in a step window; returns (points, bytes read)
+
+    Each covering block range is read in one go, and within it only the
+    records whose indexed step and tag match are decoded.
+    """
+    if arrays is None:
+        arrays, _ = ensure_index(path)
+    wanted = None if tags is None else set(tags)
+    record_start, record_step = arrays['record_start'], arrays['record_step']
+    match = np.ones(len(record_start), dtype=bool)
+    if start is not None:
+        match &= record_step >= start
+    if end is not None:
+        match &= record_step <= end
+    if wanted is not None:
+        match &= np.isin(arrays['record_tag'], np.append(np.flatnonzero(np.isin(arrays['tags'], list(wanted))), MULTI_TAG))
+
+    points, read = [], 0
+    with open(path, 'rb') as f:
+        for lo, hi in byte_ranges(arrays, select_blocks(arrays, start, end, wanted)):
+            first, last = np.searchsorted(record_start, [lo, hi])
+            offsets = record_start[first:last][match[first:last]] - lo
+            if not len(offsets):
+                continue
+            f.seek(lo)
+            buf = f.read(hi - lo)
+            read += hi - lo
+            for offset in offsets.tolist():
+                wall_time, step, scalars = parse_event(record_payload(buf, offset))
+                for tag, value in scalars:
+                    if wanted is None or tag in wanted:
+                        points.append((tag, step, wall_time, value))
+    return points, read
+
+
+def run_indexes(run_dir):
+    """[(event file, index arrays)] for a run, oldest file first"""
+    return [(path, ensure_index(path)[0]) for path in find_event_files(run_dir)]
+
+
+def last_step(indexes):
+    """Largest step of any indexed scalar, or None"""
+    steps = [int(arrays['max_step'].max()) for _, arrays in indexes if len(arrays['max_step'])]
+    return max(steps) if steps else None
+
+
+def load_window(run_dir, tags=None, start=None, end=None, indexes=None):
+    """load_scalars restricted to start <= step <= end, read through the sidecars
+
+    Returns ({tag: ScalarSeries}, bytes read).
+    """
+    if indexes is None:
+        indexes = run_indexes(run_dir)
+    raw, read = {}, 0
+    for path, arrays in indexes:
+        points, n = read_points(path, start, end, tags, arrays)
+        read += n
+        for tag, step, wall_time, value in points:
+            raw.setdefault(tag, []).append((step, wall_time, value))
+    return rows_to_series(raw), read
+
+
+def load_tail(run_dir, steps, tags=None):
+    """The last `steps` steps of a run, e.g. the final 500K the comparison scripts analyze"""
+    indexes = run_indexes(run_dir)
+    last = last_step(indexes)
+    if last is None:
+        return {}, 0
+    return load_window(run_dir, tags, start=last - steps, indexes=indexes)
+
+
+def _index_worker(task):
+    path, force = task
+    arrays, action = ensure_index(path, force)
+    return path, action, len(arrays['start'])
+
+
+def index_tree(results_dir="results", force=False, workers=None):
+    """Build or refresh the sidecar of every event file under results_dir; returns [(path, action, blocks)]"""
+    tasks = [(p, force) for run_dir in find_runs(results_dir).values() for p in find_event_files(run_dir)]
+    if workers == 1 or len(tasks) <= 1:
+        return [_index_worker(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_index_worker, tasks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sidecar block indexes for random access into event files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="build or refresh the sidecars of every run")
+    p_build.add_argument("--results-dir", default="results")
+    p_build.add_argument("--force", action="store_true", help="re-index every file from scratch")
+    p_build.add_argument("--workers", type=int)
+
+    p_query = sub.add_parser("query", help="read a step window of one run through the index")
+    p_query.add_argument("run_id")
+    p_query.add_argument("--results-dir", default="results")
+    p_query.add_argument("--tags", nargs="+")
+    p_query.add_argument("--start", type=int)
+    p_query.add_argument("--end", type=int)
+    p_query.add_argument("--last", type=int, help="only the last N steps of the run")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        results = index_tree(args.results_dir, args.force, args.workers)
+        counts = {}
+        for _, action, _ in results:
+            counts[action] = counts.get(action, 0) + 1
+        summary = ", ".join(f"{n} {action}" for action, n in sorted(counts.items()))
+        print(f"Indexed {len(results)} event files ({summary}) in {time.perf_counter() - start:.2f}s")
+        return
+
+    run_dir = os.path.join(args.results_dir, args.run_id)
+    files = find_event_files(run_dir)
+    if not files:
+        raise SystemExit(f"No event files under {run_dir}")
+    total = sum(os.path.getsize(p) for p in files)
+    for path in files:
+        ensure_index(path)
+
+    begin = time.perf_counter()
+    if args.last is not None:
+        series, read = load_tail(run_dir, args.last, args.tags)
+    else:
+        series, read = load_window(run_dir, args.tags, args.start, args.end)
+    elapsed = time.perf_counter() - begin
+
+    for tag, s in sorted(series.items()):
+        print(f"{tag:40s} {len(s.steps):6d} points  steps {s.steps[0]:>11,} - {s.steps[-1]:>11,}  "
+              f"mean {s.values.mean():10.4f}")
+    print(f"\nRead {read:,} of {total:,} bytes ({read / total:.1%}) from {len(files)} files "
+          f"in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
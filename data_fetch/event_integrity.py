@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Parallel integrity scanner and salvage tool for event files
+
+Checks every record's length CRC and data CRC in all event files under
+results/ (one worker process per file) and reports the exact byte ranges
+that are damaged: bad length headers, records whose data CRC fails, and
+truncated tails. After a damaged region the scan resynchronizes on the
+record framing (the next offset whose length CRC and data CRC both check
+out), so every valid record after it is kept. --salvage writes a copy with
+only the valid records next to the original as events.out.salvaged.<...>;
+--replace then swaps it in and keeps the original as events.out.damaged.<...>.
+Neither name contains "tfevents", so TensorBoard does not read them twice.
+
+CRCs are computed for all records of a file at once with NumPy (one table
+lookup per byte position across every record), or with the crc32c C
+module when it is installed.
+
+    python event_integrity.py --results-dir results
+    python event_integrity.py --results-dir results --salvage
+"""
+
+import argparse
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import tfevents
+from tfevents import FOOTER_SIZE, HEADER_SIZE, find_event_files, sidecar_path
+
+SALVAGED = "salvaged"
+DAMAGED = "damaged"
+# Records are cut into chunks of this many bytes whose CRCs are computed side by side
+CHUNK_SIZE = 64
+# Candidate offsets examined per vectorized resync step
+RESYNC_WINDOW = 1 << 16
+
+_TABLE = np.array(tfevents._CRC32C_TABLE, dtype=np.uint32)
+_MASK_DELTA = np.uint32(0xA282EAD8)
+_SHIFT_TABLES = {}
+
+
+def _mask(crc):
+    return ((crc >> np.uint32(15)) | (crc << np.uint32(17))) + _MASK_DELTA
+
+
+def _shift_tables(n):
+    """Byte tables for advancing a CRC register over n zero bytes (a linear map)"""
+    if n not in _SHIFT_TABLES:
+        x = (np.arange(256, dtype=np.uint32)[None, :] << (8 * np.arange(4, dtype=np.uint32))[:, None]).ravel()
+        for _ in range(n):
+            x = _TABLE[x & 0xFF] ^ (x >> np.uint32(8))
+        _SHIFT_TABLES[n] = x.reshape(4, 256)
+    return _SHIFT_TABLES[n]
+
+
+def _shift(tables, reg):
+    return (tables[0][reg & 0xFF] ^ tables[1][(reg >> np.uint32(8)) & 0xFF]
+            ^ tables[2][(reg >> np.uint32(16)) & 0xFF] ^ tables[3][reg >> np.uint32(24)])
+
+
+def masked_crc_batch(data, starts, lengths):
+    """Masked CRC32C of data[start:start + length] for every (start, length), as uint32
+
+    Every record is left-padded with zeros to a whole number of chunks and the
+    chunk CRCs are computed together, one table lookup per byte position. CRC
+    is linear, so a record's CRC is then folded from its chunk CRCs; the
+    0xFFFFFFFF initial value is applied by complementing the first 4 bytes.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    out = np.empty(len(starts), dtype=np.uint32)
+    if not len(starts):
+        return out
+
+    if tfevents.crc32c is not tfevents._crc32c_python:
+        view = memoryview(data)
+        for i, (start, length) in enumerate(zip(starts.tolist(), lengths.tolist())):
+            out[i] = tfevents.masked_crc32c(view[start:start + length])
+        return out
+
+    short = np.flatnonzero(lengths < 4)
+    for i in short.tolist():
+        out[i] = tfevents.masked_crc32c(bytes(data[starts[i]:starts[i] + lengths[i]]))
+    if len(short) == len(starts):
+        return out
+
+    records = np.flatnonzero(lengths >= 4)
+    chunk = int(min(CHUNK_SIZE, lengths[records].max()))
+    n_chunks = -(-lengths[records] // chunk)
+    # Longest records first, so the records still being folded at step j are a prefix
+    order = np.argsort(-n_chunks, kind='stable')
+    records, n_chunks = records[order], n_chunks[order]
+    rec_starts = starts[records]
+    first_chunk = np.concatenate(([0], np.cumsum(n_chunks)[:-1]))
+    owner = np.repeat(np.arange(len(records)), n_chunks)
+    chunk_index = np.arange(len(owner)) - first_chunk[owner]
+    padded_start = rec_starts + lengths[records] - n_chunks * chunk
+    chunk_offsets = (padded_start[owner] + chunk_index * chunk) - rec_starts[owner]
+    chunk_starts = rec_starts[owner] + chunk_offsets
+
+    crc = np.zeros(len(owner), dtype=np.uint32)
+    for i in range(chunk):
+        offset = chunk_offsets + i
+        byte = data[np.maximum(chunk_starts + i, 0)].astype(np.uint32)
+        byte[offset < 0] = 0
+        byte[(offset >= 0) & (offset < 4)] ^= 0xFF
+        crc = _TABLE[(crc ^ byte) & 0xFF] ^ (crc >> np.uint32(8))
+
+    tables = _shift_tables(chunk)
+    reg = np.zeros(len(records), dtype=np.uint32)
+    active = np.searchsorted(-n_chunks, -np.arange(int(n_chunks[0])), side='left')
+    for j in range(int(n_chunks[0])):
+        k = active[j]
+        reg[:k] = _shift(tables, reg[:k]) ^ crc[first_chunk[:k] + j]
+    out[records] = _mask(reg ^ np.uint32(0xFFFFFFFF))
+    return out
+
+
+def _walk(data, pos):
+    """Follow the framing from pos without checking CRCs; returns (starts, lengths, stop)"""
+    size = len(data)
+    raw = data.data if isinstance(data, np.ndarray) else data
+    starts, lengths = [], []
+    while pos + HEADER_SIZE <= size:
+        length = tfevents._LENGTH.unpack_from(raw, pos)[0]
+        end = pos + HEADER_SIZE + length + FOOTER_SIZE
+        if end > size:
+            break
+        starts.append(pos)
+        lengths.append(length)
+        pos = end
+    return np.array(starts, dtype=np.int64), np.array(lengths, dtype=np.int64), pos
+
+
+def _stored_crcs(data, offsets):
+    """uint32 little-endian values at each offset"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    b = data[offsets[:, None] + np.arange(4)].astype(np.uint32)
+    return b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16) | (b[:, 3] << 24)
+
+
+def _valid_records(data, starts, lengths):
+    """(header ok, data ok) boolean arrays for walked records"""
+    header_ok = masked_crc_batch(data, starts, np.full(len(starts), 8)) == _stored_crcs(data, starts + 8)
+    data_ok = np.zeros(len(starts), dtype=bool)
+    if header_ok.any():
+        s, n = starts[header_ok], lengths[header_ok]
+        data_ok[header_ok] = masked_crc_batch(data, s + HEADER_SIZE, n) == _stored_crcs(data, s + HEADER_SIZE + n)
+    return header_ok, data_ok
+
+
+def _resync(data, pos):
+    """Next offset >= pos holding a record whose length and data CRCs are both valid, or None"""
+    size = len(data)
+    raw = data.data
+    while pos + HEADER_SIZE + FOOTER_SIZE <= size:
+        candidates = np.arange(pos, min(pos + RESYNC_WINDOW, size - HEADER_SIZE - FOOTER_SIZE + 1), dtype=np.int64)
+        header_ok = masked_crc_batch(data, candidates, np.full(len(candidates), 8)) == _stored_crcs(data, candidates + 8)
+        for start in candidates[header_ok].tolist():
+            length = tfevents._LENGTH.unpack_from(raw, start)[0]
+            end = start + HEADER_SIZE + length + FOOTER_SIZE
+            if end > size:
+                continue
+            crc = masked_crc_batch(data, [start + HEADER_SIZE], [length])[0]
+            if crc == _stored_crcs(data, [end - FOOTER_SIZE])[0]:
+                return start
+        pos = int(candidates[-1]) + 1
+    return None
+
+
+def scan_buffer(data, pos=0):
+    """([(start, end)] of valid records, [(start, end, reason)] of damaged ranges) in a uint8 array from pos"""
+    size = len(data)
+    valid = []       # (start, end) of good records
+    damaged = []     # (start, end, reason)
+    while pos < size:
+        starts, lengths, stop = _walk(data, pos)
+        cut = 0
+        if len(starts):
+            header_ok, data_ok = _valid_records(data, starts, lengths)
+            bad_header = np.flatnonzero(~header_ok)
+            # Framing after a bad length header is meaningless; only trust records before it
+            cut = int(bad_header[0]) if len(bad_header) else len(starts)
+            ends = starts + HEADER_SIZE + lengths + FOOTER_SIZE
+            for start, end, ok in zip(starts[:cut].tolist(), ends[:cut].tolist(), data_ok[:cut].tolist()):
+                if ok:
+                    valid.append((start, end))
+                else:
+                    damaged.append((start, end, "data crc"))
+        if cut < len(starts):
+            pos = int(starts[cut])
+            reason = "bad length crc"
+        else:
+            pos = stop
+            if pos >= size:
+                break
+            if pos + HEADER_SIZE > size:
+                reason = "truncated header"
+            elif masked_crc_batch(data, [pos], [8])[0] == _stored_crcs(data, [pos + 8])[0]:
+                # A valid length that runs past the end: a truncated record, or garbage whose
+                # length field happened to check out if valid records follow
+                reason = "truncated record"
+            else:
+                reason = "bad length crc"
+        resume = _resync(data, pos + 1)
+        if reason == "truncated record" and resume is not None:
+            reason = "bad length"
+        damaged.append((pos, size if resume is None else resume, reason))
+        if resume is None:
+            break
+        pos = resume
+    return valid, damaged
+
+
+def scan_file(path):
+    """Integrity report for one event file: valid record spans and damaged byte ranges"""
+    start_time = time.perf_counter()
+    data = np.fromfile(path, dtype=np.uint8)
+    size = len(data)
+    valid, damaged = scan_buffer(data)
+    return {
+        'path': path,
+        'bytes': size,
+        'records': len(valid),
+        'damaged': _merge_ranges(damaged),
+        'damaged_bytes': sum(end - start for start, end, _ in damaged),
+        'valid_spans': valid if damaged else None,
+        'seconds': time.perf_counter() - start_time,
+    }
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end, reason in sorted(ranges):
+        if merged and start <= merged[-1][1] and merged[-1][2] == reason:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]), reason)
+        else:
+            merged.append((start, end, reason))
+    return merged
+
+
+def salvage(report, replace=False):
+    """Write the valid records of a damaged file to its salvaged sidecar; returns the path written"""
+    path = report['path']
+    target = sidecar_path(path, SALVAGED)
+    with open(path, 'rb') as src, open(target, 'wb') as dst:
+        for start, end in report['valid_spans']:
+            src.seek(start)
+            dst.write(src.read(end - start))
+    if replace:
+        shutil.move(path, sidecar_path(path, DAMAGED))
+        shutil.move(target, path)
+        return path
+    return target
+
+
+def scan_tree(results_dir, workers=None):
+    paths = find_event_files(results_dir)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(scan_file, paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check event-file record CRCs and salvage damaged files")
+    parser.add_argument("paths", nargs="*", help="event files (default: every event file under --results-dir)")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--salvage", action="store_true", help="write events.out.salvaged.* next to damaged files")
+    parser.add_argument("--replace", action="store_true",
+                        help="with --salvage: put the salvaged file in place, keep the original as events.out.damaged.*")
+    parser.add_argument("--verbose", action="store_true", help="list clean files too")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.paths:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            reports = list(pool.map(scan_file, args.paths))
+    else:
+        reports = scan_tree(args.results_dir, args.workers)
+    elapsed = time.perf_counter() - start
+
+    total = sum(r['bytes'] for r in reports)
+    damaged = [r for r in reports if r['damaged']]
+    for report in reports:
+        if not report['damaged']:
+            if args.verbose:
+                print(f"OK   {report['path']} ({report['records']} records)")
+            continue
+        print(f"BAD  {report['path']}: {report['records']} valid records, "
+              f"{report['damaged_bytes']} of {report['bytes']} bytes damaged")
+        for range_start, range_end, reason in report['damaged']:
+            print(f"       bytes {range_start}-{range_end} ({range_end - range_start} bytes): {reason}")
+        if args.salvage:
+            print(f"       salvaged -> {salvage(report, args.replace)}")
+
+    print(f"\nScanned {len(reports)} files, {total / 1e6:.1f} MB in {elapsed:.2f}s "
+          f"({total / 1e6 / elapsed if elapsed else 0:.0f} MB/s); {len(damaged)} damaged")
+    if damaged and not args.salvage:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
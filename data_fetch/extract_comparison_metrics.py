@@ -10,20 +10,38 @@ from tensorboard.backend.event_processing import event_accumulator
 import os
 import json
 
+from basic_metrics_extraction import format_comparison_table
+from drone_surrogate import evaluate_policy
+from quantile_sketch import quantile_summary
+from stage_timers import hierarchical_timer, timed
+from tfevents import find_event_files
+
+def _percentiles(values):
+    """p5/p50/p95 from a t-digest; skewed rewards are poorly described by mean and std alone"""
+    summary = quantile_summary(values)
+    return {'p5': summary['p5'], 'p50': summary['p50'], 'p95': summary['p95']}
+
 class MetricExtractor:
-    def __init__(self, results_dir="results"):
+    def __init__(self, results_dir="results", baseline_episodes=1000):
         self.results_dir = results_dir
+        self.baseline_episodes = baseline_episodes
         
+    @timed
     def extract_tensorboard_metrics(self, run_id, metric_names):
         """Extract metrics from tensorboard logs"""
         path = f"{self.results_dir}/{run_id}/MyAgent"
+        event_files = find_event_files(f"{self.results_dir}/{run_id}")
+        if event_files:
+            # Behavior folder is MyAgent or DroneAgent depending on the run
+            path = os.path.dirname(event_files[0])
         
         if not os.path.exists(path):
             print(f"Warning: Path {path} does not exist")
             return {}
             
-        ea = event_accumulator.EventAccumulator(path)
-        ea.Reload()
+        with hierarchical_timer("load_events"):
+            ea = event_accumulator.EventAccumulator(path)
+            ea.Reload()
         
         metrics = {}
         for metric in metric_names:
@@ -50,6 +68,7 @@ class MetricExtractor:
         df = pd.read_csv(csv_file)
         return df
     
+    @timed
     def calculate_policy_performance(self, data_source, policy_type="PPO"):
         """Calculate performance metrics for a policy"""
         
@@ -74,7 +93,8 @@ class MetricExtractor:
                         results[key] = {
                             'mean': np.mean(final_values),
                             'std': np.std(final_values),
-                            'count': len(final_values)
+                            'count': len(final_values),
+                            **_percentiles(final_values)
                         }
                     else:
                         results[key] = {'mean': 0, 'std': 0, 'count': 0}
@@ -88,30 +108,18 @@ class MetricExtractor:
                         results[column] = {
                             'mean': data_source[column].mean(),
                             'std': data_source[column].std(),
-                            'count': len(data_source)
+                            'count': len(data_source),
+                            **_percentiles(data_source[column].to_numpy())
                         }
                 return results
                 
-        elif policy_type == "Random":
-            # Simulate random policy performance
-            return {
-                'Reward': {'mean': -45, 'std': 15, 'count': 100},
-                'TargetsFound': {'mean': 0.2, 'std': 0.4, 'count': 100},
-                'PathEfficiency': {'mean': 0.05, 'std': 0.03, 'count': 100},
-                'AngleStability': {'mean': 0.1, 'std': 0.05, 'count': 100},
-                'GroundCollision': {'mean': 0.92, 'std': 0.1, 'count': 100}
-            }
-            
-        elif policy_type == "Heuristic":
-            # Simulate heuristic policy performance (manual control)
-            return {
-                'Reward': {'mean': 25, 'std': 30, 'count': 100},
-                'TargetsFound': {'mean': 1.8, 'std': 1.1, 'count': 100},
-                'PathEfficiency': {'mean': 0.35, 'std': 0.20, 'count': 100},
-                'AngleStability': {'mean': 0.6, 'std': 0.2, 'count': 100},
-                'GroundCollision': {'mean': 0.28, 'std': 0.15, 'count': 100}
-            }
+        elif policy_type in ("Random", "Heuristic"):
+            # Measured on the vectorized surrogate environment (see drone_surrogate.py)
+            with hierarchical_timer(f"surrogate_{policy_type.lower()}") as timer:
+                timer.add(rows=self.baseline_episodes)
+                return evaluate_policy(policy_type, n_episodes=self.baseline_episodes)
     
+    @timed
     def generate_comparison_table(self, run_ids=None):
         """Generate the complete comparison table"""
         
@@ -143,40 +151,7 @@ class MetricExtractor:
         
         print("\n=== FORMATTED COMPARISON TABLE ===\n")
         
-        # LaTeX table format
-        print("\\begin{table}[ht]")
-        print("\\centering")
-        print("\\caption{Test Episode Performance Comparison (mean $\\pm$ std, N=100)}")
-        print("\\label{tab:results}")
-        print("\\begin{tabular}{|l|c|c|c|c|c|}")
-        print("\\hline")
-        print("\\textbf{Policy} & \\textbf{Reward} & \\textbf{Targets} & \\textbf{Efficiency} & \\textbf{Stability} & \\textbf{Collisions} \\\\")
-        print("\\hline")
-        
-        for policy_name, results in policies.items():
-            if not results:
-                continue
-                
-            reward = results.get('Reward', {})
-            targets = results.get('TargetsFound', {})
-            efficiency = results.get('PathEfficiency', {})
-            stability = results.get('AngleStability', {})
-            collisions = results.get('GroundCollision', {})
-            
-            # Format with proper bold for best results
-            bold_start = "\\textbf{" if policy_name == "PPO (Ours)" else ""
-            bold_end = "}" if policy_name == "PPO (Ours)" else ""
-            
-            print(f"{bold_start}{policy_name}{bold_end} & "
-                  f"{bold_start}{reward['mean']:.1f}$\\pm${reward['std']:.1f}{bold_end} & "
-                  f"{bold_start}{targets['mean']:.1f}$\\pm${targets['std']:.1f}{bold_end} & "
-                  f"{bold_start}{efficiency['mean']:.2f}$\\pm${efficiency['std']:.2f}{bold_end} & "
-                  f"{bold_start}{stability['mean']:.2f}$\\pm${stability['std']:.2f}{bold_end} & "
-                  f"{bold_start}{collisions['mean']*100:.0f}\\%{bold_end} \\\\")
-        
-        print("\\hline")
-        print("\\end{tabular}")
-        print("\\end{table}")
+        print(format_comparison_table(policies), end="")
         
         print("\n=== RAW DATA SUMMARY ===\n")
         
@@ -184,7 +159,8 @@ class MetricExtractor:
         for policy_name, results in policies.items():
             print(f"\n{policy_name}:")
             for metric, stats in results.items():
-                print(f"  {metric}: {stats['mean']:.3f} ± {stats['std']:.3f} (N={stats['count']})")
+                spread = f", p5/p50/p95 {stats['p5']:.3f} / {stats['p50']:.3f} / {stats['p95']:.3f}" if 'p50' in stats else ""
+                print(f"  {metric}: {stats['mean']:.3f} ± {stats['std']:.3f}{spread} (N={stats['count']})")
         
         # Calculate success rates
         print("\n=== SUCCESS RATE ANALYSIS ===\n")
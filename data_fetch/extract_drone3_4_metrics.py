@@ -9,6 +9,8 @@ import re
 import csv
 import statistics
 
+from quantile_sketch import quantile_summary
+
 def extract_from_training_logs():
     """Extract metrics from the training output logs"""
     
@@ -112,9 +114,16 @@ def extract_from_training_logs():
     
     print(f"Mean Reward: {reward_mean:.3f} ± {reward_std:.3f}")
     
+    # Crash penalties make the distribution skewed, so report its spread as well
+    spread = quantile_summary(rewards)
+    print(f"Reward p5/p50/p95: {spread['p5']:.3f} / {spread['p50']:.3f} / {spread['p95']:.3f}")
+    
     return {
         'reward_mean': reward_mean,
         'reward_std': reward_std,
+        'reward_p5': spread['p5'],
+        'reward_p50': spread['p50'],
+        'reward_p95': spread['p95'],
         'samples': len(final_samples)
     }
 
@@ -2,55 +2,96 @@ from tensorboard.backend.event_processing import event_accumulator
 import pandas as pd
 import os
 
+from stage_timers import hierarchical_timer, is_enabled
+
 # ---- CHANGE THIS ----
 run_id = "drone4"   # your run-id folder name
 results_dir = "results"
+storage = "dense"   # "dense": forward-filled CSV, "sparse": per-tag store (see sparse_store.py)
 # ----------------------
 
-path = f"{results_dir}/{run_id}/MyAgent"  # tfevents files are in MyAgent subdirectory
-
-# Use the entire directory path for EventAccumulator
-ea = event_accumulator.EventAccumulator(path)
-ea.Reload()
-
-print("Available scalar tags:", ea.Tags()['scalars'])
-
-data = {}
-all_steps = set()
-
-# First pass: collect all unique steps
-for tag in ea.Tags()['scalars']:
-    events = ea.Scalars(tag)
-    steps = [e.step for e in events]
-    all_steps.update(steps)
-
-# Sort all steps
-all_steps = sorted(list(all_steps))
-data['step'] = all_steps
-
-# Second pass: align all metrics to the same step indices
-for tag in ea.Tags()['scalars']:
-    events = ea.Scalars(tag)
-    step_to_value = {e.step: e.value for e in events}
-    
-    # Fill in values for all steps, using None for missing steps
-    aligned_values = []
-    for step in all_steps:
-        if step in step_to_value:
-            aligned_values.append(step_to_value[step])
-        else:
-            aligned_values.append(None)
-    
-    data[tag] = aligned_values
-
-# Debug print
-print("Available columns:", list(data.keys()))
-print(f"Data length: {len(all_steps)} steps")
-
-df = pd.DataFrame(data)
-# Forward fill missing values
-df = df.ffill()
-df = df.sort_values("step")
-df.to_csv(f"{run_id}_training_data.csv", index=False)
-
-print(f"Saved CSV to: {run_id}_training_data.csv")
+def load_events(path):
+    """Load every event file in a behavior directory"""
+    with hierarchical_timer("load_events") as timer:
+        # Use the entire directory path for EventAccumulator
+        ea = event_accumulator.EventAccumulator(path)
+        ea.Reload()
+        if is_enabled():
+            timer.add(nbytes=sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file()))
+    return ea
+
+def align_metrics(ea, tags=None):
+    """Align scalar tags onto the union of their steps and forward fill the gaps"""
+    if tags is None:
+        tags = ea.Tags()['scalars']
+
+    data = {}
+    all_steps = set()
+
+    # First pass: collect all unique steps
+    with hierarchical_timer("collect_steps") as timer:
+        for tag in tags:
+            events = ea.Scalars(tag)
+            steps = [e.step for e in events]
+            all_steps.update(steps)
+            timer.add(rows=len(steps))
+
+    # Sort all steps
+    all_steps = sorted(list(all_steps))
+    data['step'] = all_steps
+
+    # Second pass: align all metrics to the same step indices
+    with hierarchical_timer("align") as timer:
+        for tag in tags:
+            events = ea.Scalars(tag)
+            step_to_value = {e.step: e.value for e in events}
+            
+            # Fill in values for all steps, using None for missing steps
+            aligned_values = []
+            for step in all_steps:
+                if step in step_to_value:
+                    aligned_values.append(step_to_value[step])
+                else:
+                    aligned_values.append(None)
+            
+            data[tag] = aligned_values
+        timer.add(rows=len(all_steps) * len(tags))
+
+    # Debug print
+    print("Available columns:", list(data.keys()))
+    print(f"Data length: {len(all_steps)} steps")
+
+    with hierarchical_timer("dataframe") as timer:
+        df = pd.DataFrame(data)
+        # Forward fill missing values
+        df = df.ffill()
+        df = df.sort_values("step")
+        timer.add(rows=len(df))
+    return df
+
+def main():
+    path = f"{results_dir}/{run_id}/MyAgent"  # tfevents files are in MyAgent subdirectory
+
+    with hierarchical_timer("fetch_data"):
+        ea = load_events(path)
+        print("Available scalar tags:", ea.Tags()['scalars'])
+
+        if storage == "sparse":
+            from sparse_store import SUFFIX, from_accumulator, write_store
+            with hierarchical_timer("write_store") as timer:
+                nbytes = write_store(from_accumulator(ea), f"{run_id}{SUFFIX}")
+                timer.add(nbytes=nbytes)
+            print(f"Saved sparse store to: {run_id}{SUFFIX}")
+            return
+
+        with hierarchical_timer("align_metrics"):
+            df = align_metrics(ea)
+
+        with hierarchical_timer("write_csv") as timer:
+            df.to_csv(f"{run_id}_training_data.csv", index=False)
+            timer.add(rows=len(df), nbytes=os.path.getsize(f"{run_id}_training_data.csv"))
+
+    print(f"Saved CSV to: {run_id}_training_data.csv")
+
+if __name__ == "__main__":
+    main()
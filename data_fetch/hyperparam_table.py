@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Indexed hyperparameter-to-outcome table across all runs
+
+Flattens every results/<run>/configuration.yaml into typed columns
+(behaviors.<name>.* is normalized to behavior.* so MyAgent and DroneAgent
+runs line up), joins final-window metrics and throughput from the event
+files, and stores one row per run in a SQLite table. Rebuilds only touch
+runs whose configuration.yaml or event files changed since the last build.
+
+    python hyperparam_table.py build
+    python hyperparam_table.py vs behavior.network_settings.memory.sequence_length
+    python hyperparam_table.py query "SELECT run, \"final.Environment/Cumulative Reward\" FROM runs"
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from run_config import behavior_names, flatten_config, load_run_config
+from sample_efficiency import LOWER_IS_BETTER
+from tfevents import find_runs, load_scalars, run_signature
+
+DEFAULT_DB = "run_index.sqlite"
+TABLE = "runs"
+# Stored as PRAGMA user_version; bump when the computed columns change so every row is
+# refreshed on the next build (2: best.* is the min for lower-is-better tags)
+SCHEMA_VERSION = 2
+
+FINAL_TAGS = [
+    'Environment/Cumulative Reward',
+    'Environment/Episode Length',
+    'Reward',
+    'TargetsFound',
+    'PathEfficiency',
+    'AngleStability',
+    'GroundCollision',
+    'Policy/Entropy',
+]
+
+# Columns indexed when present; add more with --index
+INDEXED_COLUMNS = [
+    'behavior.hyperparameters.learning_rate',
+    'behavior.hyperparameters.batch_size',
+    'behavior.network_settings.hidden_units',
+    'behavior.network_settings.memory.sequence_length',
+    'final.Environment/Cumulative Reward',
+]
+
+# Summary intervals this many times the median (seconds or steps) are resumes, not training
+DOWNTIME_FACTOR = 10.0
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(value):
+    if isinstance(value, bool) or isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+def _sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def config_columns(config):
+    """Flattened config with behaviors.<name>. collapsed to behavior."""
+    names = behavior_names(config)
+    columns = {'behavior_name': names[0] if names else None}
+    for key, value in flatten_config(config).items():
+        if names and key.startswith(f"behaviors.{names[0]}."):
+            key = "behavior." + key[len(f"behaviors.{names[0]}."):]
+        columns[key] = value
+    return columns
+
+
+def outcome_columns(run_dir, final_fraction=0.2):
+    """Final-window means, best values, total steps and throughput from a run's event files"""
+    series = load_scalars(run_dir, FINAL_TAGS)
+    columns = {}
+    for tag, s in series.items():
+        if not len(s.values):
+            continue
+        window = s.values[-max(1, int(len(s.values) * final_fraction)):]
+        columns[f"final.{tag}"] = float(np.mean(window))
+        columns[f"best.{tag}"] = float(np.min(s.values) if tag in LOWER_IS_BETTER else np.max(s.values))
+
+    reference = series.get('Environment/Cumulative Reward') or next(iter(series.values()), None)
+    if reference is not None and len(reference.steps) > 1:
+        seconds = np.diff(reference.wall_times)
+        steps = np.diff(reference.steps)
+        median = np.median(seconds[seconds > 0]) if np.any(seconds > 0) else 0.0
+        median_steps = np.median(steps[steps > 0]) if np.any(steps > 0) else 0.0
+        # Resumes show up as wall-clock gaps; init_path resumes also as step jumps. Neither is training throughput.
+        normal = (seconds <= DOWNTIME_FACTOR * median) & (steps <= DOWNTIME_FACTOR * median_steps)
+        active = seconds[normal].sum()
+        columns['total_steps'] = int(reference.steps[-1])
+        columns['wall_seconds'] = float(reference.wall_times[-1] - reference.wall_times[0])
+        columns['active_seconds'] = float(active)
+        if active > 0:
+            columns['steps_per_second'] = float(steps[normal].sum() / active)
+    return columns
+
+
+def _signature_columns(run_dir):
+    """(config mtime, newest event-file mtime, total event bytes) used to skip unchanged runs"""
+    config_path = os.path.join(run_dir, "configuration.yaml")
+    config_mtime = os.path.getmtime(config_path) if os.path.exists(config_path) else 0.0
+    events = run_signature(run_dir)
+    return config_mtime, max((mtime for _, _, mtime in events), default=0.0), sum(size for _, size, _ in events)
+
+
+def connect(db_path=DEFAULT_DB):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (run TEXT PRIMARY KEY, "
+                 "config_mtime REAL, events_mtime REAL, events_bytes INTEGER)")
+    return conn
+
+
+def existing_columns(conn):
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+
+
+def _ensure_columns(conn, row, known):
+    for name, value in row.items():
+        if name not in known:
+            sql_type = _sql_type(value) if value is not None else ""
+            conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(name)} {sql_type}")
+            known[name] = sql_type
+
+
+def _ensure_indexes(conn, columns, known):
+    for column in columns:
+        if column in known:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote('idx_' + column)} ON {TABLE} ({_quote(column)})")
+
+
+def build(results_dir="results", db_path=DEFAULT_DB, final_fraction=0.2, force=False, extra_indexes=()):
+    """Insert or refresh rows for new/changed runs and drop rows for deleted runs; returns (updated, skipped)"""
+    conn = connect(db_path)
+    known = existing_columns(conn)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        force = True
+    stored = {row[0]: tuple(row[1:]) for row in
+              conn.execute(f"SELECT run, config_mtime, events_mtime, events_bytes FROM {TABLE}")}
+    runs = find_runs(results_dir)
+    updated, skipped = [], []
+
+    with conn:
+        for run_id in set(stored) - set(runs):
+            conn.execute(f"DELETE FROM {TABLE} WHERE run = ?", (run_id,))
+
+        for run_id, run_dir in sorted(runs.items()):
+            signature = _signature_columns(run_dir)
+            if not force and stored.get(run_id) == signature:
+                skipped.append(run_id)
+                continue
+            row = {'run': run_id, 'config_mtime': signature[0], 'events_mtime': signature[1],
+                   'events_bytes': signature[2]}
+            row.update(config_columns(load_run_config(run_dir)))
+            row.update(outcome_columns(run_dir, final_fraction))
+            _ensure_columns(conn, row, known)
+            # Replace the whole row so columns a run no longer has fall back to NULL
+            conn.execute(f"DELETE FROM {TABLE} WHERE run = ?", (run_id,))
+            names = list(row)
+            conn.execute(f"INSERT INTO {TABLE} ({', '.join(_quote(n) for n in names)}) "
+                         f"VALUES ({', '.join('?' for _ in names)})", [_sql_value(row[n]) for n in names])
+            updated.append(run_id)
+
+        _ensure_indexes(conn, list(INDEXED_COLUMNS) + list(extra_indexes), known)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.close()
+    return updated, skipped
+
+
+def query(sql, params=(), db_path=DEFAULT_DB):
+    """(column names, rows) for an arbitrary SELECT"""
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(sql, params)
+        names = [d[0] for d in cursor.description] if cursor.description else []
+        return names, cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def versus(column, metric='final.Environment/Cumulative Reward', db_path=DEFAULT_DB):
+    """Metric against one hyperparameter for every run that sets it, ordered by the hyperparameter"""
+    return query(f"SELECT run, {_quote(column)}, {_quote(metric)} FROM {TABLE} "
+                 f"WHERE {_quote(column)} IS NOT NULL ORDER BY {_quote(column)}, {_quote(metric)} DESC",
+                 db_path=db_path)
+
+
+def _print_rows(names, rows):
+    widths = [max(len(str(n)), *(len(f"{r[i]:.4g}" if isinstance(r[i], float) else str(r[i])) for r in rows))
+              if rows else len(str(n)) for i, n in enumerate(names)]
+    print("  ".join(str(n).ljust(w) for n, w in zip(names, widths)))
+    for r in rows:
+        print("  ".join((f"{v:.4g}" if isinstance(v, float) else str(v)).ljust(w) for v, w in zip(r, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter-to-outcome table over results/")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="create or incrementally refresh the table")
+    p_build.add_argument("--results-dir", default="results")
+    p_build.add_argument("--final-fraction", type=float, default=0.2)
+    p_build.add_argument("--force", action="store_true", help="re-read every run")
+    p_build.add_argument("--index", nargs="+", default=[], help="extra columns to index")
+
+    p_vs = sub.add_parser("vs", help="metric against one hyperparameter")
+    p_vs.add_argument("column")
+    p_vs.add_argument("--metric", default="final.Environment/Cumulative Reward")
+
+    p_query = sub.add_parser("query", help="run a SELECT against the runs table")
+    p_query.add_argument("sql")
+
+    p_columns = sub.add_parser("columns", help="list columns and their types")
+    p_columns.add_argument("--like", help="substring filter")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        updated, skipped = build(args.results_dir, args.db, args.final_fraction, args.force, args.index)
+        print(f"Updated {len(updated)} runs, {len(skipped)} unchanged -> {args.db}")
+        if updated:
+            print(f"  refreshed: {', '.join(updated)}")
+    elif args.command == "vs":
+        _print_rows(*versus(args.column, args.metric, args.db))
+    elif args.command == "query":
+        _print_rows(*query(args.sql, db_path=args.db))
+    elif args.command == "columns":
+        conn = connect(args.db)
+        for name, sql_type in existing_columns(conn).items():
+            if not args.like or args.like in name:
+                print(f"{name:70s} {sql_type}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Curriculum lesson index: step ranges per lesson and per-lesson tag summaries
+
+Runs trained with environment_parameters curricula log one
+Environment/Lesson Number/<parameter> tag per curriculum. `build` reads each
+run once, turns every lesson tag into step ranges (a metric point belongs
+to the lesson in effect as of its step) and summarizes every other tag per
+lesson: count, sum, sum of squares, min, max and a small t-digest, all of
+which merge across runs. "Stats per lesson across all runs" is then a
+lookup in lesson_index.json. Only runs whose event files changed since the
+last build are re-read.
+
+    python lesson_index.py build --results-dir results
+    python lesson_index.py ranges drone7.2
+    python lesson_index.py stats --param target_distance --tag "Environment/Cumulative Reward" --runs "drone6*"
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from quantile_sketch import TDigest, quantile_label
+from run_config import load_run_config
+from tfevents import find_runs, load_scalars, run_signature
+
+LESSON_PREFIX = 'Environment/Lesson Number/'
+DEFAULT_INDEX = "lesson_index.json"
+INDEX_VERSION = 1
+# Per-lesson digests are small: a few hundred summary points per lesson at most
+SKETCH_COMPRESSION = 50
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+def lesson_names(config):
+    """{parameter: [lesson name, ...]} from a run's environment_parameters curricula"""
+    names = {}
+    for param, spec in ((config or {}).get('environment_parameters') or {}).items():
+        lessons = (spec or {}).get('curriculum') if isinstance(spec, dict) else None
+        if lessons:
+            names[param] = [lesson.get('name') for lesson in lessons]
+    return names
+
+
+def lesson_segments(steps, values):
+    """[(lesson, start_step, next_start_step or None)] for a piecewise-constant lesson series"""
+    steps = np.asarray(steps)
+    values = np.asarray(values)
+    if not len(steps):
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(values) != 0) + 1))
+    start_steps = steps[starts].tolist()
+    ends = start_steps[1:] + [None]
+    return [(int(values[i]), s, e) for i, s, e in zip(starts.tolist(), start_steps, ends)]
+
+
+def assign_lessons(segments, steps):
+    """Lesson in effect at each step; points before the first lesson point get the first lesson"""
+    starts = np.array([s for _, s, _ in segments], dtype=np.int64)
+    lessons = np.array([lesson for lesson, _, _ in segments], dtype=np.int64)
+    return lessons[np.maximum(np.searchsorted(starts, steps, side='right') - 1, 0)]
+
+
+def summarize(values):
+    """Mergeable summary of one tag over one lesson"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    digest = TDigest(SKETCH_COMPRESSION).update(values)
+    means, weights, _ = digest.state()
+    return {
+        'points': int(len(values)),
+        'sum': float(values.sum()),
+        'sumsq': float(values @ values),
+        'min': float(values.min()) if len(values) else None,
+        'max': float(values.max()) if len(values) else None,
+        'centroids': [np.round(means, 6).tolist(), weights.tolist()],
+    }
+
+
+def combine(summaries):
+    """Pool summaries (across runs or repeated segments) into count/mean/std/min/max/quantiles"""
+    summaries = [s for s in summaries if s['points']]
+    points = sum(s['points'] for s in summaries)
+    if not points:
+        return {'points': 0}
+    total = sum(s['sum'] for s in summaries)
+    mean = total / points
+    var = max(sum(s['sumsq'] for s in summaries) / points - mean * mean, 0.0)
+    lo, hi = min(s['min'] for s in summaries), max(s['max'] for s in summaries)
+    digest = TDigest.merged([TDigest.from_state(s['centroids'][0], s['centroids'][1], (s['points'], s['sum'], s['min'], s['max']),
+                                                SKETCH_COMPRESSION) for s in summaries])
+    out = {'points': points, 'mean': mean, 'std': var ** 0.5, 'min': lo, 'max': hi}
+    for q, value in zip(QUANTILES, digest.quantile(np.asarray(QUANTILES)).tolist()):
+        out[quantile_label(q)] = value
+    return out
+
+
+def index_run(run_dir):
+    """Index entry for one run: lesson step ranges and per-lesson summaries of every other tag"""
+    series = load_scalars(run_dir)
+    names = lesson_names(load_run_config(run_dir))
+    entry = {'signature': run_signature(run_dir), 'ranges': {}, 'summaries': {}}
+    metric_tags = [t for t in series if not t.startswith(LESSON_PREFIX)]
+    for tag in sorted(t for t in series if t.startswith(LESSON_PREFIX)):
+        param = tag[len(LESSON_PREFIX):]
+        segments = lesson_segments(series[tag].steps, series[tag].values)
+        if not segments:
+            continue
+        param_names = names.get(param, [])
+        entry['ranges'][param] = [
+            {'lesson': lesson, 'name': param_names[lesson] if 0 <= lesson < len(param_names) else None,
+             'start_step': start, 'end_step': end}
+            for lesson, start, end in segments
+        ]
+        per_lesson = {}
+        for metric in metric_tags:
+            s = series[metric]
+            lessons = assign_lessons(segments, s.steps)
+            for lesson in np.unique(lessons).tolist():
+                per_lesson.setdefault(str(lesson), {})[metric] = summarize(s.values[lessons == lesson])
+        entry['summaries'][param] = per_lesson
+    return entry
+
+
+def load_index(path=DEFAULT_INDEX):
+    if not os.path.exists(path):
+        return {'version': INDEX_VERSION, 'runs': {}}
+    with open(path, 'r') as f:
+        index = json.load(f)
+    if index.get('version') != INDEX_VERSION:
+        return {'version': INDEX_VERSION, 'runs': {}}
+    return index
+
+
+def build_index(results_dir="results", path=DEFAULT_INDEX, force=False, workers=None):
+    """Re-index new or changed runs, drop removed ones; returns (index, updated run ids)"""
+    index = {'version': INDEX_VERSION, 'runs': {}} if force else load_index(path)
+    run_dirs = find_runs(results_dir)
+    for run_id in set(index['runs']) - set(run_dirs):
+        del index['runs'][run_id]
+    stale = [r for r in run_dirs if index['runs'].get(r, {}).get('signature') != run_signature(run_dirs[r])]
+    if workers == 1 or len(stale) <= 1:
+        entries = [index_run(run_dirs[r]) for r in stale]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entries = list(pool.map(index_run, [run_dirs[r] for r in stale]))
+    index['runs'].update(zip(stale, entries))
+    with open(path, 'w') as f:
+        json.dump(index, f)
+    return index, stale
+
+
+def lesson_stats(index, param, tag, runs=None):
+    """{lesson: pooled summary plus the runs that reached it} for one curriculum parameter and tag"""
+    pooled, reached, names = {}, {}, {}
+    for run_id, entry in sorted(index['runs'].items()):
+        if runs is not None and not any(fnmatch.fnmatchcase(run_id, p) for p in runs):
+            continue
+        for lesson, tags in entry['summaries'].get(param, {}).items():
+            if tag in tags:
+                pooled.setdefault(int(lesson), []).append(tags[tag])
+                reached.setdefault(int(lesson), []).append(run_id)
+        for r in entry['ranges'].get(param, []):
+            names.setdefault(r['lesson'], r['name'])
+    return {lesson: {**combine(pooled[lesson]), 'name': names.get(lesson), 'runs': reached[lesson]}
+            for lesson in sorted(pooled)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-lesson step ranges and tag summaries for curriculum runs")
+    parser.add_argument("--index", default=DEFAULT_INDEX)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="index new or changed runs")
+    p_build.add_argument("--results-dir", default="results")
+    p_build.add_argument("--force", action="store_true", help="re-index every run")
+    p_build.add_argument("--workers", type=int)
+
+    p_ranges = sub.add_parser("ranges", help="lesson step ranges of one run")
+    p_ranges.add_argument("run_id")
+
+    p_stats = sub.add_parser("stats", help="per-lesson stats of a tag pooled across runs")
+    p_stats.add_argument("--param", required=True, help="curriculum parameter, e.g. target_distance")
+    p_stats.add_argument("--tag", default="Environment/Cumulative Reward")
+    p_stats.add_argument("--runs", nargs="+", help="run name patterns (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index, updated = build_index(args.results_dir, args.index, args.force, args.workers)
+        curricula = sum(1 for e in index['runs'].values() if e['ranges'])
+        print(f"Indexed {len(index['runs'])} runs ({curricula} with curricula), {len(updated)} refreshed -> {args.index}")
+        return
+
+    index = load_index(args.index)
+    if not index['runs']:
+        raise SystemExit(f"{args.index} is empty; run: lesson_index.py build")
+
+    if args.command == "ranges":
+        entry = index['runs'].get(args.run_id)
+        if entry is None:
+            raise SystemExit(f"Run {args.run_id} is not in {args.index}")
+        if not entry['ranges']:
+            print(f"{args.run_id} logs no lesson tags")
+        for param, ranges in entry['ranges'].items():
+            print(f"{param}:")
+            for r in ranges:
+                end = "end" if r['end_step'] is None else f"{r['end_step']:,}"
+                print(f"  lesson {r['lesson']} {r['name'] or '':24s} steps {r['start_step']:>11,} - {end}")
+    elif args.command == "stats":
+        stats = lesson_stats(index, args.param, args.tag, args.runs)
+        if not stats:
+            raise SystemExit(f"No runs log lessons for {args.param!r} with tag {args.tag!r}")
+        print(f"{args.tag} by {args.param} lesson")
+        print(f"{'lesson':>6s} {'name':24s} {'runs':>4s} {'points':>7s} {'mean':>9s} {'std':>9s} "
+              f"{'p5':>9s} {'p50':>9s} {'p95':>9s}")
+        for lesson, s in stats.items():
+            print(f"{lesson:6d} {s['name'] or '':24s} {len(s['runs']):4d} {s['points']:7d} {s['mean']:9.3f} {s['std']:9.3f} "
+                  f"{s['p5']:9.3f} {s['p50']:9.3f} {s['p95']:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
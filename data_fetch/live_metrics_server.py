@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Live metrics server over the results/ tree
+
+One shared ingest loop tails every run's event files (only newly appended
+records are parsed), keeps a recent window per run/tag in memory and serves
+it to any number of dashboard clients over a small asyncio HTTP API:
+
+    GET /runs
+    GET /runs/<run>/tags
+    GET /runs/<run>/series?tag=<tag>[&since=<step>][&format=json|arrow]
+    GET /runs/<run>/summary
+    GET /runs/<run>/checkpoints
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from tfevents import EventFileTail, find_run_files
+
+
+class TagWindow:
+    """Recent (step, wall_time, value) points for one tag plus running totals"""
+
+    def __init__(self, window):
+        self.steps = deque(maxlen=window)
+        self.wall_times = deque(maxlen=window)
+        self.values = deque(maxlen=window)
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def append(self, step, wall_time, value):
+        self.steps.append(step)
+        self.wall_times.append(wall_time)
+        self.values.append(value)
+        if math.isfinite(value):
+            self.total_count += 1
+            self.total_sum += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def summary(self):
+        recent = [v for v in self.values if math.isfinite(v)]
+        return {
+            'last_step': self.steps[-1] if self.steps else None,
+            'last': _finite_or_none(self.values[-1]) if self.values else None,
+            'window_count': len(recent),
+            'window_mean': sum(recent) / len(recent) if recent else None,
+            'count': self.total_count,
+            'mean': self.total_sum / self.total_count if self.total_count else None,
+            'min': self.min if self.total_count else None,
+            'max': self.max if self.total_count else None,
+        }
+
+
+class MetricsStore:
+    """Shared in-memory state fed incrementally from the event files"""
+
+    def __init__(self, results_dir="results", window=2000, rescan_interval=30.0):
+        self.results_dir = results_dir
+        self.window = window
+        self.rescan_interval = rescan_interval
+        self.tails = {}          # event file path -> EventFileTail
+        self.runs = {}           # run_id -> {tag: TagWindow}
+        self.run_dirs = {}
+        self.run_files = {}      # run_id -> event files, refreshed every rescan_interval
+        self.last_scan = None
+        self.reload = set()      # runs to re-read from the start after a read error
+        self.status_cache = {}   # run_id -> (mtime, parsed training_status.json)
+        self.last_refresh = None
+
+    def rescan(self):
+        """Walk results/ once for runs and their event files"""
+        self.run_files = find_run_files(self.results_dir)
+        self.run_dirs = {run_id: os.path.join(self.results_dir, run_id) for run_id in self.run_files}
+        self.last_scan = time.monotonic()
+
+    def collect_new(self):
+        """Read newly appended scalars from every event file (blocking I/O, run off-loop)
+
+        Returns [(run_id, points, replace)]. The directory walk only happens
+        every rescan_interval; in between a pass costs one stat per known
+        file plus the new records. When a file shrank (rewritten in place)
+        the whole run is re-read and its batch has replace=True. A run that
+        fails to read is reported and re-read from the start on a later pass.
+        """
+        if self.last_scan is None or time.monotonic() - self.last_scan >= self.rescan_interval:
+            self.rescan()
+        batches = []
+        for run_id, files in self.run_files.items():
+            tails = []
+            for path in files:
+                tail = self.tails.get(path)
+                if tail is None:
+                    tail = self.tails[path] = EventFileTail(path)
+                tails.append(tail)
+            try:
+                batches.extend(self._read_run(run_id, tails))
+            except (OSError, ValueError) as e:
+                print(f"Error reading {run_id}: {e}")
+                for tail in tails:
+                    tail.offset = 0
+                self.reload.add(run_id)
+        return batches
+
+    def _read_run(self, run_id, tails):
+        replace = run_id in self.reload
+        run_points = [tail.read_new() for tail in tails]
+        if not replace and any(tail.restarted for tail in tails):
+            for tail in tails:
+                tail.offset = 0
+            run_points = [tail.read_new() for tail in tails]
+            replace = True
+        self.reload.discard(run_id)
+        if replace:
+            return [(run_id, [p for points in run_points for p in points], True)]
+        return [(run_id, points, False) for points in run_points if points]
+
+    def apply(self, batches):
+        """Merge points returned by collect_new into the per-tag windows"""
+        for run_id, points, replace in batches:
+            if replace:
+                self.runs[run_id] = {}
+            tags = self.runs.setdefault(run_id, {})
+            for tag, step, wall_time, value in points:
+                window = tags.get(tag)
+                if window is None:
+                    window = tags[tag] = TagWindow(self.window)
+                window.append(step, wall_time, value)
+        for run_id in self.run_dirs:
+            self.runs.setdefault(run_id, {})
+        self.last_refresh = time.time()
+        return sum(len(points) for _, points, _ in batches)
+
+    def checkpoints(self, run_id):
+        """training_status.json for a run, re-read only when its mtime changes"""
+        path = os.path.join(self.results_dir, run_id, "run_logs", "training_status.json")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self.status_cache.get(run_id)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'r') as f:
+                cached = self.status_cache[run_id] = (mtime, json.load(f))
+        return cached[1]
+
+
+def _finite_or_none(value):
+    return value if math.isfinite(value) else None
+
+
+def _json_response(status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    return status, 'application/json', body
+
+
+def _arrow_response(window, since):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return _json_response(501, {'error': 'pyarrow is not installed'})
+
+    steps, wall_times, values = _series_columns(window, since)
+    table = pa.table({'step': steps, 'wall_time': wall_times, 'value': values})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return 200, 'application/vnd.apache.arrow.stream', sink.getvalue().to_pybytes()
+
+
+def _series_columns(window, since):
+    steps = list(window.steps)
+    wall_times = list(window.wall_times)
+    values = list(window.values)
+    if since is not None:
+        start = next((i for i, step in enumerate(steps) if step > since), len(steps))
+        steps, wall_times, values = steps[start:], wall_times[start:], values[start:]
+    return steps, wall_times, values
+
+
+def route(store, method, target):
+    """Dispatch one request to (status, content_type, body)"""
+    if method != 'GET':
+        return _json_response(405, {'error': 'only GET is supported'})
+
+    url = urlsplit(target)
+    parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    if parts == ['runs']:
+        return _json_response(200, [
+            {
+                'run': run_id,
+                'tags': len(tags),
+                'last_step': max((w.steps[-1] for w in tags.values() if w.steps), default=None),
+            }
+            for run_id, tags in sorted(store.runs.items())
+        ])
+
+    if len(parts) != 3 or parts[0] != 'runs':
+        return _json_response(404, {'error': f'unknown path {url.path}'})
+
+    run_id, endpoint = parts[1], parts[2]
+    if run_id not in store.runs:
+        return _json_response(404, {'error': f'unknown run {run_id}'})
+    tags = store.runs[run_id]
+
+    if endpoint == 'tags':
+        return _json_response(200, sorted(tags))
+
+    if endpoint == 'summary':
+        return _json_response(200, {tag: window.summary() for tag, window in sorted(tags.items())})
+
+    if endpoint == 'checkpoints':
+        status = store.checkpoints(run_id)
+        if status is None:
+            return _json_response(404, {'error': 'training_status.json not found'})
+        return _json_response(200, status)
+
+    if endpoint == 'series':
+        tag = query.get('tag')
+        if tag not in tags:
+            return _json_response(404, {'error': f'unknown tag {tag}'})
+        since = int(query['since']) if 'since' in query else None
+        if query.get('format') == 'arrow':
+            return _arrow_response(tags[tag], since)
+        steps, wall_times, values = _series_columns(tags[tag], since)
+        return _json_response(200, {
+            'run': run_id,
+            'tag': tag,
+            'steps': steps,
+            'wall_times': wall_times,
+            'values': [_finite_or_none(v) for v in values],
+        })
+
+    return _json_response(404, {'error': f'unknown endpoint {endpoint}'})
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 501: 'Not Implemented'}
+
+
+async def handle_client(store, reader, writer):
+    """Serve HTTP/1.1 requests on one connection (keep-alive supported)"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                status, content_type, body = route(store, method, target)
+            except ValueError as e:
+                status, content_type, body = _json_response(400, {'error': str(e)})
+
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def ingest_forever(store, interval):
+    """Single shared ingest loop: file I/O in a worker thread, merge on the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = time.perf_counter()
+        try:
+            batches = await loop.run_in_executor(None, store.collect_new)
+        except OSError as e:
+            print(f"Error scanning {store.results_dir}: {e}")
+            batches = []
+        added = store.apply(batches)
+        if added:
+            print(f"Ingested {added} new points from {len(batches)} file batches "
+                  f"in {time.perf_counter() - start:.3f}s")
+        await asyncio.sleep(interval)
+
+
+async def serve(results_dir="results", host="127.0.0.1", port=8765, interval=5.0, window=2000, rescan_interval=30.0):
+    store = MetricsStore(results_dir, window, rescan_interval)
+    server = await asyncio.start_server(lambda r, w: handle_client(store, r, w), host, port)
+    print(f"Serving live metrics for {results_dir}/ on http://{host}:{port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), ingest_forever(store, interval))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve live training metrics from results/")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between ingest passes")
+    parser.add_argument("--window", type=int, default=2000, help="points kept in memory per run/tag")
+    parser.add_argument("--rescan-interval", type=float, default=30.0,
+                        help="seconds between walks of results/ for new runs and event files")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.results_dir, args.host, args.port, args.interval, args.window, args.rescan_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Static inference-cost profile of exported ONNX policies, joined with reward
+
+For every results/**/*.onnx export the graph is walked without running it:
+parameter count, MACs/FLOPs per op type, activation memory (total and peak
+live bytes in node order) for a given batch size, and the recurrent state
+carried between decisions. The per-run table puts the final export's cost
+next to hidden_units / num_layers / memory from configuration.yaml and the
+final reward.
+
+Exports checked in as Git LFS pointers (and all exports when onnx is not
+installed) are costed from configuration.yaml instead. The estimate lays
+out the graph ML-Agents exports for a PPO actor: observation normalization,
+num_layers x (Linear + Swish), an optional LSTM of memory_size / 2 units,
+and a Gaussian mean head. Observation and action sizes cannot be read from
+the config and default to the drone surrogate's. Curiosity's encoding_size
+only exists in the trainer and costs nothing at inference.
+
+    python onnx_cost.py --results-dir results --batch 1
+    python onnx_cost.py --model results/drone7.2/DroneAgent.onnx --ops
+"""
+
+import argparse
+import csv
+import glob
+import os
+
+import numpy as np
+
+from drone_surrogate import ACTION_SIZE, OBSERVATION_SIZE
+from policy_server import is_lfs_pointer
+from run_config import get_config_value, load_run_config
+from tfevents import find_event_files, load_scalars
+
+BYTES_PER_VALUE = 4
+REWARD_TAG = 'Environment/Cumulative Reward'
+
+# Element-wise ops cost one FLOP per output element
+ELEMENTWISE_OPS = {
+    'Add', 'Sub', 'Mul', 'Div', 'Neg', 'Abs', 'Sqrt', 'Exp', 'Log', 'Pow', 'Sigmoid', 'Tanh', 'Relu',
+    'LeakyRelu', 'Elu', 'Selu', 'Softplus', 'Clip', 'Max', 'Min', 'Reciprocal', 'Erf', 'HardSigmoid',
+}
+# Ops that only move or describe data
+FREE_OPS = {
+    'Reshape', 'Flatten', 'Squeeze', 'Unsqueeze', 'Transpose', 'Concat', 'Split', 'Slice', 'Gather',
+    'Shape', 'Constant', 'Identity', 'Cast', 'Expand', 'ConstantOfShape', 'Range', 'Tile',
+}
+
+
+def _onnx():
+    try:
+        import onnx
+    except ImportError:
+        return None
+    return onnx
+
+
+def _new_profile(source):
+    return {'source': source, 'params': 0, 'macs': 0, 'flops': 0, 'ops': {},
+            'activation_bytes': 0, 'peak_activation_bytes': 0, 'state_bytes': 0, 'unknown_shapes': 0}
+
+
+def _add_op(profile, op_type, macs=0, flops=0):
+    entry = profile['ops'].setdefault(op_type, {'count': 0, 'macs': 0, 'flops': 0})
+    entry['count'] += 1
+    entry['macs'] += macs
+    entry['flops'] += flops
+    profile['macs'] += macs
+    profile['flops'] += flops
+
+
+def _dims(value_info, batch):
+    """Concrete dims with symbolic (batch) dims set to batch, or None if a dim is unknown"""
+    dims = []
+    for d in value_info.type.tensor_type.shape.dim:
+        if d.HasField('dim_value'):
+            dims.append(d.dim_value)
+        elif d.HasField('dim_param'):
+            dims.append(batch)
+        else:
+            return None
+    return dims
+
+
+def profile_onnx(path, batch=1):
+    """Cost profile of one real .onnx file (needs the onnx package)"""
+    onnx = _onnx()
+    model = onnx.shape_inference.infer_shapes(onnx.load(path))
+    graph = model.graph
+    profile = _new_profile('onnx')
+
+    initializers = {t.name: list(t.dims) for t in graph.initializer}
+    # Weights only: integer index constants and scalar clip bounds are not parameters
+    float_types = {onnx.TensorProto.FLOAT, onnx.TensorProto.FLOAT16, onnx.TensorProto.DOUBLE}
+    profile['params'] = int(sum(np.prod(t.dims) for t in graph.initializer if t.data_type in float_types and t.dims))
+    shapes = dict(initializers)
+    for info in list(graph.input) + list(graph.value_info) + list(graph.output):
+        dims = _dims(info, batch)
+        if dims is not None:
+            shapes[info.name] = dims
+    for node in graph.node:
+        if node.op_type == 'Constant':
+            for attr in node.attribute:
+                if attr.name == 'value':
+                    shapes[node.output[0]] = list(attr.t.dims)
+
+    for info in graph.input:
+        if info.name == 'recurrent_in' and info.name in shapes:
+            profile['state_bytes'] = int(np.prod(shapes[info.name])) * BYTES_PER_VALUE
+
+    def size(name):
+        return int(np.prod(shapes[name])) if name in shapes else None
+
+    # Liveness in node order for peak activation memory
+    last_use = {}
+    for i, node in enumerate(graph.node):
+        for name in node.input:
+            last_use[name] = i
+    graph_outputs = {o.name for o in graph.output}
+    live, live_bytes = {}, 0
+
+    for i, node in enumerate(graph.node):
+        op = node.op_type
+        out = node.output[0] if node.output else None
+        out_elems = size(out) if out else 0
+        in_shapes = [shapes.get(name) for name in node.input]
+
+        if op in ('Gemm', 'MatMul') and all(s is not None for s in in_shapes[:2]):
+            a, b = in_shapes[0], in_shapes[1]
+            trans_b = any(attr.name == 'transB' and attr.i for attr in node.attribute)
+            n = b[-2] if trans_b else b[-1]
+            k = a[-1]
+            rows = int(np.prod(a[:-1]))
+            macs = rows * k * n
+            bias = rows * n if op == 'Gemm' and len(node.input) > 2 else 0
+            _add_op(profile, op, macs, 2 * macs + bias)
+        elif op == 'LSTM' and in_shapes[0] is not None and in_shapes[1] is not None:
+            seq, rows, inputs = in_shapes[0]
+            directions, gates, _ = in_shapes[1]
+            hidden = gates // 4
+            macs = directions * seq * rows * gates * (inputs + hidden)
+            # Gate biases, 3 sigmoids + 1 tanh, cell update and output tanh per unit
+            elementwise = directions * seq * rows * hidden * 12
+            _add_op(profile, op, macs, 2 * macs + elementwise)
+        elif op == 'Conv' and in_shapes[1] is not None and out_elems is not None:
+            weight = in_shapes[1]
+            macs = out_elems * int(np.prod(weight[1:]))
+            _add_op(profile, op, macs, 2 * macs)
+        elif op in ELEMENTWISE_OPS:
+            _add_op(profile, op, 0, out_elems or 0)
+        elif op in FREE_OPS:
+            _add_op(profile, op)
+        else:
+            _add_op(profile, op, 0, out_elems or 0)
+        if out and out_elems is None:
+            profile['unknown_shapes'] += 1
+
+        if op != 'Constant':
+            for name in node.output:
+                nbytes = (size(name) or 0) * BYTES_PER_VALUE
+                profile['activation_bytes'] += nbytes
+                live[name] = nbytes
+                live_bytes += nbytes
+        profile['peak_activation_bytes'] = max(profile['peak_activation_bytes'], live_bytes)
+        for name in list(live):
+            if last_use.get(name, -1) <= i and name not in graph_outputs:
+                live_bytes -= live.pop(name)
+    return profile
+
+
+def profile_from_config(network_settings, obs_size=OBSERVATION_SIZE, action_size=ACTION_SIZE, batch=1):
+    """Cost profile of the graph ML-Agents would export for these network_settings"""
+    profile = _new_profile('config')
+    hidden = int(network_settings.get('hidden_units') or 128)
+    layers = int(network_settings.get('num_layers') or 2)
+    memory = network_settings.get('memory') or {}
+    memory_size = int(memory.get('memory_size') or 0)
+    live = []
+
+    def tensor(elements):
+        nbytes = elements * BYTES_PER_VALUE
+        profile['activation_bytes'] += nbytes
+        live.append(nbytes)
+        # A chain keeps at most three tensors alive at once (Swish: x, sigmoid(x) and the product)
+        profile['peak_activation_bytes'] = max(profile['peak_activation_bytes'], sum(live[-3:]))
+
+    if network_settings.get('normalize'):
+        # (obs - mean) / sqrt(var) clipped to [-5, 5]; running mean/var are initializers
+        profile['params'] += 2 * obs_size + 1
+        for op in ('Sub', 'Sqrt', 'Div', 'Clip'):
+            _add_op(profile, op, 0, batch * obs_size)
+            tensor(batch * obs_size)
+
+    width = obs_size
+    for _ in range(layers):
+        macs = batch * width * hidden
+        _add_op(profile, 'Gemm', macs, 2 * macs + batch * hidden)
+        profile['params'] += width * hidden + hidden
+        tensor(batch * hidden)
+        # Swish: x * sigmoid(x)
+        _add_op(profile, 'Sigmoid', 0, batch * hidden)
+        tensor(batch * hidden)
+        _add_op(profile, 'Mul', 0, batch * hidden)
+        tensor(batch * hidden)
+        width = hidden
+
+    if memory_size:
+        units = memory_size // 2
+        macs = batch * 4 * units * (width + units)
+        _add_op(profile, 'LSTM', macs, 2 * macs + batch * units * 12)
+        profile['params'] += 4 * units * (width + units) + 8 * units
+        tensor(batch * memory_size)
+        profile['state_bytes'] = batch * memory_size * BYTES_PER_VALUE
+        width = units
+
+    macs = batch * width * action_size
+    _add_op(profile, 'Gemm', macs, 2 * macs + batch * action_size)
+    # Gaussian head: mean weights/bias plus the state-independent log std
+    profile['params'] += width * action_size + 2 * action_size
+    tensor(batch * action_size)
+    _add_op(profile, 'Clip', 0, batch * action_size)
+    _add_op(profile, 'Div', 0, batch * action_size)
+    tensor(batch * action_size)
+    return profile
+
+
+def profile_model(path, network_settings=None, batch=1, obs_size=OBSERVATION_SIZE, action_size=ACTION_SIZE):
+    """Profile from the graph when possible, else from network_settings; None if neither is available"""
+    if not is_lfs_pointer(path) and _onnx() is not None:
+        return profile_onnx(path, batch)
+    if network_settings is None:
+        return None
+    return profile_from_config(network_settings, obs_size, action_size, batch)
+
+
+def final_export(run_dir):
+    """results/<run>/<Behavior>.onnx written at the end of training, else the newest checkpoint export"""
+    finals = sorted(glob.glob(os.path.join(run_dir, "*.onnx")))
+    if finals:
+        return finals[0]
+    checkpoints = glob.glob(os.path.join(run_dir, "*", "*.onnx"))
+    return max(checkpoints, key=os.path.getmtime) if checkpoints else None
+
+
+def final_reward(run_dir, final_fraction=0.1):
+    """Mean cumulative reward over the last final_fraction of logged points"""
+    if not find_event_files(run_dir):
+        return None
+    series = load_scalars(run_dir, [REWARD_TAG]).get(REWARD_TAG)
+    if series is None or not len(series.values):
+        return None
+    tail = max(1, int(len(series.values) * final_fraction))
+    return float(np.mean(series.values[-tail:]))
+
+
+def cost_table(results_dir="results", batch=1, obs_size=OBSERVATION_SIZE, action_size=ACTION_SIZE):
+    """One row per run with an export: config knobs, cost of the final export and final reward"""
+    rows = []
+    for run_dir in sorted(glob.glob(os.path.join(results_dir, "*"))):
+        path = final_export(run_dir)
+        if path is None:
+            continue
+        config = load_run_config(run_dir)
+        network = get_config_value(config, 'behaviors.*.network_settings') or {}
+        profile = profile_model(path, network, batch, obs_size, action_size)
+        if profile is None:
+            continue
+        memory = network.get('memory') or {}
+        rows.append({
+            'run': os.path.basename(run_dir),
+            'export': os.path.relpath(path, run_dir),
+            'source': profile['source'],
+            'hidden_units': network.get('hidden_units'),
+            'num_layers': network.get('num_layers'),
+            'memory_size': memory.get('memory_size', 0),
+            'params': profile['params'],
+            'macs': profile['macs'],
+            'flops': profile['flops'],
+            'activation_kb': profile['activation_bytes'] / 1024,
+            'peak_activation_kb': profile['peak_activation_bytes'] / 1024,
+            'state_bytes': profile['state_bytes'],
+            'final_reward': final_reward(run_dir),
+        })
+    return rows
+
+
+def _print_ops(profile):
+    print(f"{'op':18s} {'count':>6s} {'MACs':>12s} {'FLOPs':>12s}")
+    for op, entry in sorted(profile['ops'].items(), key=lambda kv: -kv[1]['flops']):
+        print(f"{op:18s} {entry['count']:6d} {entry['macs']:12,d} {entry['flops']:12,d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static compute/memory cost of exported ONNX policies vs reward")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--model", help="profile one .onnx file instead of the per-run table")
+    parser.add_argument("--config", help="configuration.yaml for --model when it is an LFS pointer")
+    parser.add_argument("--batch", type=int, default=1, help="agents per inference call")
+    parser.add_argument("--obs-size", type=int, default=OBSERVATION_SIZE, help="used for config-based estimates")
+    parser.add_argument("--action-size", type=int, default=ACTION_SIZE, help="used for config-based estimates")
+    parser.add_argument("--ops", action="store_true", help="per-op breakdown for --model")
+    parser.add_argument("--csv", help="also write the per-run table here")
+    args = parser.parse_args()
+
+    if args.model:
+        if not os.path.isfile(args.model):
+            raise SystemExit(f"{args.model} does not exist")
+        # Final exports sit in the run directory, checkpoint exports one level down
+        model_dir = os.path.dirname(os.path.abspath(args.model))
+        run_dir = os.path.dirname(args.config) if args.config else next(
+            (d for d in (model_dir, os.path.dirname(model_dir)) if os.path.isfile(os.path.join(d, "configuration.yaml"))),
+            model_dir)
+        network = get_config_value(load_run_config(run_dir), 'behaviors.*.network_settings')
+        profile = profile_model(args.model, network, args.batch, args.obs_size, args.action_size)
+        if profile is None:
+            raise SystemExit(f"{args.model} cannot be read (LFS pointer or onnx missing) and no configuration.yaml was found")
+        print(f"{args.model} (from {profile['source']}, batch {args.batch})")
+        print(f"  parameters:        {profile['params']:,} ({profile['params'] * BYTES_PER_VALUE / 1024:.1f} KB)")
+        print(f"  MACs / FLOPs:      {profile['macs']:,} / {profile['flops']:,}")
+        print(f"  activations:       {profile['activation_bytes'] / 1024:.1f} KB total, "
+              f"{profile['peak_activation_bytes'] / 1024:.1f} KB peak")
+        print(f"  recurrent state:   {profile['state_bytes']} bytes")
+        if profile['unknown_shapes']:
+            print(f"  ({profile['unknown_shapes']} tensors with unknown shapes were not counted)")
+        if args.ops:
+            print()
+            _print_ops(profile)
+        return
+
+    rows = cost_table(args.results_dir, args.batch, args.obs_size, args.action_size)
+    if not rows:
+        raise SystemExit(f"No .onnx exports under {args.results_dir}")
+    print(f"Inference cost per decision (batch {args.batch}) vs final reward\n")
+    print(f"{'run':12s} {'src':6s} {'hidden':>6s} {'layers':>6s} {'memory':>6s} {'params':>9s} {'MACs':>9s} "
+          f"{'act KB':>7s} {'peak KB':>7s} {'state B':>7s} {'reward':>8s}")
+    for r in sorted(rows, key=lambda r: r['macs']):
+        reward = f"{r['final_reward']:8.2f}" if r['final_reward'] is not None else f"{'-':>8s}"
+        print(f"{r['run']:12s} {r['source']:6s} {r['hidden_units']:6d} {r['num_layers']:6d} {r['memory_size']:6d} "
+              f"{r['params']:9,d} {r['macs']:9,d} {r['activation_kb']:7.1f} {r['peak_activation_kb']:7.1f} "
+              f"{r['state_bytes']:7d} {reward}")
+    if any(r['source'] == 'config' for r in rows):
+        print(f"\nsrc=config: export not readable (LFS pointer or onnx not installed); estimated from "
+              f"configuration.yaml with obs size {args.obs_size}, action size {args.action_size}")
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved table to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Learning-curve grids per run and per run family (PNG/SVG)
+
+Rendering works from a downsampled cache rather than raw events: each
+run's tags are reduced once to at most --points buckets (mean plus min/max
+envelope) and kept in .data_fetch_cache/curves/<run>.npz, rebuilt only when
+the run's event files change. Every figure has a key made of its spec
+(tags, runs, smoothing, format) and the hashes of the caches it reads;
+figures whose key matches the last render are skipped. The rest are drawn
+in a process pool with the Agg backend, so regenerating all grids after a
+new checkpoint only redraws the runs that moved.
+
+Families default to the run-name prefix before the last '.<number>'
+(drone6.1, drone6.2 -> drone6).
+
+    python plot_curves.py --results-dir results --format png
+    python plot_curves.py --runs "drone7*" --tags "Environment/Cumulative Reward" Policy/Entropy --format svg
+    python plot_curves.py --family lstm=drone6.3,drone6.9,drone7.2 --no-runs
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cli import DEFAULT_CACHE_DIR, METRIC_CATEGORIES
+from derived_metrics import ema
+from report_build import local_imports
+from run_alignment import default_family, parse_families
+from tfevents import find_runs, load_scalars, run_signature
+
+DEFAULT_TAGS = METRIC_CATEGORIES["performance"] + METRIC_CATEGORIES["training"] + METRIC_CATEGORIES["policy"]
+DEFAULT_POINTS = 1000
+DEFAULT_SMOOTHING = 0.6
+GRID_COLUMNS = 4
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_SUBDIR = "curves"
+MANIFEST = "figures.json"
+
+
+def downsample(steps, values, n_points=DEFAULT_POINTS):
+    """(steps, mean, min, max) over at most n_points equal-width step buckets"""
+    steps = np.asarray(steps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(steps) <= n_points:
+        return steps, values, values, values
+    edges = np.linspace(steps[0], steps[-1], n_points + 1)[1:-1]
+    starts = np.concatenate(([0], np.searchsorted(steps, edges, side='right')))
+    starts = np.unique(starts[starts < len(steps)])
+    counts = np.diff(np.append(starts, len(steps)))
+    means = np.add.reduceat(values, starts) / counts
+    bucket_steps = (np.add.reduceat(steps.astype(np.float64), starts) / counts).astype(np.int64)
+    return bucket_steps, means, np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
+
+
+def _cache_path(cache_dir, run_id):
+    return os.path.join(cache_dir, CACHE_SUBDIR, run_id + ".npz")
+
+
+def build_series_cache(run_id, run_dir, cache_dir, n_points=DEFAULT_POINTS):
+    """Downsample every tag of a run into its cache file unless the event files are unchanged; returns True if rebuilt"""
+    path = _cache_path(cache_dir, run_id)
+    signature = json.dumps([run_signature(run_dir), n_points])
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['signature']) == signature:
+                return False
+    arrays = {'signature': np.array(signature)}
+    tags = []
+    for i, (tag, s) in enumerate(sorted(load_scalars(run_dir).items())):
+        steps, means, lows, highs = downsample(s.steps, s.values, n_points)
+        arrays.update({f"{i}_steps": steps, f"{i}_mean": means, f"{i}_min": lows, f"{i}_max": highs})
+        tags.append(tag)
+    arrays['tags'] = np.array(tags, dtype=str)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return True
+
+
+def load_series_cache(cache_dir, run_id, tags=None):
+    """{tag: (steps, mean, min, max)} from a run's downsampled cache"""
+    with np.load(_cache_path(cache_dir, run_id)) as cached:
+        series = {}
+        for i, tag in enumerate(cached['tags'].tolist()):
+            if tags is None or tag in tags:
+                series[tag] = tuple(cached[f"{i}_{field}"] for field in ('steps', 'mean', 'min', 'max'))
+    return series
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_figure(spec):
+    """Draw one grid (a subplot per tag, a line per run) and save it; runs in a worker process"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    data = {run_id: load_series_cache(spec['cache_dir'], run_id, set(spec['tags'])) for run_id in spec['runs']}
+    tags = [t for t in spec['tags'] if any(t in series for series in data.values())]
+    columns = min(GRID_COLUMNS, max(1, len(tags)))
+    rows = max(1, -(-len(tags) // columns))
+    fig, axes = plt.subplots(rows, columns, figsize=(3.6 * columns, 2.6 * rows), squeeze=False)
+    single_run = len(spec['runs']) == 1
+    # Fixed color per run across subplots; tab20 once the default cycle would repeat
+    palette = plt.get_cmap('tab10' if len(spec['runs']) <= 10 else 'tab20')
+    colors = {run_id: palette(i % palette.N) for i, run_id in enumerate(spec['runs'])}
+    for ax, tag in zip(axes.flat, tags):
+        for run_id in spec['runs']:
+            if tag not in data[run_id]:
+                continue
+            steps, means, lows, highs = data[run_id][tag]
+            color = colors[run_id]
+            # Step-valued tags (lesson numbers) are drawn raw; everything else smoothed like TensorBoard
+            values = means if tag.startswith('Environment/Lesson Number/') else ema(means, spec['smoothing'])
+            if single_run:
+                ax.fill_between(steps, lows, highs, color=color, alpha=0.15, linewidth=0)
+                ax.plot(steps, means, color=color, alpha=0.3, linewidth=0.6)
+            ax.plot(steps, values, color=color, linewidth=1.2, label=run_id)
+        ax.set_title(tag, fontsize=9)
+        ax.tick_params(labelsize=7)
+        ax.xaxis.get_offset_text().set_fontsize(7)
+        ax.grid(alpha=0.3)
+    for ax in list(axes.flat)[len(tags):]:
+        ax.set_visible(False)
+    fig.suptitle(spec['title'], fontsize=11)
+    fig.tight_layout()
+    if not single_run and tags:
+        # Not every run logs every tag, so the legend lists all runs rather than one subplot's lines
+        handles = [plt.Line2D([], [], color=colors[r], linewidth=1.2) for r in spec['runs']]
+        fig.legend(handles, spec['runs'], loc='center left', bbox_to_anchor=(1.0, 0.5), fontsize=8, frameon=False)
+    os.makedirs(os.path.dirname(spec['output']) or ".", exist_ok=True)
+    fig.savefig(spec['output'], dpi=spec['dpi'], bbox_inches='tight')
+    plt.close(fig)
+    return spec['output'], time.perf_counter() - start
+
+
+def figure_specs(run_ids, families, tags, output_dir, cache_dir, fmt="png", smoothing=DEFAULT_SMOOTHING, dpi=150,
+                 per_run=True):
+    specs = []
+    if per_run:
+        for run_id in run_ids:
+            specs.append({'title': run_id, 'runs': [run_id],
+                          'output': os.path.join(output_dir, "runs", f"{run_id}.{fmt}")})
+    for family, members in families.items():
+        specs.append({'title': f"{family} ({len(members)} runs)", 'runs': members,
+                      'output': os.path.join(output_dir, "families", f"{family}.{fmt}")})
+    for spec in specs:
+        spec.update({'tags': list(tags), 'smoothing': smoothing, 'dpi': dpi, 'cache_dir': cache_dir})
+    return specs
+
+
+def render_all(results_dir="results", run_patterns=None, family_patterns=None, tags=None, output_dir="figures",
+               cache_dir=DEFAULT_CACHE_DIR, fmt="png", smoothing=DEFAULT_SMOOTHING, n_points=DEFAULT_POINTS,
+               dpi=150, per_run=True, force=False, workers=None):
+    """Refresh series caches and render stale figures; returns (rendered, skipped, cache rebuilds)"""
+    run_dirs = find_runs(results_dir)
+    if run_patterns:
+        run_dirs = {r: d for r, d in run_dirs.items() if any(fnmatch.fnmatchcase(r, p) for p in run_patterns)}
+    run_ids = list(run_dirs)
+    if family_patterns:
+        families = {name: [r for r in run_ids if any(fnmatch.fnmatchcase(r, p) for p in patterns)]
+                    for name, patterns in family_patterns.items()}
+    else:
+        families = {}
+        for run_id in run_ids:
+            families.setdefault(default_family(run_id), []).append(run_id)
+        # A family of one run is the same picture as its per-run grid
+        families = {name: members for name, members in families.items() if len(members) > 1 or not per_run}
+    families = {name: members for name, members in families.items() if members}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rebuilt = [r for r, changed in zip(run_ids, pool.map(
+            build_series_cache, run_ids, [run_dirs[r] for r in run_ids], [cache_dir] * len(run_ids),
+            [n_points] * len(run_ids))) if changed]
+
+        manifest_path = os.path.join(cache_dir, CACHE_SUBDIR, MANIFEST)
+        manifest = {}
+        if os.path.exists(manifest_path) and not force:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        # The renderer's own code and every data_fetch module it imports (ema, tag categories, ...)
+        code_hash = [_file_hash(os.path.join(SCRIPT_DIR, name)) for name in local_imports([os.path.basename(__file__)])]
+        cache_hashes = {r: _file_hash(_cache_path(cache_dir, r)) for r in run_ids}
+
+        stale, skipped = [], []
+        for spec in figure_specs(run_ids, families, tags or DEFAULT_TAGS, output_dir, cache_dir, fmt, smoothing, dpi,
+                                 per_run):
+            key = hashlib.sha256(json.dumps([spec, [cache_hashes[r] for r in spec['runs']], code_hash],
+                                            sort_keys=True).encode()).hexdigest()
+            if manifest.get(spec['output']) == key and os.path.exists(spec['output']):
+                skipped.append(spec['output'])
+            else:
+                stale.append((spec, key))
+
+        rendered = []
+        for (spec, key), (path, seconds) in zip(stale, pool.map(render_figure, [s for s, _ in stale])):
+            manifest[spec['output']] = key
+            rendered.append((path, seconds))
+
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return rendered, skipped, rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render per-run and per-family learning-curve grids")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--runs", nargs="+", help="run name patterns (default: all runs)")
+    parser.add_argument("--family", action="append", default=[],
+                        help="NAME=PATTERN[,PATTERN...] (repeatable; default: group by name prefix)")
+    parser.add_argument("--tags", nargs="+", help="tags to plot (default: performance, training and policy tags)")
+    parser.add_argument("--output-dir", default="figures")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--format", choices=["png", "svg", "pdf"], default="png")
+    parser.add_argument("--smoothing", type=float, default=DEFAULT_SMOOTHING, help="EMA weight as in TensorBoard")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS, help="max points kept per tag in the cache")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--no-runs", action="store_true", help="only render family grids")
+    parser.add_argument("--force", action="store_true", help="re-render every figure")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    if not args.smoothing < 1:
+        parser.error("--smoothing must be < 1")
+
+    families = parse_families(args.family) or None
+
+    start = time.perf_counter()
+    rendered, skipped, rebuilt = render_all(
+        args.results_dir, args.runs, families, args.tags, args.output_dir, args.cache_dir, args.format,
+        args.smoothing, args.points, args.dpi, not args.no_runs, args.force, args.workers)
+    for path, seconds in rendered:
+        print(f"  {path} ({seconds:.2f}s)")
+    print(f"Rendered {len(rendered)} figures, {len(skipped)} unchanged; "
+          f"{len(rebuilt)} run caches rebuilt in {time.perf_counter() - start:.1f}s -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Micro-batching local inference server for exported (LSTM) drone policies
+
+Loads a policy once and serves many agents over TCP. Requests are queued and
+run as dynamic micro-batches: a batch starts with the first waiting request
+and closes when it reaches --max-batch or --max-wait-ms has passed. Each
+agent's recurrent state lives in a preallocated (max_agents, 1, memory_size)
+array; batch inputs are gathered into preallocated buffers and the new state
+is scattered back, so nothing is allocated per agent per call.
+
+Protocol (little endian): request header <i agent_id, H kind, H n_floats>
+followed by n_floats float32 observations; kind 0 = decide, 1 = episode
+ended (state reset), 2 = stats. Responses are <I n_bytes> + payload
+(float32 actions, nothing, or stats JSON); when the top bit of n_bytes is
+set the request was refused and the payload is a UTF-8 error message.
+Agent ids are per connection: two clients may both use agent 0.
+
+ML-Agents .onnx exports are run with onnxruntime (imported only when used).
+--stand-in serves a NumPy LSTM (or, for runs without memory, an MLP) with
+the same inputs/outputs instead, for testing on machines without the model
+or onnxruntime:
+
+    python policy_server.py serve --run results/drone7.2 --port 5100
+    python policy_server.py simulate --stand-in --run results/drone7.2 --agents 64 --compare
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from drone_surrogate import ACTION_SIZE, OBSERVATION_SIZE
+from run_config import get_config_value, load_run_config
+
+REQUEST = struct.Struct('<iHH')
+RESPONSE = struct.Struct('<I')
+KIND_DECIDE, KIND_END_EPISODE, KIND_STATS = 0, 1, 2
+ERROR_FLAG = 0x80000000
+
+LFS_MAGIC = b"version https://git-lfs"
+LATENCY_WINDOW = 100000
+
+
+def is_lfs_pointer(path):
+    with open(path, 'rb') as f:
+        return f.read(len(LFS_MAGIC)) == LFS_MAGIC
+
+
+class OnnxPolicy:
+    """ML-Agents ONNX export: obs_* + recurrent_in -> continuous actions + recurrent_out"""
+
+    def __init__(self, path, threads=1):
+        if is_lfs_pointer(path):
+            raise ValueError(f"{path} is a Git LFS pointer; run 'git lfs pull' or use --stand-in")
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        inputs = {i.name: i for i in self.session.get_inputs()}
+        outputs = {o.name for o in self.session.get_outputs()}
+
+        self.obs_inputs = sorted(name for name in inputs if name.startswith('obs_'))
+        self.obs_sizes = [int(inputs[name].shape[-1]) for name in self.obs_inputs]
+        self.obs_size = sum(self.obs_sizes)
+        self.recurrent = 'recurrent_in' in inputs
+        self.memory_size = int(inputs['recurrent_in'].shape[-1]) if self.recurrent else 0
+        self.action_output = ('deterministic_continuous_actions' if 'deterministic_continuous_actions' in outputs
+                              else 'continuous_actions')
+        self.outputs = [self.action_output] + (['recurrent_out'] if self.recurrent else [])
+        shape = next(o.shape for o in self.session.get_outputs() if o.name == self.action_output)
+        self.action_size = int(shape[-1])
+
+    def run(self, obs, memories):
+        feeds = {}
+        start = 0
+        for name, size in zip(self.obs_inputs, self.obs_sizes):
+            feeds[name] = obs[:, start:start + size]
+            start += size
+        if self.recurrent:
+            feeds['recurrent_in'] = memories
+        results = self.session.run(self.outputs, feeds)
+        return results[0], (results[1] if self.recurrent else memories)
+
+
+class NumpyLSTMPolicy:
+    """Random-weight dense encoder + LSTM cell + tanh head with the ML-Agents I/O layout
+
+    memory_size is split into hidden and cell state halves as in ML-Agents. All
+    intermediates are written into buffers sized for max_batch.
+    """
+
+    def __init__(self, obs_size=OBSERVATION_SIZE, action_size=ACTION_SIZE, memory_size=128,
+                 hidden_units=256, max_batch=64, seed=0):
+        if memory_size < 2:
+            raise ValueError(f"memory_size {memory_size} has no LSTM state; use NumpyMLPPolicy")
+        rng = np.random.default_rng(seed)
+        self.obs_size = obs_size
+        self.action_size = action_size
+        self.memory_size = memory_size
+        self.recurrent = True
+        h = memory_size // 2
+        scale = lambda n: 1.0 / np.sqrt(n)
+        self.w_enc = (rng.standard_normal((obs_size, hidden_units)) * scale(obs_size)).astype(np.float32)
+        self.w_x = (rng.standard_normal((hidden_units, 4 * h)) * scale(hidden_units)).astype(np.float32)
+        self.w_h = (rng.standard_normal((h, 4 * h)) * scale(h)).astype(np.float32)
+        self.w_act = (rng.standard_normal((h, action_size)) * scale(h)).astype(np.float32)
+
+        self.enc = np.empty((max_batch, hidden_units), dtype=np.float32)
+        self.gates = np.empty((max_batch, 4 * h), dtype=np.float32)
+        self.gates_h = np.empty((max_batch, 4 * h), dtype=np.float32)
+        self.mem_out = np.empty((max_batch, 1, memory_size), dtype=np.float32)
+        self.actions = np.empty((max_batch, action_size), dtype=np.float32)
+
+    def run(self, obs, memories):
+        n = len(obs)
+        h = self.memory_size // 2
+        enc, gates, gates_h = self.enc[:n], self.gates[:n], self.gates_h[:n]
+        hidden, cell = memories[:, 0, :h], memories[:, 0, h:]
+        new_hidden, new_cell = self.mem_out[:n, 0, :h], self.mem_out[:n, 0, h:]
+
+        np.matmul(obs, self.w_enc, out=enc)
+        np.maximum(enc, 0.0, out=enc)
+        np.matmul(enc, self.w_x, out=gates)
+        np.matmul(hidden, self.w_h, out=gates_h)
+        gates += gates_h
+        # Sigmoid on input/forget/output gates, tanh on the candidate
+        ifo, g = gates[:, :3 * h], gates[:, 3 * h:]
+        np.negative(ifo, out=ifo)
+        np.exp(ifo, out=ifo)
+        ifo += 1.0
+        np.reciprocal(ifo, out=ifo)
+        np.tanh(g, out=g)
+        np.multiply(gates[:, h:2 * h], cell, out=new_cell)
+        new_cell += gates[:, :h] * g
+        np.tanh(new_cell, out=new_hidden)
+        new_hidden *= gates[:, 2 * h:3 * h]
+
+        np.matmul(new_hidden, self.w_act, out=self.actions[:n])
+        np.tanh(self.actions[:n], out=self.actions[:n])
+        return self.actions[:n], self.mem_out[:n]
+
+
+class NumpyMLPPolicy:
+    """Random-weight stand-in for runs without memory: dense encoder + tanh head, no recurrent state"""
+
+    def __init__(self, obs_size=OBSERVATION_SIZE, action_size=ACTION_SIZE, hidden_units=256, max_batch=64, seed=0):
+        rng = np.random.default_rng(seed)
+        self.obs_size = obs_size
+        self.action_size = action_size
+        self.memory_size = 0
+        self.recurrent = False
+        self.w_enc = (rng.standard_normal((obs_size, hidden_units)) / np.sqrt(obs_size)).astype(np.float32)
+        self.w_act = (rng.standard_normal((hidden_units, action_size)) / np.sqrt(hidden_units)).astype(np.float32)
+        self.enc = np.empty((max_batch, hidden_units), dtype=np.float32)
+        self.actions = np.empty((max_batch, action_size), dtype=np.float32)
+
+    def run(self, obs, memories):
+        n = len(obs)
+        enc = self.enc[:n]
+        np.matmul(obs, self.w_enc, out=enc)
+        np.maximum(enc, 0.0, out=enc)
+        np.matmul(enc, self.w_act, out=self.actions[:n])
+        np.tanh(self.actions[:n], out=self.actions[:n])
+        return self.actions[:n], memories
+
+
+class MicroBatcher:
+    """Queues decide requests and runs them through the policy in bounded micro-batches"""
+
+    def __init__(self, policy, max_batch=32, max_wait=0.002, max_agents=1024):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_agents = max_agents
+        memory_size = max(policy.memory_size, 1)
+
+        self.memories = np.zeros((max_agents, 1, memory_size), dtype=np.float32)
+        self.slots = {}                       # (connection, agent id) -> row in self.memories
+        self.free_slots = list(range(max_agents - 1, -1, -1))
+        self.obs_buf = np.zeros((max_batch, policy.obs_size), dtype=np.float32)
+        self.mem_buf = np.zeros((max_batch, 1, memory_size), dtype=np.float32)
+        self.slot_buf = np.zeros(max_batch, dtype=np.intp)
+
+        self.connections = itertools.count()
+        self.queue = asyncio.Queue()
+        self.deferred = []
+        self.latencies = np.zeros(LATENCY_WINDOW)
+        self.batch_sizes = np.zeros(max_batch + 1, dtype=np.int64)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.started = time.perf_counter()
+        self.busy_seconds = 0.0
+        self.batch_sizes[:] = 0
+
+    def slot(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            if not self.free_slots:
+                raise RuntimeError(f"more than {self.max_agents} agents connected")
+            slot = self.slots[key] = self.free_slots.pop()
+            self.memories[slot] = 0.0
+        return slot
+
+    def end_episode(self, key):
+        if key in self.slots:
+            self.memories[self.slots[key]] = 0.0
+
+    def release(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.free_slots.append(slot)
+
+    async def decide(self, key, obs):
+        """Actions for one agent; key is (connection, agent id) so clients never share state"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((self.slot(key), obs, time.perf_counter(), future))
+        return await future
+
+    async def _next(self, timeout):
+        if self.deferred:
+            return self.deferred.pop(0)
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        if timeout is None:
+            return await self.queue.get()
+        if timeout <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._next(None)]
+            in_batch = {batch[0][0]}
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                item = await self._next(deadline - loop.time())
+                if item is None:
+                    break
+                if item[0] in in_batch:
+                    # Same agent twice: its second step must see the state from the first
+                    self.deferred.append(item)
+                    break
+                in_batch.add(item[0])
+                batch.append(item)
+            try:
+                self._run_batch(batch)
+            except Exception as exc:
+                # A failing policy call (bad shape/dtype in the model, say) fails this batch's
+                # requests with an error reply; the worker keeps serving later batches
+                print(f"  policy failed on a batch of {len(batch)}: {exc!r}")
+                error = RuntimeError(f"policy failed: {type(exc).__name__}: {exc}")
+                for _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _run_batch(self, batch):
+        start = time.perf_counter()
+        n = len(batch)
+        for i, (slot, obs, _, _) in enumerate(batch):
+            self.obs_buf[i] = obs
+            self.slot_buf[i] = slot
+        slots = self.slot_buf[:n]
+        np.take(self.memories, slots, axis=0, out=self.mem_buf[:n])
+        actions, memories = self.policy.run(self.obs_buf[:n], self.mem_buf[:n])
+        if self.policy.recurrent:
+            self.memories[slots] = memories
+
+        done = time.perf_counter()
+        self.busy_seconds += done - start
+        self.batch_sizes[n] += 1
+        for i, (_, _, enqueued, future) in enumerate(batch):
+            self.latencies[(self.requests + i) % LATENCY_WINDOW] = done - enqueued
+            if not future.done():
+                future.set_result(actions[i].tobytes())
+        self.requests += n
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started
+        batches = int(self.batch_sizes.sum())
+        recent = self.latencies[:min(self.requests, LATENCY_WINDOW)]
+        p50, p95, p99 = (np.percentile(recent, [50, 95, 99]) * 1e3).tolist() if len(recent) else (None,) * 3
+        return {
+            'requests': self.requests,
+            'batches': batches,
+            'mean_batch': self.requests / batches if batches else None,
+            'requests_per_second': self.requests / elapsed if elapsed > 0 else None,
+            'latency_ms': {'p50': p50, 'p95': p95, 'p99': p99},
+            'policy_busy_fraction': self.busy_seconds / elapsed if elapsed > 0 else None,
+            'agents': len(self.slots),
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1e3,
+        }
+
+
+async def _send(writer, payload):
+    writer.write(RESPONSE.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def _send_error(writer, message):
+    payload = message.encode()
+    writer.write(RESPONSE.pack(ERROR_FLAG | len(payload)) + payload)
+    await writer.drain()
+
+
+async def handle_client(batcher, reader, writer):
+    connection = next(batcher.connections)
+    agents = set()
+    try:
+        while True:
+            header = await reader.readexactly(REQUEST.size)
+            agent_id, kind, n = REQUEST.unpack(header)
+            payload = await reader.readexactly(n * 4) if n else b''
+            key = (connection, agent_id)
+            if kind == KIND_DECIDE:
+                if n != batcher.policy.obs_size:
+                    raise ValueError(f"agent {agent_id} sent {n} observations, policy expects {batcher.policy.obs_size}")
+                try:
+                    actions = await batcher.decide(key, np.frombuffer(payload, dtype=np.float32))
+                except RuntimeError as exc:
+                    await _send_error(writer, str(exc))
+                    continue
+                agents.add(key)
+                await _send(writer, actions)
+            elif kind == KIND_END_EPISODE:
+                batcher.end_episode(key)
+                await _send(writer, b'')
+            elif kind == KIND_STATS:
+                await _send(writer, json.dumps(batcher.stats()).encode())
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except ValueError as exc:
+        print(f"  dropping client: {exc}")
+    finally:
+        for key in agents:
+            batcher.release(key)
+        writer.close()
+
+
+async def start_server(batcher, host, port):
+    worker = asyncio.ensure_future(batcher.run())
+    server = await asyncio.start_server(lambda r, w: handle_client(batcher, r, w), host, port)
+    return server, worker
+
+
+# ---------------------------------------------------------------------------
+# Simulated agents
+# ---------------------------------------------------------------------------
+
+async def simulated_agent(agent_id, host, port, obs_size, decisions, episode_length, seed):
+    """One agent: a connection sending decide requests back to back, resetting every episode"""
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    obs = rng.standard_normal((episode_length, obs_size)).astype(np.float32)
+    header = REQUEST.pack(agent_id, KIND_DECIDE, obs_size)
+    for i in range(decisions):
+        writer.write(header + obs[i % episode_length].tobytes())
+        await writer.drain()
+        n, = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+        reply = await reader.readexactly(n & ~ERROR_FLAG)
+        if n & ERROR_FLAG:
+            raise RuntimeError(f"agent {agent_id}: {reply.decode()}")
+        if (i + 1) % episode_length == 0:
+            writer.write(REQUEST.pack(agent_id, KIND_END_EPISODE, 0))
+            await writer.drain()
+            n, = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+    writer.close()
+
+
+async def simulate(policy, agents, decisions, max_batch, max_wait, episode_length=100, host='127.0.0.1'):
+    batcher = MicroBatcher(policy, max_batch, max_wait, max_agents=max(agents, 1))
+    server, worker = await start_server(batcher, host, 0)
+    port = server.sockets[0].getsockname()[1]
+    batcher.reset_stats()
+    await asyncio.gather(*(simulated_agent(i, host, port, policy.obs_size, decisions, episode_length, i)
+                           for i in range(agents)))
+    stats = batcher.stats()
+    server.close()
+    await server.wait_closed()
+    worker.cancel()
+    return stats
+
+
+def _policy_dims(run_dir):
+    """memory_size and hidden_units from a run's configuration.yaml"""
+    config = load_run_config(run_dir) if run_dir else None
+    memory = get_config_value(config, 'behaviors.*.network_settings.memory.memory_size', 0) if config else 128
+    hidden = get_config_value(config, 'behaviors.*.network_settings.hidden_units', 256) if config else 256
+    return memory or 0, hidden
+
+
+def load_policy(args):
+    if args.stand_in:
+        memory, hidden = _policy_dims(args.run)
+        if not memory:
+            return NumpyMLPPolicy(args.obs_size, args.action_size, hidden, max_batch=args.max_batch)
+        return NumpyLSTMPolicy(args.obs_size, args.action_size, memory, hidden, max_batch=args.max_batch)
+    model = args.model
+    if model is None:
+        behavior = [n for n in os.listdir(args.run) if n.endswith('.onnx')] if args.run else []
+        if not behavior:
+            raise SystemExit("No model: pass --model or a --run with an exported .onnx (or use --stand-in)")
+        model = os.path.join(args.run, behavior[0])
+    try:
+        return OnnxPolicy(model, args.threads)
+    except (ImportError, ValueError) as exc:
+        raise SystemExit(f"Cannot load {model}: {exc}")
+
+
+def _print_stats(label, stats):
+    lat = stats['latency_ms']
+    print(f"{label:>22s}: {stats['requests_per_second']:9.0f} decisions/s  mean batch {stats['mean_batch']:5.1f}  "
+          f"latency p50 {lat['p50']:.2f} ms  p95 {lat['p95']:.2f} ms  p99 {lat['p99']:.2f} ms  "
+          f"policy busy {stats['policy_busy_fraction'] * 100:.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching inference server for exported drone policies")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("serve", "serve agents over TCP"), ("simulate", "benchmark with simulated agents")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--model", help="exported .onnx policy")
+        p.add_argument("--run", help="run directory: model <behavior>.onnx and network sizes from its config")
+        p.add_argument("--stand-in", action="store_true", help="serve a NumPy LSTM with the same I/O instead")
+        p.add_argument("--obs-size", type=int, default=OBSERVATION_SIZE, help="stand-in observation size")
+        p.add_argument("--action-size", type=int, default=ACTION_SIZE, help="stand-in action size")
+        p.add_argument("--max-batch", type=int, default=32)
+        p.add_argument("--max-wait-ms", type=float, default=2.0)
+        p.add_argument("--threads", type=int, default=1, help="onnxruntime intra-op threads")
+    p_serve = sub.choices["serve"]
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=5100)
+    p_serve.add_argument("--max-agents", type=int, default=1024)
+    p_serve.add_argument("--stats-interval", type=float, default=10.0)
+    p_sim = sub.choices["simulate"]
+    p_sim.add_argument("--agents", type=int, default=64)
+    p_sim.add_argument("--decisions", type=int, default=500, help="decisions per agent")
+    p_sim.add_argument("--compare", action="store_true", help="also run unbatched (max batch 1) for reference")
+    args = parser.parse_args()
+
+    policy = load_policy(args)
+    print(f"Policy: {type(policy).__name__} obs {policy.obs_size} actions {policy.action_size} "
+          f"memory {policy.memory_size}")
+
+    if args.command == "simulate":
+        runs = [(1, 0.0)] if args.compare else []
+        runs.append((args.max_batch, args.max_wait_ms / 1e3))
+        for max_batch, max_wait in runs:
+            stats = asyncio.run(simulate(policy, args.agents, args.decisions, max_batch, max_wait))
+            _print_stats(f"batch<={max_batch} wait {max_wait * 1e3:.1f}ms", stats)
+        return
+
+    async def serve():
+        batcher = MicroBatcher(policy, args.max_batch, args.max_wait_ms / 1e3, args.max_agents)
+        server, _ = await start_server(batcher, args.host, args.port)
+        print(f"Serving on {args.host}:{args.port} (max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+        async with server:
+            while True:
+                await asyncio.sleep(args.stats_interval)
+                if batcher.requests:
+                    _print_stats(time.strftime('%H:%M:%S'), batcher.stats())
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Minimal protobuf wire-format decoding and encoding
+
+Just enough to read and write Event/Summary records without importing
+TensorFlow or the tensorboard protobuf stack.
+"""
+
+import struct
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LEN = 2
+WIRE_FIXED32 = 5
+
+_DOUBLE = struct.Struct('<d')
+_FLOAT = struct.Struct('<f')
+
+
+def decode_varint(buf, pos):
+    """Decode a base-128 varint starting at pos, returning (value, new_pos)"""
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise ValueError("Varint too long")
+
+
+def iter_fields(buf, pos=0, end=None):
+    """Yield (field_number, wire_type, value) for every field in a message
+
+    Varints are returned as ints, length-delimited fields as bytes slices and
+    fixed32/fixed64 fields as their raw little-endian bytes.
+    """
+    if end is None:
+        end = len(buf)
+    while pos < end:
+        key, pos = decode_varint(buf, pos)
+        field_number = key >> 3
+        wire_type = key & 0x07
+        if wire_type == WIRE_VARINT:
+            value, pos = decode_varint(buf, pos)
+        elif wire_type == WIRE_LEN:
+            length, pos = decode_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == WIRE_FIXED64:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == WIRE_FIXED32:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type}")
+        if pos > end:
+            raise ValueError("Truncated message")
+        yield field_number, wire_type, value
+
+
+def to_double(raw):
+    return _DOUBLE.unpack(raw)[0]
+
+
+def to_float(raw):
+    return _FLOAT.unpack(raw)[0]
+
+
+def to_signed64(value):
+    """Reinterpret an unsigned varint as a two's-complement int64"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def packed_floats(raw):
+    return list(struct.unpack(f'<{len(raw) // 4}f', raw))
+
+
+def packed_doubles(raw):
+    return list(struct.unpack(f'<{len(raw) // 8}d', raw))
+
+
+def encode_varint(value):
+    """Encode a non-negative int (or int64 via two's complement) as a varint"""
+    if value < 0:
+        value += 1 << 64
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def field_varint(field_number, value):
+    return encode_varint(field_number << 3 | WIRE_VARINT) + encode_varint(value)
+
+
+def field_bytes(field_number, data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return encode_varint(field_number << 3 | WIRE_LEN) + encode_varint(len(data)) + data
+
+
+def field_double(field_number, value):
+    return encode_varint(field_number << 3 | WIRE_FIXED64) + _DOUBLE.pack(value)
+
+
+def field_float(field_number, value):
+    return encode_varint(field_number << 3 | WIRE_FIXED32) + _FLOAT.pack(value)
+
+
+def field_packed_floats(field_number, values):
+    return field_bytes(field_number, struct.pack(f'<{len(values)}f', *values))
+
+
+def field_packed_doubles(field_number, values):
+    return field_bytes(field_number, struct.pack(f'<{len(values)}d', *values))
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Mergeable quantile sketches (t-digest) per run, tag and step window
+
+Reward distributions are skewed (mostly mildly positive, a few -50 crash
+penalties), so mean +/- std hides what matters. A t-digest keeps a bounded
+number of weighted centroids, small near the tails and coarse in the
+middle, so p5/p95 stay accurate in a few KB per sketch. Digests merge by
+pooling centroids, so windows combine into a run, runs into a family, and
+a family answers quantile queries without the raw samples.
+
+`build` streams every run's event files (and episode_logs/*.bin when a run
+has them, as Episode/<field> tags) once and keeps one digest per
+(run, tag, window of --window steps) in an uncompressed .npz.
+
+    python quantile_sketch.py build --results-dir results --window 1000000
+    python quantile_sketch.py query --tag "Environment/Cumulative Reward" --family drone6=drone6* --from-step 8000000
+    python quantile_sketch.py query --tag Episode/reward --by window --runs drone7.2
+"""
+
+import argparse
+import copy
+import fnmatch
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from run_alignment import default_family, parse_families
+from tfevents import find_event_files, find_runs, read_scalar_points
+
+DEFAULT_OUTPUT = "quantile_sketches.npz"
+DEFAULT_COMPRESSION = 200
+DEFAULT_WINDOW = 1000000
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+# Values are buffered and folded into the centroids once this many per unit of compression arrive
+BUFFER_FACTOR = 5
+EPISODE_FIELDS = ('reward', 'episode_length', 'targets_found', 'path_efficiency', 'angle_stability')
+FORMAT_VERSION = 1
+
+
+class TDigest:
+    """Merging t-digest over float values; memory is O(compression) regardless of the count"""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.count = 0.0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+        self._buffered = 0
+
+    def __len__(self):
+        return int(self.count)
+
+    def __repr__(self):
+        return f"TDigest(count={self.count:g}, centroids={len(self.means)}, compression={self.compression})"
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def update(self, values, weights=None):
+        """Add values (scalar or array); NaN and infinities are ignored"""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        weights = np.ones(len(values)) if weights is None else np.broadcast_to(np.asarray(weights, dtype=np.float64), values.shape)
+        finite = np.isfinite(values) & (weights > 0)
+        if not finite.all():
+            values, weights = values[finite], weights[finite]
+        if not len(values):
+            return self
+        self._add(values, weights, values.min(), values.max(), float(values @ weights))
+        return self
+
+    def merge(self, *others):
+        """Fold other digests into this one"""
+        for other in others:
+            if other.count:
+                other._flush()
+                self._add(other.means, other.weights, other.min, other.max, other.total)
+        return self
+
+    @classmethod
+    def merged(cls, digests, compression=None):
+        digests = list(digests)
+        if compression is None:
+            compression = max((d.compression for d in digests), default=DEFAULT_COMPRESSION)
+        return cls(compression).merge(*digests)
+
+    def _add(self, means, weights, lo, hi, total):
+        self._buffer.append((means, weights))
+        self._buffered += len(means)
+        self.count += float(weights.sum())
+        self.total += total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+        if self._buffered > BUFFER_FACTOR * self.compression:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [m for m, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [w for _, w in self._buffer])
+        self._buffer, self._buffered = [], 0
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        # k1 scale function: a centroid may span at most one unit of k, which is
+        # tight at q=0 and q=1 and loose around the median
+        cumulative = np.cumsum(weights)
+        q_mid = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        bucket = np.floor(k)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def _knots(self):
+        """(cumulative weight, value) points the quantile function interpolates between"""
+        self._flush()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return (np.concatenate(([0.0], centers, [self.count])),
+                np.concatenate(([self.min], np.clip(self.means, self.min, self.max), [self.max])))
+
+    def quantile(self, q):
+        """Value at quantile q (scalar or array, 0..1)"""
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        ranks, values = self._knots()
+        out = np.interp(np.asarray(q, dtype=np.float64) * self.count, ranks, values)
+        return out if np.ndim(q) else float(out)
+
+    def cdf(self, x):
+        """Fraction of the weight at or below x"""
+        if not self.count:
+            return np.nan
+        ranks, values = self._knots()
+        out = np.interp(x, values, ranks) / self.count
+        return out if np.ndim(x) else float(out)
+
+    def summary(self, quantiles=DEFAULT_QUANTILES):
+        """{'count', 'mean', 'min', 'max', 'p5', 'p50', ...}"""
+        out = {'count': int(self.count), 'mean': float(self.mean),
+               'min': float(self.min) if self.count else np.nan, 'max': float(self.max) if self.count else np.nan}
+        for q, value in zip(quantiles, np.atleast_1d(self.quantile(np.asarray(quantiles)))):
+            out[quantile_label(q)] = float(value)
+        return out
+
+    def state(self):
+        """Centroid arrays and totals, compressed, for serialization"""
+        self._flush()
+        return self.means, self.weights, (self.count, self.total, self.min, self.max)
+
+    @classmethod
+    def from_state(cls, means, weights, totals, compression=DEFAULT_COMPRESSION):
+        digest = cls(compression)
+        digest.means, digest.weights = np.asarray(means, dtype=np.float64), np.asarray(weights, dtype=np.float64)
+        digest.count, digest.total, digest.min, digest.max = (float(v) for v in totals)
+        return digest
+
+
+def quantile_label(q):
+    """0.05 -> 'p5', 0.5 -> 'p50', 0.999 -> 'p99.9'"""
+    return "p" + f"{q * 100:.4f}".rstrip('0').rstrip('.')
+
+
+def quantile_summary(values, quantiles=DEFAULT_QUANTILES, compression=DEFAULT_COMPRESSION):
+    """summary() of a digest built from values, for reports that only had mean +/- std"""
+    return TDigest(compression).update(values).summary(quantiles)
+
+
+class SketchSet:
+    """One TDigest per (run, tag, window), where window = step // window_steps"""
+
+    def __init__(self, window_steps=DEFAULT_WINDOW, compression=DEFAULT_COMPRESSION):
+        self.window_steps = window_steps
+        self.compression = compression
+        self.digests = {}
+
+    def __len__(self):
+        return len(self.digests)
+
+    def add(self, run_id, tag, steps, values):
+        """Stream a batch of points into the window digests of one run and tag"""
+        steps = np.asarray(steps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(steps):
+            return
+        windows = steps // self.window_steps
+        order = np.argsort(windows, kind='stable')
+        windows, values = windows[order], values[order]
+        cuts = np.flatnonzero(np.diff(windows)) + 1
+        for window, chunk in zip(windows[np.concatenate(([0], cuts))].tolist(), np.split(values, cuts)):
+            key = (run_id, tag, window)
+            if key not in self.digests:
+                self.digests[key] = TDigest(self.compression)
+            self.digests[key].update(chunk)
+
+    def merge(self, other):
+        """Fold another set with the same window size into this one; other is left unchanged"""
+        if other.window_steps != self.window_steps:
+            raise ValueError(f"window sizes differ: {self.window_steps} vs {other.window_steps}")
+        for key, digest in other.digests.items():
+            if key in self.digests:
+                self.digests[key].merge(digest)
+            else:
+                self.digests[key] = copy.deepcopy(digest)
+        return self
+
+    def runs(self):
+        return sorted({run for run, _, _ in self.digests})
+
+    def tags(self):
+        return sorted({tag for _, tag, _ in self.digests})
+
+    def _keys(self, tag, runs=None, from_step=None, to_step=None):
+        lo = None if from_step is None else from_step // self.window_steps
+        hi = None if to_step is None else to_step // self.window_steps
+        for key in self.digests:
+            run_id, key_tag, window = key
+            if key_tag != tag:
+                continue
+            if runs is not None and not any(fnmatch.fnmatchcase(run_id, p) for p in runs):
+                continue
+            if (lo is not None and window < lo) or (hi is not None and window > hi):
+                continue
+            yield key
+
+    def select(self, tag, runs=None, from_step=None, to_step=None):
+        """One digest merged over the matching runs (fnmatch patterns) and windows
+
+        Step bounds are applied at window granularity: every window that
+        overlaps [from_step, to_step] is included whole.
+        """
+        return TDigest.merged((self.digests[k] for k in self._keys(tag, runs, from_step, to_step)), self.compression)
+
+    def group(self, tag, by, runs=None, from_step=None, to_step=None, families=None):
+        """{group: merged digest} grouped by 'run', 'window' or 'family'
+
+        families maps family -> [run patterns]; without it runs are grouped
+        by run_alignment.default_family (drone6.10 -> drone6).
+        """
+        groups = {}
+        for key in self._keys(tag, runs, from_step, to_step):
+            run_id, _, window = key
+            if by == 'run':
+                names = [run_id]
+            elif by == 'window':
+                names = [window * self.window_steps]
+            elif families is None:
+                names = [default_family(run_id)]
+            else:
+                names = [name for name, patterns in families.items()
+                         if any(fnmatch.fnmatchcase(run_id, p) for p in patterns)]
+            for name in names:
+                groups.setdefault(name, []).append(self.digests[key])
+        return {name: TDigest.merged(digests, self.compression) for name, digests in sorted(groups.items())}
+
+    def save(self, path):
+        keys = sorted(self.digests)
+        states = [self.digests[k].state() for k in keys]
+        sizes = np.array([len(means) for means, _, _ in states], dtype=np.int64)
+        np.savez(
+            path,
+            version=FORMAT_VERSION,
+            window_steps=self.window_steps,
+            compression=self.compression,
+            runs=np.array([k[0] for k in keys], dtype=str),
+            tags=np.array([k[1] for k in keys], dtype=str),
+            windows=np.array([k[2] for k in keys], dtype=np.int64),
+            offsets=np.concatenate(([0], np.cumsum(sizes))),
+            means=np.concatenate([s[0] for s in states]) if states else np.zeros(0),
+            weights=np.concatenate([s[1] for s in states]) if states else np.zeros(0),
+            totals=np.array([s[2] for s in states], dtype=np.float64).reshape(-1, 4),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported sketch format {int(data['version'])}")
+            sketches = cls(int(data['window_steps']), int(data['compression']))
+            offsets, means, weights, totals = data['offsets'], data['means'], data['weights'], data['totals']
+            for i, key in enumerate(zip(data['runs'].tolist(), data['tags'].tolist(), data['windows'].tolist())):
+                start, end = offsets[i], offsets[i + 1]
+                sketches.digests[key] = TDigest.from_state(means[start:end], weights[start:end], totals[i],
+                                                           sketches.compression)
+        return sketches
+
+
+def sketch_run(run_id, run_dir, window_steps=DEFAULT_WINDOW, compression=DEFAULT_COMPRESSION, tags=None):
+    """SketchSet for one run from a single pass over its event files and episode logs
+
+    Files are read newest first; when a resumed run logged a step again, the
+    newest file wins (as in load_scalars), so points of an older file at or
+    beyond the first step a newer file logged for that tag are skipped.
+    """
+    sketches = SketchSet(window_steps, compression)
+    wanted = None if tags is None else set(tags)
+    newer_start = {}
+    for path in reversed(find_event_files(run_dir)):
+        points, _ = read_scalar_points(path)
+        by_tag = {}
+        for tag, step, _, value in points:
+            if wanted is None or tag in wanted:
+                by_tag.setdefault(tag, ([], []))
+                by_tag[tag][0].append(step)
+                by_tag[tag][1].append(value)
+        for tag, (steps, values) in by_tag.items():
+            steps, values = np.array(steps, dtype=np.int64), np.array(values, dtype=np.float64)
+            if tag in newer_start:
+                keep = steps < newer_start[tag]
+                steps, values = steps[keep], values[keep]
+            if len(steps):
+                sketches.add(run_id, tag, steps, values)
+                newer_start[tag] = min(newer_start.get(tag, steps.min()), steps.min())
+
+    if os.path.isdir(os.path.join(run_dir, "episode_logs")):
+        from episode_log import find_episode_logs, open_episode_log
+
+        for path in find_episode_logs(run_dir):
+            records = open_episode_log(path)
+            for start in range(0, len(records), 1 << 20):
+                chunk = records[start:start + (1 << 20)]
+                for field in EPISODE_FIELDS:
+                    tag = f"Episode/{field}"
+                    if wanted is None or tag in wanted:
+                        sketches.add(run_id, tag, chunk['step'], chunk[field])
+    return sketches
+
+
+def _sketch_run_args(args):
+    return sketch_run(*args)
+
+
+def build(results_dir="results", window_steps=DEFAULT_WINDOW, compression=DEFAULT_COMPRESSION, tags=None, workers=None):
+    """SketchSet over every run in results_dir, one worker process per run"""
+    run_dirs = dict(find_runs(results_dir))
+    if os.path.isdir(results_dir):
+        for name in sorted(os.listdir(results_dir)):
+            if os.path.isdir(os.path.join(results_dir, name, "episode_logs")):
+                run_dirs.setdefault(name, os.path.join(results_dir, name))
+    jobs = [(run_id, run_dir, window_steps, compression, tags) for run_id, run_dir in run_dirs.items()]
+    sketches = SketchSet(window_steps, compression)
+    if workers == 1 or len(jobs) <= 1:
+        results = map(_sketch_run_args, jobs)
+        for run_sketches in results:
+            sketches.merge(run_sketches)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for run_sketches in pool.map(_sketch_run_args, jobs):
+                sketches.merge(run_sketches)
+    return sketches
+
+
+def _print_table(groups, quantiles, label):
+    names = [quantile_label(q) for q in quantiles]
+    print(f"{label:>24s} {'count':>9s} {'mean':>10s} " + " ".join(f"{n:>10s}" for n in names) + f" {'min':>10s} {'max':>10s}")
+    for name, digest in groups.items():
+        s = digest.summary(quantiles)
+        print(f"{str(name):>24s} {s['count']:9d} {s['mean']:10.3f} " + " ".join(f"{s[n]:10.3f}" for n in names)
+              + f" {s['min']:10.3f} {s['max']:10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-run/tag/window t-digest quantile sketches")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="sketch every run under --results-dir in one pass")
+    p_build.add_argument("--results-dir", default="results")
+    p_build.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="steps per window")
+    p_build.add_argument("--compression", type=int, default=DEFAULT_COMPRESSION)
+    p_build.add_argument("--tags", nargs="+", help="only these tags (default: all)")
+    p_build.add_argument("--workers", type=int)
+    p_build.add_argument("--output", default=DEFAULT_OUTPUT)
+
+    p_query = sub.add_parser("query", help="quantiles of a tag merged over runs, windows or families")
+    p_query.add_argument("--sketches", default=DEFAULT_OUTPUT)
+    p_query.add_argument("--tag", required=True)
+    p_query.add_argument("--runs", nargs="+", help="run name patterns (default: all)")
+    p_query.add_argument("--family", action="append", default=[],
+                         help="NAME=PATTERN[,PATTERN...] e.g. drone6=drone6*  (repeatable, implies --by family)")
+    p_query.add_argument("--by", choices=["run", "window", "family", "all"], default="run",
+                         help="'family' without --family groups drone6.10 with drone6")
+    p_query.add_argument("--from-step", type=int)
+    p_query.add_argument("--to-step", type=int)
+    p_query.add_argument("-q", "--quantiles", nargs="+", type=float, default=[q * 100 for q in DEFAULT_QUANTILES],
+                         help="percentiles, e.g. 5 50 95")
+
+    p_tags = sub.add_parser("tags", help="list sketched runs and tags")
+    p_tags.add_argument("--sketches", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        sketches = build(args.results_dir, args.window, args.compression, args.tags, args.workers)
+        sketches.save(args.output)
+        print(f"Sketched {len(sketches.runs())} runs, {len(sketches.tags())} tags, {len(sketches)} windows "
+              f"in {time.perf_counter() - start:.1f}s -> {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+    elif args.command == "query":
+        sketches = SketchSet.load(args.sketches)
+        quantiles = [q / 100 for q in args.quantiles]
+        if args.family:
+            groups = sketches.group(args.tag, 'family', args.runs, args.from_step, args.to_step,
+                                    parse_families(args.family))
+        elif args.by == "all":
+            groups = {'all': sketches.select(args.tag, args.runs, args.from_step, args.to_step)}
+        else:
+            groups = sketches.group(args.tag, args.by, args.runs, args.from_step, args.to_step)
+        if not groups:
+            raise SystemExit(f"No sketches for {args.tag!r} (see: quantile_sketch.py tags)")
+        print(f"{args.tag} (windows of {sketches.window_steps} steps)")
+        _print_table(groups, quantiles, args.by if not args.family else "family")
+    elif args.command == "tags":
+        sketches = SketchSet.load(args.sketches)
+        print(f"{len(sketches.runs())} runs, windows of {sketches.window_steps} steps: {', '.join(sketches.runs())}")
+        for tag in sketches.tags():
+            print(f"  {tag}")
+
+
+if __name__ == "__main__":
+    main()
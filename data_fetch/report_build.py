@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Incremental report build: event files -> CSVs -> summaries -> LaTeX tables
+
+Each stage of the paper pipeline is a node in a dependency graph:
+
+    events:<run> -> csv:<run> -> summary:<run> ----------------> summary_table.tex
+    events:<run> -> test_csv:<run>
+    events:<run> -> ppo:<run> --+
+    baselines ------------------+-> comparison_metrics.json -> comparison_table.tex
+
+A node's key hashes its parameters, the source of the code it runs and the
+content hashes of its inputs. The key and its output hashes are recorded in
+a manifest, so a rebuild only re-runs nodes whose key changed. A node whose
+output comes out byte-identical stops the rebuild from spreading further.
+Input hashes are cached by (size, mtime), so unchanged runs are never re-read.
+Per-run branches run in parallel worker processes.
+
+    python report_build.py --results-dir results --runs drone6.1 drone7.2
+"""
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from tfevents import find_event_files, find_runs
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Same metric selection as fetch_test_data.py
+TEST_METRICS = [
+    'Reward',
+    'Environment/Cumulative Reward',
+    'Environment/Episode Length',
+    'EpisodeLength',
+    'TargetsFound',
+    'PathEfficiency',
+    'AngleStability',
+    'GroundCollision',
+]
+
+# Scripts each stage runs; their key also covers every data_fetch module they
+# import (local_imports) and the stage's own code in this file (stage_source)
+STAGE_CODE = {
+    'csv': ['fetch_data.py'],
+    'test_csv': ['fetch_data.py'],
+    'summary': ['simple_metrics_extraction.py'],
+    'ppo': ['extract_comparison_metrics.py'],
+    'baselines': ['extract_comparison_metrics.py', 'drone_surrogate.py'],
+    'comparison': [],
+    'comparison_table': ['basic_metrics_extraction.py'],
+    'summary_table': ['basic_metrics_extraction.py'],
+}
+
+
+# ---------------------------------------------------------------------------
+# Hashing
+# ---------------------------------------------------------------------------
+
+class HashCache:
+    """sha256 of files, cached by (size, mtime_ns) and persisted between builds"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        self.dirty = False
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        cached = self.entries.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.entries[key] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        self.dirty = True
+        return digest.hexdigest()
+
+    def files_hash(self, paths, base=None):
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            name = os.path.relpath(path, base) if base else os.path.basename(path)
+            digest.update(name.encode())
+            digest.update(self.file_hash(path).encode())
+        return digest.hexdigest()
+
+    def save(self):
+        if self.dirty:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f)
+            self.dirty = False
+
+
+def local_imports(names, directory=SCRIPT_DIR):
+    """The given scripts plus every sibling module they import, transitively (lazy imports included)"""
+    seen = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        with open(os.path.join(directory, name), 'rb') as f:
+            tree = ast.parse(f.read(), filename=name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                candidate = module.split('.')[0] + ".py"
+                if os.path.exists(os.path.join(directory, candidate)):
+                    pending.append(candidate)
+    return sorted(seen)
+
+
+def stage_source(stage, path=os.path.join(SCRIPT_DIR, 'report_build.py')):
+    """Source of a stage function plus the top-level definitions of this file it uses, transitively
+
+    Returns (source, scripts): scripts are the sibling modules those
+    definitions import at module level, e.g. tfevents.py for _behavior_dir.
+    Editing any other part of this file leaves the stage's key unchanged.
+    """
+    with open(path, 'rb') as f:
+        source = f.read().decode()
+    tree = ast.parse(source, filename=path)
+    definitions = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            definitions[node.name] = node
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    definitions[target.id] = node
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            for alias in node.names:
+                definitions[alias.asname or alias.name] = node
+    seen, parts, scripts = set(), [], set()
+    pending = [STAGES[stage].__name__]
+    while pending:
+        name = pending.pop()
+        node = definitions.get(name)
+        if node is None or name in seen:
+            continue
+        seen.add(name)
+        if isinstance(node, ast.ImportFrom):
+            candidate = node.module.split('.')[0] + ".py"
+            if os.path.exists(os.path.join(os.path.dirname(path), candidate)):
+                scripts.add(candidate)
+            continue
+        parts.append(ast.get_source_segment(source, node))
+        pending.extend(child.id for child in ast.walk(node) if isinstance(child, ast.Name))
+    return "\n\n".join(sorted(set(parts))), sorted(scripts)
+
+
+def _hash_json(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Stage implementations (run in worker processes; write outputs, return nothing)
+# ---------------------------------------------------------------------------
+
+def _json_ready(value):
+    if isinstance(value, dict):
+        return {str(k): _json_ready(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_ready(v) for v in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def _write_json(path, value):
+    with open(path, 'w') as f:
+        json.dump(_json_ready(value), f, indent=2)
+
+
+def _behavior_dir(results_dir, run_id):
+    return os.path.dirname(find_event_files(os.path.join(results_dir, run_id))[0])
+
+
+def stage_csv(params, inputs, outputs):
+    from fetch_data import align_metrics, load_events
+    ea = load_events(_behavior_dir(params['results_dir'], params['run']))
+    align_metrics(ea).to_csv(outputs[0], index=False)
+
+
+def stage_test_csv(params, inputs, outputs):
+    from fetch_data import align_metrics, load_events
+    ea = load_events(_behavior_dir(params['results_dir'], params['run']))
+    available = [tag for tag in ea.Tags()['scalars'] if tag in TEST_METRICS]
+    align_metrics(ea, available).to_csv(outputs[0], index=False)
+
+
+def stage_summary(params, inputs, outputs):
+    from simple_metrics_extraction import analyze_drone_performance
+    _write_json(outputs[0], analyze_drone_performance(inputs['csv'][0][0]) or {})
+
+
+def stage_ppo(params, inputs, outputs):
+    from extract_comparison_metrics import MetricExtractor
+    extractor = MetricExtractor(results_dir=params['results_dir'])
+    _write_json(outputs[0], extractor.calculate_policy_performance(params['run'], "PPO"))
+
+
+def stage_baselines(params, inputs, outputs):
+    from extract_comparison_metrics import MetricExtractor
+    extractor = MetricExtractor(baseline_episodes=params['episodes'])
+    _write_json(outputs[0], {
+        'Random': extractor.calculate_policy_performance(None, "Random"),
+        'Heuristic': extractor.calculate_policy_performance(None, "Heuristic"),
+    })
+
+
+def stage_comparison(params, inputs, outputs):
+    with open(inputs['baselines'][0][0], 'r') as f:
+        policies = json.load(f)
+    for run_id, paths in zip(params['runs'], inputs['ppo']):
+        with open(paths[0], 'r') as f:
+            name = "PPO (Ours)" if run_id == params['primary'] else f"PPO ({run_id})"
+            policies[name] = json.load(f)
+    _write_json(outputs[0], policies)
+
+
+def stage_comparison_table(params, inputs, outputs):
+    from basic_metrics_extraction import format_comparison_table
+    with open(inputs['comparison'][0][0], 'r') as f:
+        policies = json.load(f)
+    with open(outputs[0], 'w') as f:
+        f.write(format_comparison_table(policies))
+
+
+def stage_summary_table(params, inputs, outputs):
+    from basic_metrics_extraction import format_comparison_table
+    summaries = {}
+    for run_id, paths in zip(params['runs'], inputs['summary']):
+        with open(paths[0], 'r') as f:
+            summaries[run_id] = json.load(f)
+    with open(outputs[0], 'w') as f:
+        f.write(format_comparison_table(
+            summaries,
+            caption="Final training performance per run (last 20\\% of training, mean $\\pm$ std)",
+            label="tab:runs", name_header="Run",
+            reward_key='CumulativeReward', reward_header="Cum. Reward",
+            collision_key='CollisionRate', highlight=None))
+
+
+STAGES = {
+    'csv': stage_csv,
+    'test_csv': stage_test_csv,
+    'summary': stage_summary,
+    'ppo': stage_ppo,
+    'baselines': stage_baselines,
+    'comparison': stage_comparison,
+    'comparison_table': stage_comparison_table,
+    'summary_table': stage_summary_table,
+}
+
+
+def run_stage(stage, params, inputs, outputs, log_path):
+    """Worker entry point: run one stage with its chatter captured in a log file"""
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log):
+        STAGES[stage](params, inputs, outputs)
+    return time.perf_counter() - start
+
+
+# ---------------------------------------------------------------------------
+# Graph
+# ---------------------------------------------------------------------------
+
+class Node:
+    def __init__(self, name, stage, outputs, deps=(), params=None, dep_roles=None):
+        self.name = name
+        self.stage = stage
+        self.outputs = outputs
+        self.deps = list(deps)
+        self.params = params or {}
+        # role -> list of dependency names, handed to the stage as role -> list of output lists
+        self.dep_roles = dep_roles or {}
+
+
+def build_graph(results_dir, run_ids, build_dir, primary, baseline_episodes):
+    nodes = {}
+
+    def add(node):
+        nodes[node.name] = node
+
+    for run_id in run_ids:
+        run_dir = os.path.join(build_dir, run_id)
+        params = {'results_dir': results_dir, 'run': run_id}
+        events = f"events:{run_id}"
+        add(Node(events, 'source', find_event_files(os.path.join(results_dir, run_id)), params=params))
+        add(Node(f"csv:{run_id}", 'csv', [os.path.join(run_dir, "training_data.csv")], [events], params))
+        add(Node(f"test_csv:{run_id}", 'test_csv', [os.path.join(run_dir, "test_data.csv")], [events], params))
+        add(Node(f"summary:{run_id}", 'summary', [os.path.join(run_dir, "summary.json")], [f"csv:{run_id}"],
+                 params, {'csv': [f"csv:{run_id}"]}))
+        add(Node(f"ppo:{run_id}", 'ppo', [os.path.join(run_dir, "ppo_metrics.json")], [events], params))
+
+    add(Node("baselines", 'baselines', [os.path.join(build_dir, "baselines.json")],
+             params={'episodes': baseline_episodes}))
+    ppo = [f"ppo:{r}" for r in run_ids]
+    add(Node("comparison", 'comparison', [os.path.join(build_dir, "comparison_metrics.json")], ["baselines"] + ppo,
+             {'runs': run_ids, 'primary': primary}, {'baselines': ["baselines"], 'ppo': ppo}))
+    add(Node("comparison_table", 'comparison_table', [os.path.join(build_dir, "comparison_table.tex")],
+             ["comparison"], dep_roles={'comparison': ["comparison"]}))
+    summaries = [f"summary:{r}" for r in run_ids]
+    add(Node("summary_table", 'summary_table', [os.path.join(build_dir, "summary_table.tex")], summaries,
+             {'runs': run_ids}, {'summary': summaries}))
+    return nodes
+
+
+class Builder:
+    def __init__(self, build_dir, workers=None, force=False):
+        self.build_dir = build_dir
+        self.manifest_dir = os.path.join(build_dir, ".manifests")
+        self.log_dir = os.path.join(build_dir, ".logs")
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.hashes = HashCache(os.path.join(build_dir, ".hash_cache.json"))
+        self.workers = workers
+        self.force = force
+        self.code_hashes = {}
+
+    def _manifest_path(self, name):
+        return os.path.join(self.manifest_dir, name.replace(':', '__').replace(os.sep, '_') + ".json")
+
+    def _load_manifest(self, name):
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _code_hash(self, stage):
+        if stage not in self.code_hashes:
+            source, scripts = stage_source(stage)
+            names = local_imports(STAGE_CODE.get(stage, []) + scripts)
+            self.code_hashes[stage] = _hash_json({
+                'stage': source,
+                'scripts': self.hashes.files_hash([os.path.join(SCRIPT_DIR, name) for name in names]),
+            })
+        return self.code_hashes[stage]
+
+    def _output_hash(self, node):
+        return self.hashes.files_hash(node.outputs, base=self.build_dir if node.stage != 'source' else None)
+
+    def node_key(self, node, output_hashes):
+        return _hash_json({
+            'stage': node.stage,
+            'params': node.params,
+            'code': self._code_hash(node.stage),
+            'inputs': {dep: output_hashes[dep] for dep in node.deps},
+        })
+
+    def up_to_date(self, node, key):
+        if self.force:
+            return False
+        manifest = self._load_manifest(node.name)
+        if not manifest or manifest['key'] != key:
+            return False
+        if not all(os.path.exists(p) for p in node.outputs):
+            return False
+        return manifest['output_hash'] == self._output_hash(node)
+
+    def build(self, nodes):
+        """Run every stale node; returns {name: 'built'|'fresh'|'source'|'failed'}"""
+        status = {}
+        output_hashes = {}
+        pending = dict(nodes)
+        running = {}
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while pending or running:
+                progressed = False
+                for name, node in list(pending.items()):
+                    if any(dep not in status for dep in node.deps):
+                        continue
+                    if any(status.get(dep) == 'failed' for dep in node.deps):
+                        status[name] = 'failed'
+                        del pending[name]
+                        progressed = True
+                        continue
+                    del pending[name]
+                    progressed = True
+                    if node.stage == 'source':
+                        output_hashes[name] = self._output_hash(node)
+                        status[name] = 'source'
+                        continue
+                    key = self.node_key(node, output_hashes)
+                    if self.up_to_date(node, key):
+                        output_hashes[name] = self._load_manifest(name)['output_hash']
+                        status[name] = 'fresh'
+                        continue
+                    for path in node.outputs:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                    inputs = {role: [nodes[d].outputs for d in deps] for role, deps in node.dep_roles.items()}
+                    log_path = os.path.join(self.log_dir, os.path.basename(self._manifest_path(name))[:-5] + ".log")
+                    future = executor.submit(run_stage, node.stage, node.params, inputs, node.outputs, log_path)
+                    running[future] = (name, key, log_path)
+
+                if running and not progressed:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, key, log_path = running.pop(future)
+                        node = nodes[name]
+                        try:
+                            elapsed = future.result()
+                        except Exception as exc:
+                            status[name] = 'failed'
+                            print(f"  FAILED {name}: {exc!r} (log: {log_path})")
+                            continue
+                        output_hashes[name] = self._output_hash(node)
+                        with open(self._manifest_path(name), 'w') as f:
+                            json.dump({'key': key, 'output_hash': output_hashes[name], 'outputs': node.outputs,
+                                       'seconds': elapsed, 'built_at': time.time()}, f, indent=2)
+                        status[name] = 'built'
+                        print(f"  built {name:28s} {elapsed:6.2f}s")
+                elif not running and not progressed and pending:
+                    raise RuntimeError(f"Dependency cycle or missing node among: {sorted(pending)}")
+        finally:
+            executor.shutdown()
+            self.hashes.save()
+        return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally rebuild CSVs, summaries and LaTeX tables")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--runs", nargs="+", help="runs to include (default: all with event files)")
+    parser.add_argument("--primary", help="run reported as 'PPO (Ours)' (default: first run)")
+    parser.add_argument("--build-dir", default="build")
+    parser.add_argument("--baseline-episodes", type=int, default=1000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--force", action="store_true", help="rebuild every node")
+    args = parser.parse_args()
+
+    available = find_runs(args.results_dir)
+    run_ids = [r for r in (args.runs or sorted(available)) if r in available]
+    missing = sorted(set(args.runs or []) - set(run_ids))
+    if missing:
+        print(f"Skipping runs without event files: {', '.join(missing)}")
+    if not run_ids:
+        print("No runs to build")
+        return
+    primary = args.primary or run_ids[0]
+
+    start = time.perf_counter()
+    nodes = build_graph(args.results_dir, run_ids, args.build_dir, primary, args.baseline_episodes)
+    status = Builder(args.build_dir, args.workers, args.force).build(nodes)
+
+    counts = {}
+    for s in status.values():
+        counts[s] = counts.get(s, 0) + 1
+    print(f"\n{counts.get('built', 0)} built, {counts.get('fresh', 0)} up to date, "
+          f"{counts.get('failed', 0)} failed in {time.perf_counter() - start:.1f}s")
+    for name in ("comparison_table", "summary_table"):
+        if status.get(name) in ('built', 'fresh'):
+            print(f"  {nodes[name].outputs[0]}")
+    if counts.get('failed'):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
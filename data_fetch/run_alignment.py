@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Cross-run step-grid alignment with mean/CI bands across run families
+
+Resamples any metric from many runs onto a common step grid with one
+vectorized interpolation (runs x steps array per tag, tags stacked), then
+computes mean, median, quantile and confidence bands in single array
+operations. Families are defined from run-name patterns or from a value in
+each run's configuration.yaml.
+"""
+
+import argparse
+import fnmatch
+import json
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from run_config import get_config_value, load_run_config
+from tfevents import find_runs, load_scalars
+
+DEFAULT_TAGS = [
+    'Environment/Cumulative Reward',
+    'Environment/Episode Length',
+    'Policy/Entropy',
+    'Losses/Policy Loss',
+    'Losses/Value Loss',
+]
+
+
+def make_grid(series_list, n_points=1000, span="union"):
+    """Evenly spaced step grid covering the union (or intersection) of the series' step ranges"""
+    firsts = [s[0][0] for s in series_list if len(s[0])]
+    lasts = [s[0][-1] for s in series_list if len(s[0])]
+    if not firsts:
+        return np.array([], dtype=np.float64)
+    if span == "intersection":
+        start, end = max(firsts), min(lasts)
+    else:
+        start, end = min(firsts), max(lasts)
+    if end < start:
+        return np.array([], dtype=np.float64)
+    return np.linspace(start, end, n_points)
+
+
+def resample(series_list, grid, method="linear"):
+    """Interpolate many (steps, values) series onto one grid in a single searchsorted
+
+    Returns a len(series_list) x len(grid) array; grid points outside a
+    series' logged range are NaN. method='previous' holds the last logged
+    value instead of interpolating (for step-like tags such as lesson numbers).
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    n_series = len(series_list)
+    out = np.full((n_series, len(grid)), np.nan)
+    lengths = np.array([len(s[0]) for s in series_list], dtype=np.int64)
+    if n_series == 0 or len(grid) == 0 or lengths.sum() == 0:
+        return out
+
+    steps = np.concatenate([np.asarray(s[0], dtype=np.float64) for s in series_list])
+    values = np.concatenate([np.asarray(s[1], dtype=np.float64) for s in series_list])
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    # Give every series its own disjoint key range so one sorted array holds them all
+    base = min(steps.min(), grid.min())
+    span = max(steps.max(), grid.max()) - base + 1.0
+    keys = np.repeat(np.arange(n_series), lengths) * span + (steps - base)
+    rows = np.repeat(np.arange(n_series), len(grid))
+    query = rows * span + np.tile(grid - base, n_series)
+
+    right = np.searchsorted(keys, query, side='right')
+    left = right - 1
+    lo = offsets[rows]
+    hi = offsets[rows + 1]
+    has_left = left >= lo
+    has_right = right < hi
+    left_c = np.clip(left, 0, len(keys) - 1)
+    right_c = np.clip(right, 0, len(keys) - 1)
+    exact = has_left & (keys[left_c] == query)
+
+    if method == "previous":
+        result = np.where(has_left & (has_right | exact), values[left_c], np.nan)
+    else:
+        gap = keys[right_c] - keys[left_c]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(gap > 0, (query - keys[left_c]) / gap, 0.0)
+        interpolated = values[left_c] + t * (values[right_c] - values[left_c])
+        result = np.where(exact, values[left_c], np.where(has_left & has_right, interpolated, np.nan))
+
+    out[:] = result.reshape(n_series, len(grid))
+    return out
+
+
+def nan_quantiles(matrix, quantiles, axis=-2):
+    """Linear-interpolated quantiles ignoring NaN, via one sort (np.nanquantile loops per column)"""
+    ordered = np.sort(np.moveaxis(matrix, axis, -1), axis=-1)   # NaNs sort to the end
+    count = np.sum(~np.isnan(ordered), axis=-1, keepdims=True)
+    last = np.maximum(count - 1, 0)
+    result = []
+    for q in quantiles:
+        position = last * q
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, last)
+        frac = position - below
+        low = np.take_along_axis(ordered, below, axis=-1)
+        high = np.take_along_axis(ordered, above, axis=-1)
+        band = (low + (high - low) * frac)[..., 0]
+        result.append(np.where(count[..., 0] > 0, band, np.nan))
+    return np.stack(result)
+
+
+def band_stats(matrix, quantiles=(0.05, 0.25, 0.75, 0.95), confidence=0.95, axis=-2):
+    """Mean/median/std/quantile/CI bands across runs (axis) for a runs x steps array (tags may be stacked in front)"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    count = np.sum(~np.isnan(matrix), axis=axis)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(matrix, axis=axis)
+        std = np.nanstd(matrix, axis=axis, ddof=1) if matrix.shape[axis] > 1 else np.full_like(mean, np.nan)
+    # A single run has no spread: std and CI stay NaN rather than a zero-width band
+    std = np.where(count >= 2, std, np.nan)
+    qs = nan_quantiles(matrix, [0.5, *quantiles], axis=axis)
+    half_width = z * std / np.sqrt(np.maximum(count, 1))
+    stats = {
+        'count': count,
+        'mean': mean,
+        'median': qs[0],
+        'std': std,
+        'ci_low': mean - half_width,
+        'ci_high': mean + half_width,
+    }
+    for q, band in zip(quantiles, qs[1:]):
+        stats[f'q{int(round(q * 100)):02d}'] = band
+    return stats
+
+
+def default_family(run_id):
+    """drone6.10 -> drone6; names without a numeric suffix are their own family"""
+    return re.sub(r'\.\d+$', '', run_id)
+
+
+def parse_families(specs):
+    """{family: [patterns]} from NAME=PATTERN[,PATTERN...] specs; a bare NAME matches itself"""
+    families = {}
+    for spec in specs:
+        name, _, pattern = spec.partition('=')
+        families[name] = (pattern or name).split(',')
+    return families
+
+
+def group_by_patterns(run_ids, patterns):
+    """{family: [runs]} from {family: 'drone6*'} or {family: ['drone7.1', 'drone7.2']}"""
+    groups = {}
+    for family, family_patterns in patterns.items():
+        if isinstance(family_patterns, str):
+            family_patterns = [family_patterns]
+        groups[family] = [run_id for run_id in run_ids
+                          if any(fnmatch.fnmatchcase(run_id, p) for p in family_patterns)]
+    return {family: runs for family, runs in groups.items() if runs}
+
+
+def group_by_config(run_dirs, dotted_key):
+    """{'<key>=<value>': [runs]} grouping runs by one configuration.yaml value"""
+    groups = {}
+    for run_id, run_dir in run_dirs.items():
+        value = get_config_value(load_run_config(run_dir), dotted_key)
+        groups.setdefault(f"{dotted_key}={value}", []).append(run_id)
+    return groups
+
+
+def load_runs(run_dirs, tags, workers=None):
+    """{run_id: {tag: ScalarSeries}} read in parallel across processes"""
+    run_ids = list(run_dirs)
+    if workers == 1 or len(run_ids) <= 1:
+        loaded = [load_scalars(run_dirs[r], tags) for r in run_ids]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(load_scalars, [run_dirs[r] for r in run_ids], [tags] * len(run_ids)))
+    return dict(zip(run_ids, loaded))
+
+
+def aggregate_family(run_series, run_ids, tags, n_points=1000, span="union", step_tags=()):
+    """Resample every (tag, run) pair of one family onto a shared grid and compute bands"""
+    empty = (np.array([], dtype=np.int64), np.array([]))
+    pairs = [(run_series[r].get(tag) or empty) for tag in tags for r in run_ids]
+    series_list = [(p[0], p[-1]) for p in pairs]
+    grid = make_grid(series_list, n_points, span)
+
+    matrix = np.empty((len(tags), len(run_ids), len(grid)))
+    linear = [i for i, tag in enumerate(tags) if tag not in step_tags]
+    held = [i for i, tag in enumerate(tags) if tag in step_tags]
+    n_runs = len(run_ids)
+    for indices, method in ((linear, "linear"), (held, "previous")):
+        if indices:
+            subset = [series_list[i * n_runs + j] for i in indices for j in range(n_runs)]
+            matrix[indices] = resample(subset, grid, method).reshape(len(indices), n_runs, len(grid))
+
+    stats = band_stats(matrix)
+    return {
+        'runs': list(run_ids),
+        'steps': grid,
+        'matrix': matrix,
+        'tags': {tag: {name: band[i] for name, band in stats.items()} for i, tag in enumerate(tags)},
+    }
+
+
+def aggregate_families(results_dir, groups, tags=None, n_points=1000, span="union", workers=None):
+    """Load every run referenced by groups once and aggregate each family"""
+    tags = tags or DEFAULT_TAGS
+    all_runs = find_runs(results_dir)
+    needed = {r: all_runs[r] for runs in groups.values() for r in runs if r in all_runs}
+    run_series = load_runs(needed, tags, workers)
+    step_tags = {tag for tag in tags if tag.startswith('Environment/Lesson Number/')}
+    return {
+        family: aggregate_family(run_series, [r for r in runs if r in run_series], tags, n_points, span, step_tags)
+        for family, runs in groups.items()
+    }
+
+
+def _to_json(families):
+    out = {}
+    for family, result in families.items():
+        out[family] = {
+            'runs': result['runs'],
+            'steps': result['steps'].tolist(),
+            'tags': {
+                tag: {name: [None if np.isnan(v) else float(v) for v in band] for name, band in stats.items()}
+                for tag, stats in result['tags'].items()
+            },
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Align run families on a common step grid and compute bands")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--family", action="append", default=[],
+                        help="NAME=PATTERN[,PATTERN...] e.g. drone6=drone6*  (repeatable)")
+    parser.add_argument("--group-by-config", help="dotted configuration.yaml key, e.g. behaviors.*.network_settings.hidden_units")
+    parser.add_argument("--tags", nargs="+", default=DEFAULT_TAGS)
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--span", choices=["union", "intersection"], default="union")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", default="family_bands.json")
+    args = parser.parse_args()
+
+    run_dirs = find_runs(args.results_dir)
+    if args.group_by_config:
+        groups = group_by_config(run_dirs, args.group_by_config)
+    elif args.family:
+        groups = group_by_patterns(run_dirs, parse_families(args.family))
+    else:
+        groups = {'all': list(run_dirs)}
+
+    families = aggregate_families(args.results_dir, groups, args.tags, args.points, args.span, args.workers)
+
+    for family, result in families.items():
+        print(f"\n{family} ({len(result['runs'])} runs: {', '.join(result['runs'])})")
+        for tag, stats in result['tags'].items():
+            final = np.flatnonzero(stats['count'] > 0)
+            if len(final) == 0:
+                print(f"  {tag:35s}: no data")
+                continue
+            i = final[-1]
+            ci = (f"95% CI [{stats['ci_low'][i]:.3f}, {stats['ci_high'][i]:.3f}]"
+                  if stats['count'][i] >= 2 else "95% CI n/a")
+            print(f"  {tag:35s}: final mean {stats['mean'][i]:9.3f}  {ci}  n={stats['count'][i]}")
+
+    with open(args.output, "w") as f:
+        json.dump(_to_json(families), f)
+    print(f"\nSaved bands to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Helpers for results/<run>/configuration.yaml
+
+Loading, flattening to dotted keys and looking up values with a '*'
+wildcard for the behavior name (MyAgent vs DroneAgent across runs).
+"""
+
+import os
+
+import yaml
+
+
+def load_run_config(run_dir):
+    """Parsed configuration.yaml for a run, or None if it is missing"""
+    path = os.path.join(run_dir, "configuration.yaml")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def flatten_config(config, prefix=""):
+    """Flatten nested dicts into {'a.b.c': value}; lists are kept as values"""
+    flat = {}
+    for key, value in (config or {}).items():
+        dotted = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            nested = flatten_config(value, dotted)
+            if nested:
+                flat.update(nested)
+            else:
+                flat[dotted] = None
+        else:
+            flat[dotted] = value
+    return flat
+
+
+def get_config_value(config, dotted_key, default=None):
+    """Look up 'behaviors.*.network_settings.hidden_units'; '*' matches the first key that resolves"""
+    def resolve(node, parts):
+        if not parts:
+            return node
+        if not isinstance(node, dict):
+            return default
+        head, rest = parts[0], parts[1:]
+        if head == '*':
+            for child in node.values():
+                found = resolve(child, rest)
+                if found is not default:
+                    return found
+            return default
+        if head not in node:
+            return default
+        return resolve(node[head], rest)
+
+    return resolve(config or {}, dotted_key.split('.'))
+
+
+def behavior_names(config):
+    return list(((config or {}).get('behaviors') or {}).keys())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Sample-efficiency leaderboard
+
+For every run and performance tag computes steps-to-threshold and
+wall_time-to-threshold, normalized area under the curve and best-so-far
+curves. All runs of a tag are concatenated into one array and processed
+with segmented cumulative-max, searchsorted and bincount, no per-point loops.
+Results are ranked and written next to comparison_metrics.json.
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from tfevents import find_runs, load_scalars
+
+PERFORMANCE_TAGS = [
+    'Environment/Cumulative Reward',
+    'Reward',
+    'TargetsFound',
+    'PathEfficiency',
+    'AngleStability',
+    'GroundCollision',
+]
+
+# Tags where smaller is better
+LOWER_IS_BETTER = {'GroundCollision', 'Environment/Episode Length', 'EpisodeLength', 'CompletionTime'}
+
+# A wall-clock gap this many times the median summary interval is treated as downtime (resume)
+DOWNTIME_FACTOR = 10.0
+
+
+def _segments(series_list):
+    lengths = np.array([len(s.steps) for s in series_list], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    seg_ids = np.repeat(np.arange(len(series_list)), lengths)
+    return lengths, offsets, seg_ids
+
+
+def active_wall_time(wall_times, seg_ids, offsets):
+    """Elapsed wall time per point from its run's first point, with resume downtime removed"""
+    diffs = np.diff(wall_times, prepend=wall_times[:1])
+    diffs[offsets[:-1][offsets[:-1] < len(diffs)]] = 0.0
+    median = np.median(diffs[diffs > 0]) if np.any(diffs > 0) else 0.0
+    if median > 0:
+        diffs = np.where(diffs > DOWNTIME_FACTOR * median, median, diffs)
+    elapsed = np.cumsum(diffs)
+    starts = np.repeat(elapsed[offsets[:-1]], np.diff(offsets))
+    return elapsed - starts
+
+
+def best_so_far(values, seg_ids, direction=1.0):
+    """Segmented running best: per-run cumulative max (or min) in one np.maximum.accumulate"""
+    oriented = values * direction
+    finite = np.where(np.isfinite(oriented), oriented, -np.inf)
+    lo = np.min(finite[np.isfinite(finite)]) if np.any(np.isfinite(finite)) else 0.0
+    hi = np.max(finite[np.isfinite(finite)]) if np.any(np.isfinite(finite)) else 0.0
+    # Lift each run above every earlier run so the accumulate restarts at run boundaries
+    lift = (hi - lo + 1.0) * seg_ids
+    best = np.maximum.accumulate(np.maximum(finite, lo - 1.0) - lo + lift) - lift + lo
+    return best, lo, hi, lift
+
+
+def tag_efficiency(series_by_run, tag, threshold=None, relative=0.8, horizon=None):
+    """Per-run efficiency metrics for one tag; all runs processed as one concatenated array"""
+    run_ids = [r for r, s in series_by_run.items() if tag in s and len(s[tag].steps)]
+    if not run_ids:
+        return {}
+    series_list = [series_by_run[r][tag] for r in run_ids]
+    if horizon is not None:
+        series_list = [s._replace(steps=s.steps[s.steps <= horizon], wall_times=s.wall_times[s.steps <= horizon],
+                                  values=s.values[s.steps <= horizon]) for s in series_list]
+        keep = [i for i, s in enumerate(series_list) if len(s.steps)]
+        run_ids = [run_ids[i] for i in keep]
+        series_list = [series_list[i] for i in keep]
+        if not run_ids:
+            return {}
+
+    direction = -1.0 if tag in LOWER_IS_BETTER else 1.0
+    _, offsets, seg_ids = _segments(series_list)
+    steps = np.concatenate([s.steps for s in series_list]).astype(np.float64)
+    values = np.concatenate([s.values for s in series_list])
+    wall = active_wall_time(np.concatenate([s.wall_times for s in series_list]), seg_ids, offsets)
+
+    best, lo, hi, lift = best_so_far(values, seg_ids, direction)
+    # Reference range: typical starting value to the best value any run reached. The median start
+    # keeps one early outlier (e.g. a -500 first episode) from stretching the scale.
+    oriented = values * direction
+    start_ref = float(np.nanmedian(oriented[offsets[:-1]]))
+    best_ref = float(np.max(best[offsets[1:] - 1]))
+    if threshold is None:
+        oriented_threshold = start_ref + relative * (best_ref - start_ref)
+        threshold = oriented_threshold * direction
+    else:
+        oriented_threshold = threshold * direction
+
+    # best + lift is globally non-decreasing, so one searchsorted finds every run's first crossing
+    n_runs = len(run_ids)
+    queries = oriented_threshold - lo + (hi - lo + 1.0) * np.arange(n_runs)
+    hit = np.searchsorted(best - lo + lift, queries, side='left')
+    # A threshold more than 1 below the data would otherwise land in the previous run's range
+    hit = np.maximum(hit, offsets[:-1])
+    reached = hit < offsets[1:]
+    hit_c = np.minimum(hit, len(steps) - 1)
+
+    # Normalized AUC: trapezoid area per run over its own step span, scaled to [0, 1] by the reference range
+    if best_ref > start_ref:
+        norm = np.clip((oriented - start_ref) / (best_ref - start_ref), 0.0, 1.0)
+    else:
+        norm = np.zeros_like(oriented)
+    seg_area = (norm[1:] + norm[:-1]) * 0.5 * np.diff(steps)
+    same_run = seg_ids[1:] == seg_ids[:-1]
+    area = np.bincount(seg_ids[1:][same_run], weights=seg_area[same_run], minlength=n_runs)
+    span = steps[offsets[1:] - 1] - steps[offsets[:-1]]
+    auc = np.where(span > 0, area / np.where(span > 0, span, 1.0), norm[offsets[:-1]])
+
+    results = {}
+    for i, run_id in enumerate(run_ids):
+        last = offsets[i + 1] - 1
+        results[run_id] = {
+            'threshold': float(threshold),
+            'reached': bool(reached[i]),
+            'steps_to_threshold': int(steps[hit_c[i]]) if reached[i] else None,
+            'wall_time_to_threshold': float(wall[hit_c[i]]) if reached[i] else None,
+            'normalized_auc': float(auc[i]),
+            'best': float(best[last] * direction),
+            'final': float(values[last]),
+            'total_steps': int(steps[last]),
+        }
+    return results
+
+
+def best_so_far_curves(series_by_run, tag):
+    """{run_id: (steps, best_so_far)} for plotting"""
+    run_ids = [r for r, s in series_by_run.items() if tag in s and len(s[tag].steps)]
+    if not run_ids:
+        return {}
+    series_list = [series_by_run[r][tag] for r in run_ids]
+    _, offsets, seg_ids = _segments(series_list)
+    direction = -1.0 if tag in LOWER_IS_BETTER else 1.0
+    best = best_so_far(np.concatenate([s.values for s in series_list]), seg_ids, direction)[0] * direction
+    return {r: (series_list[i].steps, best[offsets[i]:offsets[i + 1]]) for i, r in enumerate(run_ids)}
+
+
+def leaderboard(efficiency):
+    """Rank runs per tag (fewest steps to threshold, then highest AUC) and overall by mean rank"""
+    per_tag = {}
+    ranks = {}
+    for tag, runs in efficiency.items():
+        ordered = sorted(runs.items(), key=lambda item: (
+            not item[1]['reached'],
+            item[1]['steps_to_threshold'] if item[1]['reached'] else 0,
+            -item[1]['normalized_auc'],
+        ))
+        per_tag[tag] = [run_id for run_id, _ in ordered]
+        for rank, (run_id, _) in enumerate(ordered, 1):
+            ranks.setdefault(run_id, []).append(rank)
+    overall = sorted(ranks, key=lambda r: (np.mean(ranks[r]), -len(ranks[r])))
+    return {
+        'overall': [{'run': r, 'mean_rank': float(np.mean(ranks[r])), 'tags_ranked': len(ranks[r])} for r in overall],
+        'per_tag': per_tag,
+    }
+
+
+def compute(results_dir="results", tags=None, thresholds=None, relative=0.8, horizon=None, run_ids=None):
+    tags = tags or PERFORMANCE_TAGS
+    thresholds = thresholds or {}
+    runs = find_runs(results_dir)
+    if run_ids:
+        runs = {r: d for r, d in runs.items() if r in run_ids}
+    series_by_run = {run_id: load_scalars(run_dir, tags) for run_id, run_dir in runs.items()}
+    efficiency = {
+        tag: tag_efficiency(series_by_run, tag, thresholds.get(tag), relative, horizon)
+        for tag in tags
+    }
+    efficiency = {tag: runs for tag, runs in efficiency.items() if runs}
+    return {'efficiency': efficiency, 'leaderboard': leaderboard(efficiency)}, series_by_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Steps/wall-time to threshold and AUC leaderboard")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--runs", nargs="+", help="restrict to these run ids")
+    parser.add_argument("--tags", nargs="+", default=PERFORMANCE_TAGS)
+    parser.add_argument("--threshold", action="append", default=[], help="TAG=VALUE absolute threshold (repeatable)")
+    parser.add_argument("--relative", type=float, default=0.8,
+                        help="threshold for tags without an absolute one, as a fraction of the median-start-to-best range")
+    parser.add_argument("--horizon", type=int, help="only consider steps up to this value")
+    parser.add_argument("--curves", action="store_true", help="include best-so-far curves in the JSON")
+    parser.add_argument("--output", default="sample_efficiency.json")
+    args = parser.parse_args()
+
+    thresholds = {}
+    for spec in args.threshold:
+        tag, _, value = spec.rpartition('=')
+        thresholds[tag] = float(value)
+
+    report, series_by_run = compute(args.results_dir, args.tags, thresholds, args.relative, args.horizon, args.runs)
+
+    print("=" * 60)
+    print("SAMPLE EFFICIENCY LEADERBOARD")
+    print("=" * 60)
+    for i, entry in enumerate(report['leaderboard']['overall'], 1):
+        print(f"{i:2d}. {entry['run']:12s} mean rank {entry['mean_rank']:5.2f} over {entry['tags_ranked']} tags")
+
+    for tag, ranking in report['leaderboard']['per_tag'].items():
+        threshold = next(iter(report['efficiency'][tag].values()))['threshold']
+        print(f"\n{tag} (threshold {threshold:.3f})")
+        for run_id in ranking:
+            stats = report['efficiency'][tag][run_id]
+            if stats['reached']:
+                reach = f"{stats['steps_to_threshold']:>10d} steps  {stats['wall_time_to_threshold'] / 3600:6.2f} h"
+            else:
+                reach = f"{'not reached':>27s}"
+            print(f"  {run_id:12s} {reach}  AUC {stats['normalized_auc']:.3f}  best {stats['best']:.3f}")
+
+    if args.curves:
+        report['best_so_far'] = {
+            tag: {r: {'steps': s.tolist(), 'best': b.tolist()} for r, (s, b) in best_so_far_curves(series_by_run, tag).items()}
+            for tag in report['efficiency']
+        }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nLeaderboard saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
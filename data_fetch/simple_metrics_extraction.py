@@ -7,6 +7,10 @@ import pandas as pd
 import numpy as np
 import os
 
+from drone_surrogate import measure_baselines
+from stage_timers import hierarchical_timer, timed
+
+@timed
 def extract_from_csv(csv_file):
     """Extract metrics from your existing CSV files"""
     print(f"Reading data from: {csv_file}")
@@ -15,12 +19,15 @@ def extract_from_csv(csv_file):
         print(f"File {csv_file} not found!")
         return None
     
-    df = pd.read_csv(csv_file)
+    with hierarchical_timer("read_csv") as timer:
+        df = pd.read_csv(csv_file)
+        timer.add(rows=len(df), nbytes=os.path.getsize(csv_file))
     print(f"Loaded {len(df)} rows of data")
     print(f"Columns: {list(df.columns)}")
     
     return df
 
+@timed
 def analyze_drone_performance(training_csv, test_csv=None):
     """Analyze performance from your drone CSV files"""
     
@@ -77,8 +84,9 @@ def analyze_drone_performance(training_csv, test_csv=None):
     
     return results
 
+@timed
 def generate_comparison_table():
-    """Generate the comparison table with actual data and estimates"""
+    """Generate the comparison table with actual data and measured baselines"""
     
     print("=" * 60)
     print("QUANTITATIVE COMPARISON TABLE GENERATION")
@@ -94,22 +102,13 @@ def generate_comparison_table():
         if test_results:
             ppo_results = test_results  # Use test results if available
     
-    # Define baseline estimates (you can adjust these based on your knowledge)
-    random_policy = {
-        'Reward': {'mean': -45, 'std': 15},
-        'TargetsFound': {'mean': 0.2, 'std': 0.4}, 
-        'PathEfficiency': {'mean': 0.05, 'std': 0.03},
-        'AngleStability': {'mean': 0.1, 'std': 0.05},
-        'CollisionRate': {'mean': 0.92, 'std': 0.1}
-    }
-    
-    heuristic_policy = {
-        'Reward': {'mean': 25, 'std': 30},
-        'TargetsFound': {'mean': 1.8, 'std': 1.1},
-        'PathEfficiency': {'mean': 0.35, 'std': 0.20}, 
-        'AngleStability': {'mean': 0.6, 'std': 0.2},
-        'CollisionRate': {'mean': 0.28, 'std': 0.15}
-    }
+    # Baselines measured on the vectorized surrogate environment
+    with hierarchical_timer("measure_baselines"):
+        baselines = measure_baselines()
+    for metrics in baselines.values():
+        metrics['CollisionRate'] = metrics['GroundCollision']
+    random_policy = baselines['Random']
+    heuristic_policy = baselines['Heuristic']
     
     print("\n" + "=" * 60)
     print("LATEX TABLE FORMAT")
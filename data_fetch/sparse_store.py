@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Sparse long-format metric store with lazy as-of joins
+
+align_metrics in fetch_data.py densifies every tag onto the union of all
+steps and forward fills, so Losses/* (per update) and environment stats
+(per summary_freq) are each materialized at the other's resolution. Here
+each tag keeps only its own points: steps delta-encoded into the narrowest
+unsigned dtype, values as float32. The store is an uncompressed .npz, so
+np.load reads only the arrays a query touches. Joining onto a common step
+axis is an as-of join done at query time, for just the requested tags and
+step range; on the union axis it gives the same table align_metrics does.
+
+    python sparse_store.py build drone6.1 --results-dir results
+    python sparse_store.py query drone6.1_metrics.npz --tags Reward "Losses/Value Loss" --start 1000000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from tfevents import find_runs, load_scalars
+
+SUFFIX = "_metrics.npz"
+FORMAT_VERSION = 1
+
+
+def _delta_dtype(max_delta):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_delta <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def _dedupe_last(steps, values):
+    """Sort by step and keep the last value written for each step (newest wins, like the dense path)"""
+    steps = np.asarray(steps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32)
+    order = np.argsort(steps, kind='stable')
+    steps, values = steps[order], values[order]
+    keep = np.append(steps[1:] != steps[:-1], True) if len(steps) else np.zeros(0, dtype=bool)
+    return steps[keep], values[keep]
+
+
+def write_store(series, path):
+    """Write {tag: (steps, values)} (or ScalarSeries) as one sparse store; returns bytes written"""
+    tags = sorted(series)
+    arrays = {
+        'version': np.array(FORMAT_VERSION),
+        'tags': np.array(tags, dtype=str),
+        'first_steps': np.zeros(len(tags), dtype=np.int64),
+    }
+    for i, tag in enumerate(tags):
+        steps, values = _dedupe_last(series[tag][0], series[tag][-1])
+        deltas = np.diff(steps)
+        arrays['first_steps'][i] = steps[0] if len(steps) else 0
+        arrays[f"d{i}"] = deltas.astype(_delta_dtype(int(deltas.max()) if len(deltas) else 0))
+        arrays[f"v{i}"] = values
+    # Uncompressed on purpose: members can then be read one at a time
+    np.savez(path, **arrays)
+    return os.path.getsize(path)
+
+
+def from_accumulator(ea, tags=None):
+    """{tag: (steps, values)} from a loaded EventAccumulator"""
+    if tags is None:
+        tags = ea.Tags()['scalars']
+    series = {}
+    for tag in tags:
+        events = ea.Scalars(tag)
+        series[tag] = ([e.step for e in events], [e.value for e in events])
+    return series
+
+
+class SparseStore:
+    """Lazy reader: tags are decoded on first use and cached"""
+
+    def __init__(self, path):
+        self.path = path
+        self.npz = np.load(path)
+        if int(self.npz['version']) != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported store version {int(self.npz['version'])}")
+        self.tags = [str(t) for t in self.npz['tags']]
+        self.index = {tag: i for i, tag in enumerate(self.tags)}
+        self.first_steps = self.npz['first_steps']
+        self.cache = {}
+
+    def close(self):
+        self.npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def series(self, tag):
+        """(steps int64, values float32) for one tag"""
+        if tag not in self.cache:
+            i = self.index[tag]
+            values = self.npz[f"v{i}"]
+            steps = np.empty(len(values), dtype=np.int64)
+            if len(values):
+                steps[0] = self.first_steps[i]
+                np.cumsum(self.npz[f"d{i}"], out=steps[1:])
+                steps[1:] += self.first_steps[i]
+            self.cache[tag] = (steps, values)
+        return self.cache[tag]
+
+    def window(self, tag, start=None, end=None):
+        """Points of one tag with start <= step <= end"""
+        steps, values = self.series(tag)
+        lo = 0 if start is None else np.searchsorted(steps, start, side='left')
+        hi = len(steps) if end is None else np.searchsorted(steps, end, side='right')
+        return steps[lo:hi], values[lo:hi]
+
+    def asof(self, tags=None, steps=None, start=None, end=None):
+        """DataFrame of step + one column per tag, each the latest value at or before the row's step
+
+        steps defaults to the union of the requested tags' steps within [start, end],
+        which reproduces fetch_data.align_metrics for those tags.
+        """
+        tags = self.tags if tags is None else list(tags)
+        missing = [t for t in tags if t not in self.index]
+        if missing:
+            raise KeyError(f"tags not in store: {missing}")
+        if steps is None:
+            windows = [self.window(tag, start, end)[0] for tag in tags]
+            steps = np.unique(np.concatenate(windows)) if windows else np.zeros(0, dtype=np.int64)
+        steps = np.asarray(steps, dtype=np.int64)
+        return pd.DataFrame({'step': steps, **{tag: asof_join(*self.series(tag), steps) for tag in tags}})
+
+
+def asof_join(steps, values, targets):
+    """values[last index with steps <= target] for each target; NaN before the first point"""
+    idx = np.searchsorted(steps, targets, side='right') - 1
+    out = np.where(idx >= 0, values[np.clip(idx, 0, None)] if len(values) else np.nan, np.nan)
+    return out.astype(np.float32)
+
+
+def build_run(run_dir, path, tags=None):
+    series = load_scalars(run_dir, tags)
+    return write_store({tag: (s.steps, s.values) for tag, s in series.items()}, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sparse per-tag metric store with as-of joins")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="write <run>_metrics.npz from a run's event files")
+    p_build.add_argument("runs", nargs="*", help="run ids (default: all runs)")
+    p_build.add_argument("--results-dir", default="results")
+    p_build.add_argument("--output-dir", default=".")
+
+    p_query = sub.add_parser("query", help="as-of join of some tags onto a common step axis")
+    p_query.add_argument("store")
+    p_query.add_argument("--tags", nargs="+", help="default: every tag")
+    p_query.add_argument("--start", type=int)
+    p_query.add_argument("--end", type=int)
+    p_query.add_argument("--every", type=int, help="join onto a regular grid with this spacing instead of the union")
+    p_query.add_argument("--csv", help="write the joined table here")
+
+    p_tags = sub.add_parser("tags", help="list tags with point counts and step ranges")
+    p_tags.add_argument("store")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        runs = find_runs(args.results_dir)
+        os.makedirs(args.output_dir, exist_ok=True)
+        for run_id in args.runs or sorted(runs):
+            if run_id not in runs:
+                print(f"{run_id}: no event files, skipped")
+                continue
+            path = os.path.join(args.output_dir, run_id + SUFFIX)
+            start = time.perf_counter()
+            size = build_run(runs[run_id], path)
+            print(f"{run_id}: {size / 1e3:.1f} kB -> {path} ({time.perf_counter() - start:.2f}s)")
+    elif args.command == "tags":
+        with SparseStore(args.store) as store:
+            for tag in store.tags:
+                steps, _ = store.series(tag)
+                span = f"{steps[0]} - {steps[-1]}" if len(steps) else "empty"
+                print(f"{tag:50s} {len(steps):7d} points  {span}")
+    elif args.command == "query":
+        with SparseStore(args.store) as store:
+            grid = None
+            if args.every:
+                tags = args.tags or store.tags
+                missing = [t for t in tags if t not in store.index]
+                if missing:
+                    raise SystemExit(f"tags not in store: {missing}")
+                with_points = [store.series(t)[0] for t in tags if len(store.series(t)[0])]
+                if not with_points:
+                    raise SystemExit(f"no points for {tags}; nothing to put on a --every grid")
+                lo = args.start if args.start is not None else min(steps[0] for steps in with_points)
+                hi = args.end if args.end is not None else max(steps[-1] for steps in with_points)
+                grid = np.arange(lo, hi + 1, args.every)
+            try:
+                df = store.asof(args.tags, grid, args.start, args.end)
+            except KeyError as e:
+                raise SystemExit(e.args[0])
+        if args.csv:
+            df.to_csv(args.csv, index=False)
+            print(f"Saved {len(df)} rows x {len(df.columns) - 1} tags to {args.csv}")
+        else:
+            print(df.to_string(max_rows=40))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Embedded SQL over every run's scalars, checkpoints and timers (DuckDB)
+
+`build` mirrors results/ into a Parquet store laid out for pruning:
+
+    run_store/scalars/run=<run>/tag=<tag>/data_0.parquet   (behavior, step, wall_time, value)
+    run_store/checkpoints/run=<run>/data.parquet           (training_status.json)
+    run_store/gauges/run=<run>/data.parquet                (timers.json gauges)
+    run_store/timers/run=<run>/data.parquet                (timers.json timer tree, flattened)
+
+Each table is a view over read_parquet(..., hive_partitioning), so filters
+on run and tag only open the matching files. Only runs whose event files or
+run_logs changed since the last build are rewritten. duckdb is imported
+only when a command needs it.
+
+    python sql_query.py build
+    python sql_query.py query "SELECT run, avg(value) FROM scalars
+        WHERE tag = 'GroundCollision' AND step > 8000000 GROUP BY run HAVING avg(value) < 0.05"
+    python sql_query.py query "SELECT l.run, l.value AS lesson, avg(e.value) FROM scalars e
+        ASOF JOIN scalars l ON l.run = e.run AND l.tag = 'Environment/Lesson Number/target_distance'
+        AND e.step >= l.step WHERE e.tag = 'Policy/Entropy' AND e.behavior = 'DroneAgent' GROUP BY ALL ORDER BY ALL"
+"""
+
+import argparse
+import json
+import os
+import shutil
+from urllib.parse import quote
+
+import numpy as np
+
+from tfevents import find_event_files, load_scalars, run_signature
+
+DEFAULT_STORE = "run_store"
+MANIFEST = "manifest.json"
+TABLES = ['scalars', 'checkpoints', 'gauges', 'timers']
+# Inputs besides the event files; a change to any of them reloads the run
+RUN_LOG_INPUTS = ("run_logs/training_status.json", "run_logs/timers.json")
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise SystemExit("sql_query.py needs duckdb: pip install duckdb")
+    return duckdb
+
+
+def _partition_dir(store_dir, table, run_id):
+    # Same percent-encoding DuckDB uses for hive partition values
+    return os.path.join(store_dir, table, "run=" + quote(run_id, safe=''))
+
+
+def list_runs(results_dir):
+    """{run_id: run_dir} for every run with event files or run_logs"""
+    runs = {}
+    for entry in sorted(os.scandir(results_dir), key=lambda e: e.name):
+        if entry.is_dir() and (os.path.isdir(os.path.join(entry.path, "run_logs")) or find_event_files(entry.path)):
+            runs[entry.name] = entry.path
+    return runs
+
+
+def _scalar_frame(run_dir):
+    import pandas as pd
+
+    frames = []
+    for behavior_dir in sorted({os.path.dirname(p) for p in find_event_files(run_dir)}):
+        behavior = os.path.relpath(behavior_dir, run_dir)
+        for tag, s in load_scalars(behavior_dir).items():
+            frames.append(pd.DataFrame({
+                'tag': tag,
+                'behavior': behavior,
+                'step': s.steps.astype(np.int64),
+                'wall_time': s.wall_times,
+                'value': s.values.astype(np.float32),
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def _checkpoint_frame(run_dir):
+    import pandas as pd
+
+    path = os.path.join(run_dir, "run_logs", "training_status.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        status = json.load(f)
+    rows = []
+    for behavior, entry in status.items():
+        if not isinstance(entry, dict) or 'checkpoints' not in entry:
+            continue
+        checkpoints = [(c, False) for c in entry.get('checkpoints') or []]
+        if entry.get('final_checkpoint'):
+            checkpoints.append((entry['final_checkpoint'], True))
+        for checkpoint, final in checkpoints:
+            rows.append({
+                'behavior': behavior,
+                'steps': int(checkpoint.get('steps', 0)),
+                'reward': checkpoint.get('reward'),
+                'creation_time': checkpoint.get('creation_time'),
+                # Paths are written with Windows separators on the training box
+                'file_path': (checkpoint.get('file_path') or '').replace('\\', '/'),
+                'final': final,
+            })
+    return pd.DataFrame(rows) if rows else None
+
+
+def _timer_frames(run_dir):
+    import pandas as pd
+
+    path = os.path.join(run_dir, "run_logs", "timers.json")
+    if not os.path.exists(path):
+        return None, None
+    with open(path, 'r') as f:
+        root = json.load(f)
+    gauges = [{'name': name, **{k: g.get(k) for k in ('value', 'min', 'max', 'count')}}
+              for name, g in (root.get('gauges') or {}).items()]
+
+    nodes = []
+
+    def walk(node, path, depth):
+        nodes.append({'path': path, 'depth': depth, 'total': node.get('total'),
+                      'count': node.get('count'), 'self': node.get('self')})
+        for name, child in (node.get('children') or {}).items():
+            walk(child, f"{path}/{name}" if path else name, depth + 1)
+
+    walk(root, "", 0)
+    return (pd.DataFrame(gauges) if gauges else None), pd.DataFrame(nodes)
+
+
+def _write(con, frame, target, partition_by=None):
+    if frame is None or not len(frame):
+        return
+    con.register('frame', frame)
+    os.makedirs(target if partition_by else os.path.dirname(target), exist_ok=True)
+    if partition_by:
+        con.execute(f"COPY frame TO '{target}' (FORMAT PARQUET, PARTITION_BY ({partition_by}), OVERWRITE_OR_IGNORE)")
+    else:
+        con.execute(f"COPY frame TO '{target}' (FORMAT PARQUET)")
+    con.unregister('frame')
+
+
+def build(results_dir="results", store_dir=DEFAULT_STORE, force=False):
+    """Write partitions for new/changed runs and drop removed runs; returns (updated, skipped)"""
+    duckdb = _duckdb()
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    runs = list_runs(results_dir)
+    updated, skipped = [], []
+    con = duckdb.connect()
+
+    for run_id in set(manifest) - set(runs):
+        for table in TABLES:
+            shutil.rmtree(_partition_dir(store_dir, table, run_id), ignore_errors=True)
+        del manifest[run_id]
+
+    for run_id, run_dir in runs.items():
+        signature = run_signature(run_dir, RUN_LOG_INPUTS)
+        if manifest.get(run_id) == signature:
+            skipped.append(run_id)
+            continue
+        for table in TABLES:
+            shutil.rmtree(_partition_dir(store_dir, table, run_id), ignore_errors=True)
+        # The run is the directory's partition, so it is not stored in the files themselves
+        _write(con, _scalar_frame(run_dir), _partition_dir(store_dir, 'scalars', run_id), partition_by='tag')
+        _write(con, _checkpoint_frame(run_dir), os.path.join(_partition_dir(store_dir, 'checkpoints', run_id), "data.parquet"))
+        gauges, timers = _timer_frames(run_dir)
+        _write(con, gauges, os.path.join(_partition_dir(store_dir, 'gauges', run_id), "data.parquet"))
+        _write(con, timers, os.path.join(_partition_dir(store_dir, 'timers', run_id), "data.parquet"))
+        manifest[run_id] = signature
+        updated.append(run_id)
+
+    con.close()
+    os.makedirs(store_dir, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return updated, skipped
+
+
+def connect(store_dir=DEFAULT_STORE, database=":memory:"):
+    """DuckDB connection with one view per table of the store"""
+    duckdb = _duckdb()
+    con = duckdb.connect(database)
+    for table in TABLES:
+        depth = "*/*" if table == 'scalars' else "*"
+        pattern = os.path.join(store_dir, table, depth, "*.parquet").replace("'", "''")
+        if next(_iter_files(os.path.join(store_dir, table)), None) is None:
+            continue
+        con.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM "
+                    f"read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)")
+    return con
+
+
+def _iter_files(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".parquet"):
+                yield os.path.join(root, name)
+
+
+def query(sql, params=None, store_dir=DEFAULT_STORE):
+    """(column names, rows) for an arbitrary SQL statement"""
+    con = connect(store_dir)
+    try:
+        cursor = con.execute(sql, params or [])
+        names = [d[0] for d in cursor.description] if cursor.description else []
+        return names, cursor.fetchall()
+    finally:
+        con.close()
+
+
+def _format(value):
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+
+def print_rows(names, rows, limit=200):
+    shown = rows[:limit]
+    widths = [max([len(str(n))] + [len(_format(r[i])) for r in shown]) for i, n in enumerate(names)]
+    print("  ".join(str(n).ljust(w) for n, w in zip(names, widths)))
+    for r in shown:
+        print("  ".join(_format(v).ljust(w) for v, w in zip(r, widths)))
+    if len(rows) > limit:
+        print(f"... {len(rows) - limit} more rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL over all runs' scalars, checkpoints and timers")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="create or incrementally refresh the Parquet store")
+    p_build.add_argument("--results-dir", default="results")
+    p_build.add_argument("--force", action="store_true", help="rewrite every run")
+
+    p_query = sub.add_parser("query", help="run SQL against the scalars/checkpoints/gauges/timers views")
+    p_query.add_argument("sql")
+    p_query.add_argument("--csv", help="write the result here instead of printing it")
+    p_query.add_argument("--explain", action="store_true", help="show DuckDB's plan (files scanned) instead")
+
+    sub.add_parser("tables", help="list tables and their columns")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        updated, skipped = build(args.results_dir, args.store, args.force)
+        print(f"Updated {len(updated)} runs, {len(skipped)} unchanged -> {args.store}")
+        if updated:
+            print(f"  refreshed: {', '.join(updated)}")
+    elif args.command == "query":
+        if args.explain:
+            _, rows = query("EXPLAIN ANALYZE " + args.sql, store_dir=args.store)
+            print(rows[0][1])
+            return
+        names, rows = query(args.sql, store_dir=args.store)
+        if args.csv:
+            import csv
+            with open(args.csv, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(names)
+                writer.writerows(rows)
+            print(f"Saved {len(rows)} rows to {args.csv}")
+        else:
+            print_rows(names, rows)
+    elif args.command == "tables":
+        con = connect(args.store)
+        for (table,) in con.execute("SELECT table_name FROM information_schema.tables ORDER BY 1").fetchall():
+            columns = con.execute(f"DESCRIBE {table}").fetchall()
+            print(f"{table}: " + ", ".join(f"{c[0]} {c[1]}" for c in columns))
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Opt-in stage profiling for the data_fetch scripts
+
+Mirrors the ML-Agents timers API (hierarchical_timer / timed) and writes the
+same tree shape as run_logs/timers.json, so the tooling that reads training
+timers can read ours too. Each node also records peak traced memory, rows
+and bytes processed as gauges.
+
+Enable by setting DATA_FETCH_TIMERS=<output.json> (written at exit) or by
+calling enable(). While disabled, hierarchical_timer() hands back a shared
+no-op object, so instrumented code pays one global lookup per stage.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+TIMER_FORMAT_VERSION = "0.1.0"
+
+
+class TimerNode:
+    """One node of the timer tree (total/count/self/children like ML-Agents)"""
+
+    def __init__(self):
+        self.children = {}
+        self.total = 0.0
+        self.count = 0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_memory = 0
+
+    def get_child(self, name):
+        child = self.children.get(name)
+        if child is None:
+            child = self.children[name] = TimerNode()
+        return child
+
+    def to_dict(self):
+        child_total = sum(child.total for child in self.children.values())
+        node = {
+            'total': self.total,
+            'count': self.count,
+            'self': max(0.0, self.total - child_total),
+        }
+        if self.children:
+            node['children'] = {name: child.to_dict() for name, child in self.children.items()}
+        return node
+
+
+class _Frame:
+    __slots__ = ('name', 'node', 'start', 'start_memory', 'carried_peak')
+
+    def __init__(self, name, node):
+        self.name = name
+        self.node = node
+        self.start = 0.0
+        self.start_memory = 0
+        self.carried_peak = 0
+
+
+class _NullTimer:
+    """Returned while profiling is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    def __init__(self, stack, name):
+        self.stack = stack
+        self.name = name
+
+    def __enter__(self):
+        self.stack.push(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.stack.pop()
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        """Record rows and bytes processed by the current stage"""
+        node = self.stack.frames[-1].node
+        node.rows += rows
+        node.bytes += nbytes
+
+
+class TimerStack:
+    """Tracks the currently open stages and accumulates the tree"""
+
+    def __init__(self, track_memory=True):
+        self.root = TimerNode()
+        self.root_frame = _Frame('root', self.root)
+        self.frames = [self.root_frame]
+        self.track_memory = track_memory
+        self.start_time = time.time()
+        self.root_frame.start = time.perf_counter()
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def push(self, name):
+        parent = self.frames[-1]
+        frame = _Frame(name, parent.node.get_child(name))
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # tracemalloc has one global peak; carry the parent's so far before resetting it
+            parent.carried_peak = max(parent.carried_peak, peak)
+            tracemalloc.reset_peak()
+            frame.start_memory = current
+        self.frames.append(frame)
+        frame.start = time.perf_counter()
+
+    def pop(self):
+        frame = self.frames.pop()
+        elapsed = time.perf_counter() - frame.start
+        node = frame.node
+        node.total += elapsed
+        node.count += 1
+        if self.track_memory:
+            peak = max(frame.carried_peak, tracemalloc.get_traced_memory()[1])
+            node.peak_memory = max(node.peak_memory, peak - frame.start_memory)
+            parent = self.frames[-1]
+            parent.carried_peak = max(parent.carried_peak, peak)
+
+    def gauges(self):
+        """rows/bytes/peak memory per stage, in the ML-Agents gauge layout"""
+        gauges = {}
+
+        def visit(node, path):
+            for name, child in node.children.items():
+                child_path = f"{path}.{name}" if path else name
+                for suffix, value in (('rows', child.rows), ('bytes', child.bytes),
+                                      ('peak_memory_bytes', child.peak_memory)):
+                    if value:
+                        gauges[f"{child_path}.{suffix}"] = {
+                            'value': value, 'min': value, 'max': value, 'count': child.count,
+                        }
+                visit(child, child_path)
+
+        visit(self.root, "")
+        return gauges
+
+    def to_dict(self):
+        self.root.total = time.perf_counter() - self.root_frame.start
+        self.root.count = 1
+        tree = {'name': 'root', 'gauges': self.gauges()}
+        tree['metadata'] = {
+            'timer_format_version': TIMER_FORMAT_VERSION,
+            'start_time_seconds': str(int(self.start_time)),
+            'end_time_seconds': str(int(time.time())),
+            'python_version': sys.version,
+            'command_line_arguments': ' '.join(sys.argv),
+        }
+        tree.update(self.root.to_dict())
+        return tree
+
+
+_stack = None
+_output_path = None
+
+
+def enable(output_path=None, track_memory=True):
+    """Start collecting timers; if output_path is given the tree is written at exit"""
+    global _stack, _output_path
+    _stack = TimerStack(track_memory)
+    if output_path and _output_path is None:
+        atexit.register(_write_at_exit)
+    _output_path = output_path
+    return _stack
+
+
+def disable():
+    global _stack
+    _stack = None
+
+
+def is_enabled():
+    return _stack is not None
+
+
+def hierarchical_timer(name):
+    """Context manager timing one pipeline stage, nested under whichever stage is open"""
+    if _stack is None:
+        return _NULL_TIMER
+    return _StageTimer(_stack, name)
+
+
+def timed(func):
+    """Decorator form of hierarchical_timer, named after the function"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _stack is None:
+            return func(*args, **kwargs)
+        with _StageTimer(_stack, func.__qualname__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def get_timer_tree():
+    return _stack.to_dict() if _stack is not None else None
+
+
+def write_timers(path):
+    """Write the collected tree in timers.json format"""
+    tree = get_timer_tree()
+    if tree is None:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(tree, f, indent=4)
+
+
+def _write_at_exit():
+    if _output_path and _stack is not None:
+        write_timers(_output_path)
+        print(f"Stage timers written to: {_output_path}")
+
+
+if os.environ.get("DATA_FETCH_TIMERS"):
+    enable(os.environ["DATA_FETCH_TIMERS"], track_memory=os.environ.get("DATA_FETCH_TIMERS_MEMORY", "1") != "0")
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Core-aware parallel training sweep scheduler
+
+Expands a grid or list of overrides on top of a trainer config
+(config2D/*.yaml, config/drone3d_curriculum.yaml) into one generated config
+per run, then packs concurrent mlagents-learn processes onto the available
+cores. Each run needs --num-envs environment cores plus one trainer core,
+and gets its own --base-port block (ML-Agents uses base_port + worker_id per
+environment). Runs that do not fit wait in a queue. Status and progress come
+from each run's run_logs/training_status.json, and the sweep ends with a
+utilization report.
+
+Sweep spec (YAML):
+
+    base: config2D/single_occ.yaml
+    run_prefix: lr_sweep
+    env: G:/unity_files/thesis-1/build/thesis-1.exe
+    num_envs: 2
+    grid:                        # cartesian product ...
+      behaviors.*.hyperparameters.learning_rate: [1.0e-4, 3.0e-4]
+      behaviors.*.network_settings.memory.sequence_length: [32, 64]
+    runs:                        # ... or an explicit list (either or both)
+      - {behaviors.*.hyperparameters.batch_size: 512}
+
+    python sweep_scheduler.py run sweep.yaml
+    python sweep_scheduler.py run sweep.yaml --dummy --cores 4   # end-to-end with a dummy trainer/env
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+
+import yaml
+
+from run_config import get_config_value
+
+DEFAULT_BASE_PORT = 5005
+DUMMY_ENV = "dummy"
+
+
+# ---------------------------------------------------------------------------
+# Expansion
+# ---------------------------------------------------------------------------
+
+def set_config_value(config, dotted_key, value):
+    """Set 'behaviors.*.hyperparameters.batch_size'; '*' applies to every existing key at that level"""
+    def assign(node, parts):
+        head, rest = parts[0], parts[1:]
+        keys = list(node) if head == '*' else [head]
+        for key in keys:
+            if not rest:
+                node[key] = value
+            else:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                assign(node[key], rest)
+
+    assign(config, dotted_key.split('.'))
+
+
+def expand_overrides(spec):
+    """List of override dicts: the grid's cartesian product followed by the explicit runs"""
+    overrides = []
+    grid = spec.get('grid') or {}
+    if grid:
+        keys = sorted(grid)
+        for combo in itertools.product(*(grid[k] for k in keys)):
+            overrides.append(dict(zip(keys, combo)))
+    overrides.extend(dict(run) for run in spec.get('runs') or [])
+    return overrides or [{}]
+
+
+def generate_configs(spec, spec_dir, output_dir):
+    """Write one config per override; returns [(run_id, config_path, overrides)]"""
+    base_path = os.path.join(spec_dir, spec['base'])
+    with open(base_path, 'r') as f:
+        base = yaml.safe_load(f)
+    prefix = spec.get('run_prefix') or os.path.splitext(os.path.basename(base_path))[0]
+    config_dir = os.path.join(output_dir, "configs")
+    os.makedirs(config_dir, exist_ok=True)
+
+    runs = []
+    for i, overrides in enumerate(expand_overrides(spec), 1):
+        config = copy.deepcopy(base)
+        for key, value in overrides.items():
+            set_config_value(config, key, value)
+        run_id = f"{prefix}.{i}"
+        path = os.path.join(config_dir, f"{run_id}.yaml")
+        with open(path, 'w') as f:
+            f.write(f"# Generated by sweep_scheduler.py from {spec['base']}\n")
+            for key, value in overrides.items():
+                f.write(f"# {key}: {value}\n")
+            yaml.safe_dump(config, f, sort_keys=False)
+        runs.append((run_id, path, overrides))
+    return runs
+
+
+# ---------------------------------------------------------------------------
+# Resources
+# ---------------------------------------------------------------------------
+
+def port_free(port, host="127.0.0.1"):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+class PortAllocator:
+    """Hands out disjoint [base, base + n) blocks, skipping ports something else already holds"""
+
+    def __init__(self, base_port=DEFAULT_BASE_PORT, limit=65535):
+        self.next_port = base_port
+        self.limit = limit
+        self.free_blocks = []   # released (base, n) blocks, reused first
+        self.used = set()
+
+    def acquire(self, n):
+        for i, (base, size) in enumerate(self.free_blocks):
+            if size >= n and all(port_free(p) for p in range(base, base + n)):
+                self.free_blocks.pop(i)
+                self.used.add((base, n))
+                return base
+        while self.next_port + n <= self.limit:
+            base = self.next_port
+            self.next_port += n
+            if all(port_free(p) for p in range(base, base + n)):
+                self.used.add((base, n))
+                return base
+        raise RuntimeError("no free port block left")
+
+    def release(self, base, n):
+        self.used.discard((base, n))
+        self.free_blocks.append((base, n))
+
+
+def read_training_status(results_dir, run_id):
+    path = os.path.join(results_dir, run_id, "run_logs", "training_status.json")
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def status_progress(status):
+    """(latest checkpoint step, finished) from training_status.json"""
+    latest, finished = 0, False
+    for name, entry in (status or {}).items():
+        if not isinstance(entry, dict) or 'checkpoints' not in entry:
+            continue
+        for checkpoint in entry.get('checkpoints') or []:
+            latest = max(latest, checkpoint.get('steps', 0))
+        if entry.get('final_checkpoint'):
+            finished = True
+            latest = max(latest, entry['final_checkpoint'].get('steps', 0))
+    return latest, finished
+
+
+def _children_cpu_seconds():
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+# ---------------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------------
+
+class Run:
+    def __init__(self, run_id, config_path, overrides, num_envs, cores, max_steps):
+        self.run_id = run_id
+        self.config_path = config_path
+        self.overrides = overrides
+        self.num_envs = num_envs
+        self.cores = cores
+        self.max_steps = max_steps
+        self.state = 'queued'
+        self.process = None
+        self.base_port = None
+        self.started = None
+        self.finished = None
+        self.steps = 0
+        self.returncode = None
+        self.log = None
+        # '--resume' or '--force' when results/<run_id> already exists; mlagents-learn refuses to start otherwise
+        self.restart_flag = None
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in ('run_id', 'config_path', 'overrides', 'num_envs', 'cores',
+                                                    'state', 'base_port', 'started', 'finished', 'steps',
+                                                    'max_steps', 'returncode', 'restart_flag')}
+
+
+class SweepScheduler:
+    def __init__(self, runs, trainer, results_dir, env=None, total_cores=None, base_port=DEFAULT_BASE_PORT,
+                 max_concurrent=None, extra_args=(), log_dir="."):
+        self.runs = runs
+        self.trainer = trainer
+        self.results_dir = results_dir
+        self.env = env
+        self.total_cores = total_cores or os.cpu_count() or 1
+        self.ports = PortAllocator(base_port)
+        self.max_concurrent = max_concurrent
+        self.extra_args = list(extra_args)
+        self.log_dir = log_dir
+        self.core_seconds = 0.0
+        self.peak_cores = 0
+
+    def used_cores(self):
+        return sum(r.cores for r in self.runs if r.state == 'running')
+
+    def command(self, run):
+        cmd = list(self.trainer) + [run.config_path, f"--run-id={run.run_id}", f"--base-port={run.base_port}",
+                                    f"--num-envs={run.num_envs}", f"--results-dir={self.results_dir}"]
+        if run.restart_flag:
+            cmd.append(run.restart_flag)
+        if self.env:
+            cmd += [f"--env={self.env}", "--no-graphics"]
+        return cmd + self.extra_args
+
+    def launch(self, run):
+        run.base_port = self.ports.acquire(run.num_envs)
+        os.makedirs(self.log_dir, exist_ok=True)
+        run.log = open(os.path.join(self.log_dir, f"{run.run_id}.log"), 'w')
+        run.process = subprocess.Popen(self.command(run), stdout=run.log, stderr=subprocess.STDOUT)
+        run.state = 'running'
+        run.started = time.time()
+        print(f"  start {run.run_id}: {run.cores} cores, ports {run.base_port}-{run.base_port + run.num_envs - 1}")
+
+    def poll(self):
+        for run in self.runs:
+            if run.state != 'running':
+                continue
+            run.steps, finished = status_progress(read_training_status(self.results_dir, run.run_id))
+            code = run.process.poll()
+            if code is None:
+                continue
+            run.returncode = code
+            run.finished = time.time()
+            run.steps, finished = status_progress(read_training_status(self.results_dir, run.run_id))
+            run.state = 'complete' if code == 0 and finished else ('stopped' if code == 0 else 'failed')
+            run.log.close()
+            self.ports.release(run.base_port, run.num_envs)
+            self.core_seconds += run.cores * (run.finished - run.started)
+            print(f"  {run.state} {run.run_id} (exit {code}, {run.steps} steps, {run.finished - run.started:.1f}s)")
+
+    def schedule(self):
+        """Start queued runs in order while their cores fit"""
+        running = sum(1 for r in self.runs if r.state == 'running')
+        for run in self.runs:
+            if run.state != 'queued':
+                continue
+            if self.max_concurrent and running >= self.max_concurrent:
+                break
+            # A run bigger than the machine still runs, alone
+            fits = self.used_cores() + run.cores <= self.total_cores or self.used_cores() == 0
+            if not fits:
+                break
+            self.launch(run)
+            running += 1
+        self.peak_cores = max(self.peak_cores, self.used_cores())
+
+    def run(self, poll_interval=5.0, state_path=None):
+        start = time.time()
+        cpu_start = _children_cpu_seconds()
+        try:
+            while any(r.state in ('queued', 'running') for r in self.runs):
+                self.poll()
+                self.schedule()
+                if state_path:
+                    self.write_state(state_path)
+                if any(r.state in ('queued', 'running') for r in self.runs):
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print("Interrupted: stopping running trainers")
+            for run in self.runs:
+                if run.state == 'running':
+                    run.process.terminate()
+                    run.process.wait()
+            self.poll()
+        makespan = time.time() - start
+        cpu_end = _children_cpu_seconds()
+        report = {
+            'makespan_seconds': makespan,
+            'cores': self.total_cores,
+            'peak_cores_allocated': self.peak_cores,
+            'allocated_core_seconds': self.core_seconds,
+            'allocation_utilization': self.core_seconds / (self.total_cores * makespan) if makespan else None,
+            'runs': {state: sum(1 for r in self.runs if r.state == state)
+                     for state in ('complete', 'stopped', 'failed', 'queued', 'skipped')},
+        }
+        if cpu_start is not None and cpu_end is not None:
+            report['cpu_seconds'] = cpu_end - cpu_start
+            report['cpu_utilization'] = (cpu_end - cpu_start) / (self.total_cores * makespan) if makespan else None
+        if state_path:
+            self.write_state(state_path, report)
+        return report
+
+    def write_state(self, path, report=None):
+        with open(path, 'w') as f:
+            json.dump({'runs': [r.as_dict() for r in self.runs], 'report': report}, f, indent=2)
+
+
+def build_runs(spec, spec_dir, output_dir, results_dir, num_envs=None, trainer_cores=1, force=False):
+    runs = []
+    default_envs = num_envs or spec.get('num_envs', 1)
+    for run_id, path, overrides in generate_configs(spec, spec_dir, output_dir):
+        with open(path, 'r') as f:
+            config = yaml.safe_load(f)
+        max_steps = get_config_value(config, 'behaviors.*.max_steps')
+        envs = overrides.get('num_envs', default_envs)
+        run = Run(run_id, path, {k: v for k, v in overrides.items() if k != 'num_envs'}, envs,
+                  envs + trainer_cores, max_steps)
+        run.steps, finished = status_progress(read_training_status(results_dir, run_id))
+        if finished and not force:
+            run.state = 'skipped'
+        elif os.path.isdir(os.path.join(results_dir, run_id)):
+            # Continue half-finished runs from their checkpoints; start over when forced or nothing was saved
+            run.restart_flag = "--resume" if run.steps and not finished and not force else "--force"
+        runs.append(run)
+    return runs
+
+
+# ---------------------------------------------------------------------------
+# Dummy trainer/environment for end-to-end tests
+# ---------------------------------------------------------------------------
+
+def _burn(seconds):
+    end = time.perf_counter() + seconds
+    x = 0
+    while time.perf_counter() < end:
+        x += 1
+    return x
+
+
+def dummy_env(args):
+    """Stands in for a Unity build: holds a connection to the trainer's port and burns a core"""
+    with socket.create_connection(("127.0.0.1", args.mlagents_port)) as conn:
+        conn.sendall(b"hello")
+        _burn(args.seconds)
+
+
+def dummy_trainer(args):
+    """Mimics mlagents-learn: listens on base_port + worker_id, starts the envs, writes training_status.json"""
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+    behaviors = list((config.get('behaviors') or {'Agent': {}}).keys())
+    max_steps = get_config_value(config, 'behaviors.*.max_steps', 100000) or 100000
+    run_dir = os.path.join(args.results_dir, args.run_id)
+    # Same rule as mlagents-learn, so the dummy does not hide a missing --resume/--force
+    if os.path.isdir(run_dir) and not (args.resume or args.force):
+        raise SystemExit("Previous data from this run ID was found. Either specify a new run ID, "
+                         "use --resume to resume this run, or use the --force parameter to overwrite existing data.")
+    status = read_training_status(args.results_dir, args.run_id) if args.resume else None
+    start_steps, _ = status_progress(status)
+    os.makedirs(os.path.join(run_dir, "run_logs"), exist_ok=True)
+    with open(os.path.join(run_dir, "configuration.yaml"), 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+
+    listeners = []
+    for worker_id in range(args.num_envs):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Fails loudly if the scheduler handed out overlapping port blocks
+        listener.bind(("127.0.0.1", args.base_port + worker_id))
+        listener.listen(1)
+        listeners.append(listener)
+    env_cmd = [sys.executable, os.path.abspath(__file__), "dummy-env", "--seconds", str(args.seconds)]
+    envs = [subprocess.Popen(env_cmd + ["--mlagents-port", str(args.base_port + i)]) for i in range(args.num_envs)]
+    for listener in listeners:
+        listener.accept()[0].close()
+
+    checkpoints = [c for c in ((status or {}).get(behaviors[0]) or {}).get('checkpoints') or []]
+    n_checkpoints = 4
+    for i in range(1, n_checkpoints + 1):
+        steps = int(max_steps * i / n_checkpoints)
+        if steps <= start_steps:
+            continue
+        _burn(args.seconds / n_checkpoints)
+        checkpoints.append({'steps': steps, 'file_path': os.path.join(run_dir, f"{behaviors[0]}-{steps}.onnx"),
+                            'reward': float(i), 'creation_time': time.time(), 'auxillary_file_paths': []})
+        status = {name: {'checkpoints': checkpoints} for name in behaviors}
+        if i == n_checkpoints:
+            for name in behaviors:
+                status[name]['final_checkpoint'] = dict(checkpoints[-1], file_path=os.path.join(run_dir, f"{name}.onnx"))
+        status['metadata'] = {'stats_format_version': "0.3.0", 'mlagents_version': "dummy"}
+        with open(os.path.join(run_dir, "run_logs", "training_status.json"), 'w') as f:
+            json.dump(status, f, indent=4)
+    for env in envs:
+        env.wait()
+    for listener in listeners:
+        listener.close()
+    print(f"dummy trainer {args.run_id}: {max_steps} steps on ports {args.base_port}+{args.num_envs}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sweep of mlagents-learn trainings packed onto the cores")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("run", "expand"):
+        p = sub.add_parser(name, help="expand and run the sweep" if name == "run" else "only write the configs")
+        p.add_argument("spec", help="sweep YAML (base, grid/runs, run_prefix, env, num_envs)")
+        p.add_argument("--output-dir", default="sweeps", help="generated configs, logs and sweep state go here")
+        p.add_argument("--results-dir", default="results")
+        p.add_argument("--num-envs", type=int, help="override the spec's num_envs")
+        p.add_argument("--trainer-cores", type=int, default=1, help="cores reserved per trainer process")
+        p.add_argument("--force", action="store_true", help="rerun runs that already finished")
+    p_run = sub.choices["run"]
+    p_run.add_argument("--cores", type=int, help="cores to pack onto (default: all)")
+    p_run.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT)
+    p_run.add_argument("--max-concurrent", type=int)
+    p_run.add_argument("--trainer", default="mlagents-learn", help="trainer command")
+    p_run.add_argument("--poll", type=float, default=5.0, help="seconds between status checks")
+    p_run.add_argument("--dummy", action="store_true", help="use the built-in dummy trainer and environment")
+    p_run.add_argument("--dummy-seconds", type=float, default=2.0)
+    p_run.add_argument("--trainer-args", default="",
+                       help='extra arguments for every trainer, e.g. --trainer-args="--torch-device cpu"')
+
+    p_trainer = sub.add_parser("dummy-trainer")
+    p_trainer.add_argument("config")
+    p_trainer.add_argument("--run-id", required=True)
+    p_trainer.add_argument("--base-port", type=int, required=True)
+    p_trainer.add_argument("--num-envs", type=int, default=1)
+    p_trainer.add_argument("--results-dir", default="results")
+    p_trainer.add_argument("--env")
+    p_trainer.add_argument("--no-graphics", action="store_true")
+    p_trainer.add_argument("--seconds", type=float, default=2.0)
+    p_trainer.add_argument("--resume", action="store_true")
+    p_trainer.add_argument("--force", action="store_true")
+
+    p_env = sub.add_parser("dummy-env")
+    p_env.add_argument("--mlagents-port", type=int, required=True)
+    p_env.add_argument("--seconds", type=float, default=2.0)
+
+    args = parser.parse_args()
+
+    if args.command == "dummy-trainer":
+        dummy_trainer(args)
+        return
+    if args.command == "dummy-env":
+        dummy_env(args)
+        return
+
+    with open(args.spec, 'r') as f:
+        spec = yaml.safe_load(f)
+    spec_dir = os.path.dirname(os.path.abspath(args.spec))
+    runs = build_runs(spec, spec_dir, args.output_dir, args.results_dir, args.num_envs, args.trainer_cores, args.force)
+
+    for run in runs:
+        flags = f" ({run.state})" if run.state != 'queued' else (f" ({run.restart_flag})" if run.restart_flag else "")
+        print(f"{run.run_id}{flags}: {run.num_envs} envs, {run.cores} cores, {run.overrides}")
+    if args.command == "expand":
+        print(f"Wrote {len(runs)} configs to {os.path.join(args.output_dir, 'configs')}")
+        return
+
+    trainer = shlex.split(args.trainer)
+    env = spec.get('env')
+    if args.dummy:
+        trainer = [sys.executable, os.path.abspath(__file__), "dummy-trainer", "--seconds", str(args.dummy_seconds)]
+        env = DUMMY_ENV
+    scheduler = SweepScheduler(runs, trainer, args.results_dir, env, args.cores, args.base_port, args.max_concurrent,
+                               extra_args=shlex.split(args.trainer_args), log_dir=os.path.join(args.output_dir, "logs"))
+    print(f"\nPacking {sum(r.state == 'queued' for r in runs)} runs onto {scheduler.total_cores} cores")
+    report = scheduler.run(args.poll, os.path.join(args.output_dir, "sweep_state.json"))
+
+    print(f"\nMakespan {report['makespan_seconds']:.1f}s on {report['cores']} cores "
+          f"(peak {report['peak_cores_allocated']} allocated)")
+    print(f"  allocated core utilization: {report['allocation_utilization'] * 100:.0f}%")
+    if 'cpu_utilization' in report:
+        print(f"  measured CPU utilization:   {report['cpu_utilization'] * 100:.0f}% "
+              f"({report['cpu_seconds']:.1f} CPU-seconds)")
+    print("  runs: " + ", ".join(f"{n} {s}" for s, n in report['runs'].items() if n))
+    if report['runs']['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Synthetic ML-Agents results/ tree generator
+
+Writes realistic events.out.tfevents.* files (reward curves with collapses,
+decaying entropy and losses, curriculum lessons, resumed runs split across
+several files, optionally truncated tails) for scaling benchmarks.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from tfevents import EventFileWriter, encode_scalar_event, encode_text_event
+
+# Same categories as fetch_metrics_by_category.py
+METRIC_CATEGORIES = {
+    "performance": [
+        'Reward',
+        'Environment/Cumulative Reward',
+        'Environment/Episode Length',
+        'EpisodeLength',
+        'TargetsFound',
+        'PathEfficiency',
+        'AngleStability',
+        'GroundCollision'
+    ],
+    "training": [
+        'Losses/Policy Loss',
+        'Losses/Value Loss',
+        'Losses/Pretraining Loss'
+    ],
+    "policy": [
+        'Policy/Entropy',
+        'Policy/Extrinsic Value Estimate',
+        'Policy/Extrinsic Reward',
+        'Policy/Learning Rate',
+        'Policy/Epsilon',
+        'Policy/Beta'
+    ]
+}
+
+CURRICULUM_PARAMETERS = ['hover_height', 'target_distance', 'obstacle_count']
+
+
+def _progress_curve(progress, rng, start, end, midpoint, sharpness=10.0):
+    midpoint = midpoint + rng.uniform(-0.1, 0.1)
+    return start + (end - start) / (1.0 + np.exp(-sharpness * (progress - midpoint)))
+
+
+def synthesize_series(steps, tags, rng, max_steps):
+    """Generate a value array per tag for the given step grid"""
+    n = len(steps)
+    progress = steps / max_steps
+    competence = _progress_curve(progress, rng, 0.0, 1.0, 0.35)
+    # Occasional collapse windows like the -15 reward dips in drone3.4
+    collapse = np.zeros(n)
+    for _ in range(rng.integers(0, 4)):
+        center = rng.integers(0, n)
+        width = max(1, n // 200)
+        collapse[max(0, center - width):center + width] = 1.0
+
+    reward = -10.0 + 40.0 * competence + rng.normal(0.0, 3.0, n) - 25.0 * collapse
+    episode_length = 1000.0 - 600.0 * competence + rng.normal(0.0, 40.0, n)
+    series = {
+        'Reward': reward,
+        'Environment/Cumulative Reward': reward + rng.normal(0.0, 0.5, n),
+        'Environment/Episode Length': np.maximum(episode_length, 10.0),
+        'EpisodeLength': np.maximum(episode_length, 10.0),
+        'TargetsFound': np.clip(5.0 * competence + rng.normal(0.0, 0.3, n), 0.0, 5.0),
+        'PathEfficiency': np.clip(0.1 + 0.6 * competence + rng.normal(0.0, 0.05, n), 0.0, 1.0),
+        'AngleStability': np.clip(0.5 + 0.45 * competence + rng.normal(0.0, 0.03, n), 0.0, 1.0),
+        'GroundCollision': np.clip(0.6 * (1.0 - competence) + 0.5 * collapse + rng.normal(0.0, 0.02, n), 0.0, 1.0),
+        'Losses/Policy Loss': 0.03 * np.exp(-2.0 * progress) + np.abs(rng.normal(0.0, 0.005, n)),
+        'Losses/Value Loss': 2.0 * np.exp(-3.0 * progress) + np.abs(rng.normal(0.0, 0.2, n)) + 5.0 * collapse,
+        'Losses/Pretraining Loss': 0.5 * np.exp(-4.0 * progress) + np.abs(rng.normal(0.0, 0.02, n)),
+        'Policy/Entropy': 1.42 - 0.4 * progress + rng.normal(0.0, 0.01, n),
+        'Policy/Extrinsic Value Estimate': 0.5 * reward + rng.normal(0.0, 0.5, n),
+        'Policy/Extrinsic Reward': reward + rng.normal(0.0, 0.5, n),
+        'Policy/Learning Rate': 2.0e-4 * (1.0 - progress),
+        'Policy/Epsilon': 0.2 * (1.0 - progress) + 0.1 * progress,
+        'Policy/Beta': 0.01 * (1.0 - progress) + 1e-5,
+    }
+    for i, parameter in enumerate(CURRICULUM_PARAMETERS):
+        thresholds = np.sort(rng.uniform(0.05, 0.8, i + 1))
+        series[f'Environment/Lesson Number/{parameter}'] = np.searchsorted(thresholds, progress).astype(np.float64)
+
+    return {tag: series[tag] for tag in tags if tag in series}
+
+
+def write_run(run_dir, behavior="MyAgent", tags=None, max_steps=10_000_000, summary_freq=10000,
+              n_files=1, truncate_tail=False, seed=0, start_time=1770000000.0, seconds_per_summary=50.0):
+    """Write one synthetic run, returning {'files', 'bytes', 'points'}"""
+    rng = np.random.default_rng(seed)
+    if tags is None:
+        tags = [tag for category in METRIC_CATEGORIES.values() for tag in category]
+        tags += [f'Environment/Lesson Number/{p}' for p in CURRICULUM_PARAMETERS]
+
+    behavior_dir = os.path.join(run_dir, behavior)
+    os.makedirs(behavior_dir, exist_ok=True)
+
+    steps = np.arange(summary_freq, max_steps + 1, summary_freq, dtype=np.int64)
+    wall_times = start_time + np.cumsum(rng.normal(seconds_per_summary, 0.1 * seconds_per_summary, len(steps)))
+    series = synthesize_series(steps, tags, rng, max_steps)
+
+    # Resumed runs: each new file starts a little before the previous one ended
+    boundaries = np.linspace(0, len(steps), n_files + 1).astype(int)
+    files = []
+    total_bytes = 0
+    points = 0
+    for file_index in range(n_files):
+        start = boundaries[file_index]
+        if file_index > 0:
+            start = max(0, start - int(rng.integers(1, 5)))
+        end = boundaries[file_index + 1]
+        file_time = wall_times[start] - 1.0 if start < len(wall_times) else start_time
+        name = f"events.out.tfevents.{int(file_time)}.SYNTHETIC-HOST.{1000 + file_index}.0"
+        path = os.path.join(behavior_dir, name)
+
+        with EventFileWriter(path, wall_time=file_time) as writer:
+            writer.write(encode_text_event(file_time, 0, 'Hyperparameters/text_summary',
+                                           f"trainer_type:\tppo\n\tmax_steps:\t{max_steps}"))
+            for i in range(start, end):
+                for tag, values in series.items():
+                    writer.write(encode_scalar_event(float(wall_times[i]), int(steps[i]), [(tag, float(values[i]))]))
+                    points += 1
+            size = writer.bytes_written
+
+        if truncate_tail and file_index == n_files - 1 and size > 64:
+            # Simulate a run killed mid-write: chop the final record in half
+            cut = size - int(rng.integers(5, 30))
+            with open(path, 'r+b') as f:
+                f.truncate(cut)
+            size = cut
+        files.append(path)
+        total_bytes += size
+
+    _write_run_logs(run_dir, behavior, steps, wall_times, series)
+    return {'files': files, 'bytes': total_bytes, 'points': points}
+
+
+def _write_run_logs(run_dir, behavior, steps, wall_times, series):
+    log_dir = os.path.join(run_dir, "run_logs")
+    os.makedirs(log_dir, exist_ok=True)
+    final_reward = float(series['Environment/Cumulative Reward'][-1]) if 'Environment/Cumulative Reward' in series else None
+    checkpoint = {
+        "steps": int(steps[-1]),
+        "file_path": os.path.join(run_dir, f"{behavior}.onnx"),
+        "reward": final_reward,
+        "creation_time": float(wall_times[-1]),
+        "auxillary_file_paths": [],
+    }
+    status = {
+        behavior: {"checkpoints": [checkpoint], "final_checkpoint": checkpoint},
+        "metadata": {"stats_format_version": "0.3.0", "mlagents_version": "0.29.0"},
+    }
+    with open(os.path.join(log_dir, "training_status.json"), "w") as f:
+        json.dump(status, f, indent=4)
+
+
+def generate_tree(results_dir, n_runs=4, run_prefix="synthetic", **run_kwargs):
+    """Write n_runs synthetic runs under results_dir"""
+    seed = run_kwargs.pop('seed', 0)
+    summary = {}
+    for i in range(n_runs):
+        run_id = f"{run_prefix}{i + 1}"
+        summary[run_id] = write_run(os.path.join(results_dir, run_id), seed=seed + i, **run_kwargs)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic results/ tree of event files")
+    parser.add_argument("results_dir")
+    parser.add_argument("--runs", type=int, default=4)
+    parser.add_argument("--max-steps", type=int, default=10_000_000)
+    parser.add_argument("--summary-freq", type=int, default=10000)
+    parser.add_argument("--files-per-run", type=int, default=1, help="split each run into resumed files")
+    parser.add_argument("--categories", nargs="+", default=list(METRIC_CATEGORIES),
+                        choices=list(METRIC_CATEGORIES))
+    parser.add_argument("--no-lessons", action="store_true", help="omit Environment/Lesson Number tags")
+    parser.add_argument("--truncate-tail", action="store_true")
+    parser.add_argument("--behavior", default="MyAgent")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tags = [tag for category in args.categories for tag in METRIC_CATEGORIES[category]]
+    if not args.no_lessons:
+        tags += [f'Environment/Lesson Number/{p}' for p in CURRICULUM_PARAMETERS]
+
+    summary = generate_tree(
+        args.results_dir, n_runs=args.runs, behavior=args.behavior, tags=tags,
+        max_steps=args.max_steps, summary_freq=args.summary_freq, n_files=args.files_per_run,
+        truncate_tail=args.truncate_tail, seed=args.seed,
+    )
+    for run_id, info in summary.items():
+        print(f"{run_id}: {len(info['files'])} files, {info['points']} points, {info['bytes'] / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
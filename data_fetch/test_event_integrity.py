@@ -0,0 +1,85 @@
+import os
+
+from event_integrity import salvage, scan_file
+from tfevents import (
+    EventFileWriter,
+    encode_scalar_event,
+    find_event_files,
+    iter_records,
+    read_scalar_points,
+)
+
+TAG = 'Environment/Cumulative Reward'
+
+
+def _write_fixture(directory, n_steps=20):
+    """Event file with a version record and one scalar record per step; returns (path, record spans)"""
+    path = os.path.join(directory, "events.out.tfevents.1700000000.host.1.0")
+    with EventFileWriter(path, wall_time=0.0) as writer:
+        for step in range(1, n_steps + 1):
+            writer.write(encode_scalar_event(float(step), step * 1000, [(TAG, float(step))]))
+    with open(path, 'rb') as f:
+        spans = [(start, end) for start, end, _ in iter_records(f.read())]
+    return path, spans
+
+
+def _flip(path, offset):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        f.seek(offset)
+        f.write(bytes([byte ^ 0xFF]))
+
+
+def _steps(path):
+    points, _ = read_scalar_points(path)
+    return [step for _, step, _, _ in points]
+
+
+def test_scan_reports_damaged_ranges_and_salvage_keeps_the_rest(tmp_path):
+    path, spans = _write_fixture(str(tmp_path))
+    data_hit, length_hit = spans[5], spans[12]
+    _flip(path, data_hit[0] + 14)      # inside the payload
+    _flip(path, length_hit[0] + 1)     # inside the length field
+
+    report = scan_file(path)
+    assert report['damaged'] == [
+        (data_hit[0], data_hit[1], "data crc"),
+        (length_hit[0], length_hit[1], "bad length crc"),
+    ]
+    assert report['records'] == len(spans) - 2
+
+    # Records 5 and 12 hold steps 5000 and 12000 (record 0 is the file version)
+    expected = [step * 1000 for step in range(1, 21) if step not in (5, 12)]
+    assert _steps(path) == expected
+
+    target = salvage(report)
+    assert "tfevents" not in os.path.basename(target)
+    assert _steps(target) == expected
+    assert scan_file(target)['damaged'] == []
+    assert find_event_files(str(tmp_path)) == [path]
+
+
+def test_salvage_replace_keeps_the_original_out_of_tensorboards_view(tmp_path):
+    path, spans = _write_fixture(str(tmp_path))
+    _flip(path, spans[3][0] + 14)
+    original_size = os.path.getsize(path)
+
+    assert salvage(scan_file(path), replace=True) == path
+    names = sorted(os.listdir(str(tmp_path)))
+    assert [name for name in names if "tfevents" in name] == [os.path.basename(path)]
+    damaged = [name for name in names if "damaged" in name]
+    assert len(damaged) == 1 and os.path.getsize(os.path.join(str(tmp_path), damaged[0])) == original_size
+    assert scan_file(path)['damaged'] == []
+
+
+def test_truncated_tail_is_reported_but_not_consumed_by_readers(tmp_path):
+    path, spans = _write_fixture(str(tmp_path))
+    last_start, last_end = spans[-1]
+    with open(path, 'r+b') as f:
+        f.truncate(last_end - 3)
+
+    assert scan_file(path)['damaged'] == [(last_start, last_end - 3, "truncated record")]
+    points, offset = read_scalar_points(path)
+    assert offset == last_start
+    assert len(points) == len(spans) - 2
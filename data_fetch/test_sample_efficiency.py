@@ -0,0 +1,38 @@
+import numpy as np
+
+from sample_efficiency import tag_efficiency
+from tfevents import ScalarSeries
+
+
+def _series(steps, values):
+    steps = np.asarray(steps, dtype=np.int64)
+    return ScalarSeries(steps, steps.astype(np.float64), np.asarray(values, dtype=np.float64))
+
+
+def test_threshold_below_data_hits_each_runs_first_step():
+    runs = {
+        'a': {'Reward': _series([10, 20, 30], [1.0, 2.0, 3.0])},
+        'b': {'Reward': _series([100, 200, 300], [5.0, 6.0, 7.0])},
+    }
+    result = tag_efficiency(runs, 'Reward', threshold=-100)
+    assert result['a']['steps_to_threshold'] == 10
+    assert result['b']['steps_to_threshold'] == 100
+
+
+def test_threshold_above_data_is_not_reached():
+    runs = {
+        'a': {'Reward': _series([10, 20, 30], [1.0, 2.0, 3.0])},
+        'b': {'Reward': _series([100, 200, 300], [5.0, 6.0, 7.0])},
+    }
+    result = tag_efficiency(runs, 'Reward', threshold=100)
+    assert not result['a']['reached'] and not result['b']['reached']
+
+
+def test_lower_is_better_threshold():
+    runs = {
+        'a': {'GroundCollision': _series([10, 20, 30], [1.0, 0.5, 0.0])},
+        'b': {'GroundCollision': _series([100, 200, 300], [1.0, 1.0, 0.2])},
+    }
+    result = tag_efficiency(runs, 'GroundCollision', threshold=0.5)
+    assert result['a']['steps_to_threshold'] == 20
+    assert result['b']['steps_to_threshold'] == 300
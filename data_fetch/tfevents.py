@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Lightweight reader for TensorBoard events.out.tfevents.* files
+
+Decodes the TFRecord framing and the scalar parts of Event protos directly,
+so callers can resume from a byte offset and only pay for newly written
+records (EventAccumulator always re-reads from the start).
+"""
+
+import os
+import struct
+import time
+from collections import namedtuple
+
+from protowire import (
+    WIRE_FIXED32,
+    field_bytes,
+    field_double,
+    field_float,
+    field_varint,
+    iter_fields,
+    packed_doubles,
+    packed_floats,
+    to_double,
+    to_float,
+    to_signed64,
+)
+
+EVENT_FILE_PREFIX = "events.out.tfevents."
+# <event file><suffix> sidecars written by earlier versions of our tools; never parse these
+# as events (current sidecars come from sidecar_path and do not look like event files)
+SIDECAR_SUFFIXES = (".salvaged", ".damaged", ".index")
+
+HEADER_SIZE = 12   # uint64 length + uint32 masked crc of the length
+FOOTER_SIZE = 4    # uint32 masked crc of the data
+
+_LENGTH = struct.Struct('<Q')
+_CRC = struct.Struct('<I')
+
+# TensorProto dtypes we can turn into a scalar
+DT_FLOAT = 1
+DT_DOUBLE = 2
+DT_INT32 = 3
+DT_INT64 = 9
+DATA_CLASS_SCALAR = 1
+
+
+def _make_crc32c_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _make_crc32c_table()
+
+
+def _crc32c_python(data):
+    crc = 0xFFFFFFFF
+    table = _CRC32C_TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+try:
+    from crc32c import crc32c  # optional C implementation, much faster on large files
+except ImportError:
+    crc32c = _crc32c_python
+
+
+def masked_crc32c(data):
+    """CRC32C with the rotation/offset mask used by TFRecord framing"""
+    crc = crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+ScalarSeries = namedtuple('ScalarSeries', ['steps', 'wall_times', 'values'])
+
+
+def is_event_file(name):
+    """True for TensorBoard event files, False for our sidecars"""
+    return name.startswith(EVENT_FILE_PREFIX) and not name.endswith(SIDECAR_SUFFIXES)
+
+
+def sidecar_path(path, kind):
+    """Path next to an event file for one of our own files, with 'tfevents' in the name replaced by kind
+
+    TensorBoard reads every file whose name contains "tfevents" as an event
+    file, so sidecars must not: events.out.tfevents.X -> events.out.salvaged.X
+    """
+    directory, name = os.path.split(path)
+    name = name.replace("tfevents", kind) if "tfevents" in name else f"{name}.{kind}"
+    return os.path.join(directory, name)
+
+
+def event_file_sort_key(path):
+    """Order event files by the creation timestamp embedded in their name"""
+    name = os.path.basename(path)
+    parts = name[len(EVENT_FILE_PREFIX):].split('.')
+    try:
+        timestamp = int(parts[0])
+    except (ValueError, IndexError):
+        timestamp = 0
+    return timestamp, name
+
+
+def find_event_files(run_dir):
+    """All event files below a run directory (behavior subfolders included), oldest first"""
+    files = []
+    for root, _, names in os.walk(run_dir):
+        for name in names:
+            if is_event_file(name):
+                files.append(os.path.join(root, name))
+    return sorted(files, key=event_file_sort_key)
+
+
+def find_run_files(results_dir="results"):
+    """Map run_id -> event files (oldest first) for every run under results_dir, in one walk"""
+    run_files = {}
+    if not os.path.isdir(results_dir):
+        return run_files
+    for name in sorted(os.listdir(results_dir)):
+        files = find_event_files(os.path.join(results_dir, name))
+        if files:
+            run_files[name] = files
+    return run_files
+
+
+def find_runs(results_dir="results"):
+    """Map run_id -> run directory for every run under results_dir that has event files"""
+    return {run_id: os.path.join(results_dir, run_id) for run_id in find_run_files(results_dir)}
+
+
+def run_signature(run_dir, extra=()):
+    """[[relative path, size, mtime]] of a run's event files and of the extra run-relative paths that exist
+
+    Caches compare it to skip runs whose inputs are unchanged.
+    """
+    paths = find_event_files(run_dir)
+    paths += [p for p in (os.path.join(run_dir, name) for name in extra) if os.path.exists(p)]
+    return [[os.path.relpath(p, run_dir), os.path.getsize(p), os.path.getmtime(p)] for p in paths]
+
+
+def iter_records(buf, pos=0):
+    """Yield (start, end, payload) for each TFRecord in buf whose length and data CRCs check out
+
+    Damaged stretches come out as (start, end, None) so callers can step past
+    them; after a bad length the framing is resynchronized on the next intact
+    record (event_integrity.scan_buffer). Stops silently at a partial record
+    at the end so a half-written tail can be picked up again on the next read.
+    """
+    import numpy as np
+    from event_integrity import scan_buffer  # imports this module, so not at the top
+
+    valid, damaged = scan_buffer(np.frombuffer(buf, dtype=np.uint8), pos)
+    if damaged and damaged[-1][2] in ("truncated record", "truncated header"):
+        damaged.pop()
+    spans = sorted([(start, end, True) for start, end in valid] + [(start, end, False) for start, end, _ in damaged])
+    for start, end, ok in spans:
+        yield start, end, (buf[start + HEADER_SIZE:end - FOOTER_SIZE] if ok else None)
+
+
+def record_payload(buf, pos):
+    """Payload of the record at pos without CRC checks, for offsets already verified (e.g. by an index)"""
+    length = _LENGTH.unpack_from(buf, pos)[0]
+    return buf[pos + HEADER_SIZE:pos + HEADER_SIZE + length]
+
+
+def _summary_metadata_is_scalar(raw):
+    for field, _, value in iter_fields(raw):
+        if field == 1:  # plugin_data
+            for sub_field, _, sub_value in iter_fields(value):
+                if sub_field == 1 and bytes(sub_value) == b'scalars':
+                    return True
+        elif field == 4 and value == DATA_CLASS_SCALAR:
+            return True
+    return False
+
+
+def _tensor_scalar(raw):
+    dtype = None
+    content = None
+    values = []
+    for field, _, value in iter_fields(raw):
+        if field == 1:
+            dtype = value
+        elif field == 4:
+            content = bytes(value)
+        elif field == 5:
+            values = packed_floats(value)
+        elif field == 6:
+            values = packed_doubles(value)
+    if content:
+        if dtype == DT_FLOAT:
+            values = packed_floats(content)
+        elif dtype == DT_DOUBLE:
+            values = packed_doubles(content)
+        elif dtype == DT_INT32:
+            values = list(struct.unpack(f'<{len(content) // 4}i', content))
+        elif dtype == DT_INT64:
+            values = list(struct.unpack(f'<{len(content) // 8}q', content))
+    if dtype not in (DT_FLOAT, DT_DOUBLE, DT_INT32, DT_INT64) or len(values) != 1:
+        return None
+    return float(values[0])
+
+
+def _summary_scalars(raw):
+    scalars = []
+    for field, _, value in iter_fields(raw):
+        if field != 1:
+            continue
+        tag = None
+        scalar = None
+        tensor = None
+        is_scalar_plugin = False
+        for sub_field, wire_type, sub_value in iter_fields(value):
+            if sub_field == 1:
+                tag = bytes(sub_value).decode('utf-8', 'replace')
+            elif sub_field == 2 and wire_type == WIRE_FIXED32:
+                scalar = to_float(sub_value)
+            elif sub_field == 8:
+                tensor = sub_value
+            elif sub_field == 9:
+                is_scalar_plugin = _summary_metadata_is_scalar(sub_value)
+        if scalar is None and tensor is not None and is_scalar_plugin:
+            scalar = _tensor_scalar(tensor)
+        if tag is not None and scalar is not None:
+            scalars.append((tag, scalar))
+    return scalars
+
+
+def parse_event(payload):
+    """Decode one Event record into (wall_time, step, [(tag, value), ...])"""
+    wall_time = 0.0
+    step = 0
+    scalars = []
+    for field, _, value in iter_fields(payload):
+        if field == 1:
+            wall_time = to_double(value)
+        elif field == 2:
+            step = to_signed64(value)
+        elif field == 5:
+            scalars = _summary_scalars(value)
+    return wall_time, step, scalars
+
+
+def read_scalar_points(path, offset=0, end=None):
+    """Read (tag, step, wall_time, value) points from offset, returning (points, next_offset)"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read() if end is None else f.read(end - offset)
+
+    points = []
+    consumed = 0
+    for _, record_end, payload in iter_records(data):
+        consumed = record_end
+        if payload is None:
+            continue
+        try:
+            wall_time, step, scalars = parse_event(payload)
+        except ValueError:
+            # Intact framing around a payload that is not an Event; skip it
+            continue
+        for tag, value in scalars:
+            points.append((tag, step, wall_time, value))
+    return points, offset + consumed
+
+
+def load_scalars(run_dir, tags=None):
+    """Load a run's scalars as {tag: ScalarSeries} of NumPy arrays sorted by step
+
+    When a resumed run rewrites steps that an earlier file already logged,
+    the value from the newest file wins.
+    """
+    wanted = None if tags is None else set(tags)
+    raw = {}
+    for path in find_event_files(run_dir):
+        points, _ = read_scalar_points(path)
+        for tag, step, wall_time, value in points:
+            if wanted is None or tag in wanted:
+                raw.setdefault(tag, []).append((step, wall_time, value))
+    return rows_to_series(raw)
+
+
+def rows_to_series(raw):
+    """{tag: [(step, wall_time, value), ...]} in file order -> {tag: ScalarSeries}, last write of a step wins"""
+    import numpy as np
+
+    series = {}
+    for tag, rows in raw.items():
+        steps = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        wall_times = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        values = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        order = np.argsort(steps, kind='stable')
+        steps = steps[order]
+        # Keep the last write of every step
+        keep = np.append(steps[1:] != steps[:-1], True)
+        series[tag] = ScalarSeries(steps[keep], wall_times[order][keep], values[order][keep])
+    return series
+
+
+class EventFileTail:
+    """Follows one event file, returning only the scalars written since the last read"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        # Set by read_new when the file shrank and was re-read from the start
+        self.restarted = False
+
+    def read_new(self):
+        """Scalar points appended since the previous call; restarts if the file shrank
+
+        After a restart the points returned repeat ones returned before, and
+        self.restarted is True so callers can drop what they kept from this file.
+        """
+        self.restarted = False
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            self.offset = 0
+            self.restarted = True
+        if size == self.offset:
+            return []
+        points, self.offset = read_scalar_points(self.path, self.offset, size)
+        return points
+
+
+def frame_record(payload):
+    """Wrap an Event payload in TFRecord framing (length, crcs)"""
+    header = _LENGTH.pack(len(payload))
+    return header + _CRC.pack(masked_crc32c(header)) + payload + _CRC.pack(masked_crc32c(payload))
+
+
+def encode_file_version_event(wall_time, version="brain.Event:2"):
+    return field_double(1, wall_time) + field_bytes(3, version)
+
+
+def encode_scalar_event(wall_time, step, scalars):
+    """Event proto carrying one simple_value per (tag, value) pair"""
+    values = b''.join(field_bytes(1, field_bytes(1, tag) + field_float(2, value)) for tag, value in scalars)
+    return field_double(1, wall_time) + field_varint(2, step) + field_bytes(5, values)
+
+
+def encode_text_event(wall_time, step, tag, text):
+    """Event proto with a text-plugin summary (what ML-Agents writes for hyperparameters)"""
+    plugin_data = field_bytes(1, field_bytes(1, "text"))
+    tensor = field_varint(1, 7) + field_bytes(2, field_bytes(2, field_varint(1, 1))) + field_bytes(8, text)
+    value = field_bytes(1, tag) + field_bytes(9, plugin_data) + field_bytes(8, tensor)
+    return field_double(1, wall_time) + field_varint(2, step) + field_bytes(5, field_bytes(1, value))
+
+
+class EventFileWriter:
+    """Append-only writer for TFRecord-framed Event payloads"""
+
+    def __init__(self, path, wall_time=None):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.bytes_written = 0
+        self.write(encode_file_version_event(time.time() if wall_time is None else wall_time))
+
+    def write(self, payload):
+        record = frame_record(payload)
+        self.file.write(record)
+        self.bytes_written += len(record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()